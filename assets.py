@@ -0,0 +1,167 @@
+"""Pre-sized, WebP-encoded images for the report.
+
+``st.image(Image.open(path))`` decodes the PNG, re-encodes it on every rerun
+and sends it at full resolution.  Here each image is decoded once per file
+version (keyed by its fingerprint, like the datasets) and written as WebP
+variants at the widths the report lays images out at, ``VARIANT_WIDTHS``, plus
+its own width.  The report asks for the width it displays an image at and gets
+the smallest variant that covers it; images are never scaled up.
+
+With ``server.enableStaticServing`` (set in ``.streamlit/config.toml``) the
+variants are files under ``static/assets/`` and the report passes their
+``/app/static/`` URL to ``st.image``: Streamlit hands the URL to the browser
+untouched and serves the file as ``image/webp``.  Variant file names carry the
+source fingerprint, so a changed image gets new files, and the files of its
+older versions are deleted.  Without static serving
+the variants are kept in memory as PNG bytes, which ``st.image`` sends as they
+are.
+
+    python assets.py                      # pre-generate the report's images
+"""
+import argparse
+import hashlib
+import io
+import os
+import re
+
+from PIL import Image, features
+
+from data_access import DatasetCache, fingerprint
+
+REPORT_IMAGES = ["dashboard_screenshot.png", "kpi_cards.png"]
+
+# Streamlit serves the ``static`` folder next to the app script
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+ASSET_DIR = os.path.join(STATIC_DIR, "assets")
+STATIC_URL = "/app/static/assets/"
+
+# Widths (CSS pixels) images are displayed at in the report
+VARIANT_WIDTHS = (350, 700, 1400)
+WEBP_QUALITY = 85
+MAX_ASSET_BYTES = 64 * 1024 ** 2
+
+
+def _variants_bytes(variants):
+    # PNG bytes in memory, or the names of WebP files under ASSET_DIR, by their size on disk
+    return sum(len(value) if isinstance(value, bytes)
+               else os.path.getsize(os.path.join(ASSET_DIR, value))
+               for value in variants.values())
+
+
+_variants = DatasetCache(MAX_ASSET_BYTES, sizeof=_variants_bytes)
+
+
+def webp_available():
+    return features.check('webp')
+
+
+def variant_widths(natural):
+    """Widths generated for an image ``natural`` pixels wide."""
+    return [width for width in VARIANT_WIDTHS if width < natural] + [natural]
+
+
+def fit_width(natural, width=None):
+    """Smallest variant width covering ``width``; the full image if none is given."""
+    if width is None:
+        return natural
+    return min((w for w in variant_widths(natural) if w >= width), default=natural)
+
+
+def _resized(image, width):
+    if width >= image.width:
+        return image
+    return image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def _version(path):
+    # mtime, size and content hash of the source, not its location
+    return hashlib.blake2b(repr(fingerprint(path)[1:]).encode(), digest_size=6).hexdigest()
+
+
+def variant_path(path, width, version):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(ASSET_DIR, f"{stem}-{width}w-{version}.webp")
+
+
+def _prune_variants(path, version):
+    """Delete the variant files of earlier versions of ``path``."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    pattern = re.compile(re.escape(stem) + r'-\d+w-([0-9a-f]+)\.webp')
+    for name in os.listdir(ASSET_DIR):
+        match = pattern.fullmatch(name)
+        if match and match.group(1) != version:
+            try:
+                os.remove(os.path.join(ASSET_DIR, name))
+            except FileNotFoundError:
+                pass
+
+
+def _static_variants(path):
+    """Write the WebP variants of ``path``; returns {width: file name}."""
+    version = _version(path)
+    with Image.open(path) as image:
+        image.load()
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    names = {}
+    for width in variant_widths(image.width):
+        target = variant_path(path, width, version)
+        if not os.path.exists(target):
+            tmp = target + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(_encode(_resized(image, width), 'WEBP'))
+            os.replace(tmp, target)
+        names[width] = os.path.basename(target)
+    _prune_variants(path, version)
+    return names
+
+
+def _png_variants(path):
+    """PNG bytes of every variant of ``path``; returns {width: bytes}."""
+    with Image.open(path) as image:
+        image.load()
+    return {width: _encode(_resized(image, width), 'PNG') for width in variant_widths(image.width)}
+
+
+def static_serving():
+    try:
+        import streamlit as st
+        return bool(st.get_option('server.enableStaticServing'))
+    except Exception:
+        return False
+
+
+def image(path, width=None):
+    """What to pass to ``st.image`` to show ``path`` at ``width`` CSS pixels."""
+    if static_serving() and webp_available():
+        names = _variants.get(path, _static_variants)
+        return STATIC_URL + names[fit_width(max(names), width)]
+    variants = _variants.get(path, _png_variants)
+    return variants[fit_width(max(variants), width)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate the report's image variants.")
+    parser.add_argument('paths', nargs='*', default=REPORT_IMAGES)
+    args = parser.parse_args(argv)
+
+    if not webp_available():
+        parser.exit(1, "❌ this Pillow build cannot write WebP\n")
+    for path in args.paths:
+        names = _static_variants(path)
+        sizes = ", ".join(f"{width}w {os.path.getsize(os.path.join(ASSET_DIR, name)) / 1024:.0f} KB"
+                          for width, name in names.items())
+        print(f"🖼️  {path} ({os.path.getsize(path) / 1024:.0f} KB): {sizes}")
+    print(f"💾 Variants written to: {ASSET_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Scale benchmarks for the cleaning stages and the report's data loads.
+
+For every scale (50k, 1M and 10M rows by default) synthetic datasets are
+generated once under ``--data-dir`` (see ``synthetic_data.py``), then
+
+- every cleaning stage of ``pipeline.json`` is timed on its own, followed by
+  the Parquet write; above ``IN_MEMORY_MAX_ROWS`` the tables do not fit in
+  memory comfortably, so the two-pass ``--stream`` cleaning is timed instead;
+- every data load the report does is timed against the cleaned output, with
+  the process-wide cache cleared first so the numbers are cold loads;
+- the default-probability model of ``scoring.py`` is fitted on the cleaned
+  output and the cleaned applicants are scored, with the throughput recorded
+  as ``rows_per_min``.
+
+Each measurement records wall time, the tracemalloc peak of the step and the
+process RSS after it.  Results are written as one JSON file per run, named
+after the current commit, and two runs can be compared:
+
+    python benchmark.py --scales 50k 1m
+    python benchmark.py --compare benchmark_results/a.json benchmark_results/b.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import pandas as pd
+
+import data_access
+import measures
+from pipeline import CONFIG_PATH, STAGES, load_config
+from instrumentation import peak_rss_mb, rss_mb
+from previews import preview_head
+from storage import write_cleaned
+from synthetic_data import SCALES, generate
+
+IN_MEMORY_MAX_ROWS = 2_000_000
+RESULTS_DIR = "benchmark_results"
+
+
+def measure(fn, *args, **kwargs):
+    """Run ``fn`` once; returns its result and the wall time / memory it took."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {'wall_s': round(wall, 4), 'peak_alloc_mb': round(peak / 1024 ** 2, 1),
+                    'rss_mb': round(rss_mb() or peak_rss_mb() or 0, 1)}
+
+
+def _record(results, scale, group, table, step, stats, df=None):
+    entry = {'scale': scale, 'group': group, 'table': table, 'step': step, **stats}
+    if isinstance(df, pd.DataFrame):
+        entry['rows_out'], entry['cols_out'] = df.shape
+    results.append(entry)
+    print(f"⏱️  {scale:>7} {table:<22} {step:<18} {stats['wall_s']:>8.3f} s "
+          f"{stats['peak_alloc_mb']:>8.1f} MB peak")
+
+
+def bench_cleaning(results, scale, rows, paths, output_dir, config):
+    outputs = {table: os.path.join(output_dir, f"cleaned_{table}.parquet") for table in paths}
+    if rows > IN_MEMORY_MAX_ROWS:
+        from streaming import stream_clean_application_data, stream_clean_previous_application
+
+        for table, clean in (('application_data', stream_clean_application_data),
+                             ('previous_application', stream_clean_previous_application)):
+            _, stats = measure(clean, paths[table], outputs[table])
+            _record(results, scale, 'clean', table, 'stream_clean', stats)
+        return outputs
+
+    for table, spec in config['tables'].items():
+        df = None
+        for stage in spec['stages']:
+            params = {k: v for k, v in stage.items() if k != 'name'}
+            if stage['name'] == 'load':
+                params['path'] = paths[table]
+            (df, _), stats = measure(STAGES[stage['name']], df, table, **params)
+            _record(results, scale, 'clean', table, stage['name'], stats, df)
+        _, stats = measure(write_cleaned, df, outputs[table])
+        _record(results, scale, 'clean', table, 'write', stats)
+        del df
+    return outputs
+
+
+def bench_report(results, scale, paths, outputs):
+    app_path, prev_path = outputs['application_data'], outputs['previous_application']
+    loads = [
+        ('application_data', 'raw_preview_head',
+         lambda: preview_head(paths['application_data'], 'application_data')),
+        ('application_data', 'cleaned_head', lambda: data_access.load_cleaned_head(app_path)),
+        ('application_data', 'measure_columns',
+         lambda: data_access.load_cleaned(app_path, columns=measures.APP_COLUMNS)),
+        ('previous_application', 'measure_columns',
+         lambda: data_access.load_cleaned(prev_path, columns=measures.PREV_COLUMNS)),
+        ('both', 'measures', lambda: measures.measures(app_path=app_path, prev_path=prev_path)),
+        ('both', 'measures_filtered',
+         lambda: measures.measures({'CODE_GENDER': ['F']}, app_path=app_path, prev_path=prev_path)),
+    ]
+    for table, step, load in loads:
+        # cold loads: nothing left over from the previous step
+        data_access._cache.clear()
+        measures._memoized.cache_clear()
+        df, stats = measure(load)
+        _record(results, scale, 'report', table, step, stats, df)
+
+
+def bench_scoring(results, scale, outputs, output_dir, jobs=1):
+    import scoring
+
+    app_path, prev_path = outputs['application_data'], outputs['previous_application']
+    model, stats = measure(scoring.fit_model, app_path, prev_path)
+    _record(results, scale, 'scoring', 'application_data', 'fit', stats)
+    scores_path = os.path.join(output_dir, 'default_scores.parquet')
+    rows, stats = measure(scoring.score_file, model, app_path, scores_path, prev_path, jobs=jobs)
+    stats['rows_per_min'] = round(rows / stats['wall_s'] * 60) if stats['wall_s'] else None
+    _record(results, scale, 'scoring', 'application_data', f'score_jobs{jobs}', stats)
+    print(f"   {stats['rows_per_min']:,} rows/min")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales, data_dir, results_dir=RESULTS_DIR, config_path=CONFIG_PATH, score_jobs=1):
+    config = load_config(config_path)
+    results = []
+    for scale in scales:
+        rows = SCALES.get(scale) or int(scale)
+        scale_dir = os.path.join(data_dir, scale)
+        paths = {table: os.path.join(scale_dir, table + '.csv')
+                 for table in ('application_data', 'previous_application')}
+        if not all(os.path.exists(path) for path in paths.values()):
+            print(f"🧪 Generating {rows} rows in {scale_dir}...")
+            generate(rows, scale_dir)
+        output_dir = os.path.join(scale_dir, 'cleaned')
+        os.makedirs(output_dir, exist_ok=True)
+        outputs = bench_cleaning(results, scale, rows, paths, output_dir, config)
+        bench_report(results, scale, paths, outputs)
+        bench_scoring(results, scale, outputs, output_dir, score_jobs)
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"{(commit or 'nocommit')[:10]}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to: {path}")
+    return path
+
+
+def compare(old_path, new_path):
+    """Per-step wall time and memory of ``new_path`` relative to ``old_path``."""
+    frames = []
+    for path in (old_path, new_path):
+        with open(path) as f:
+            frames.append(pd.DataFrame(json.load(f)['results'])
+                          .set_index(['scale', 'group', 'table', 'step']))
+    old, new = frames
+    table = pd.DataFrame({
+        'old_s': old['wall_s'], 'new_s': new['wall_s'],
+        'time_ratio': new['wall_s'] / old['wall_s'],
+        'mem_ratio': new['peak_alloc_mb'] / old['peak_alloc_mb'],
+    }).dropna(subset=['old_s', 'new_s'])
+    print(table.round(3).to_string())
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cleaning and report loads at scale.")
+    parser.add_argument('--scales', nargs='+', default=list(SCALES),
+                        help=f"scales to run: {list(SCALES)} or row counts")
+    parser.add_argument('--data-dir', default="bench_data")
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    parser.add_argument('--config', default=CONFIG_PATH)
+    parser.add_argument('--score-jobs', type=int, default=1, help="processes used by the scoring step")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help="compare two result files instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args.scales, args.data_dir, args.results_dir, args.config, args.score_jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Fitted cleaning parameters, saved so new rows can be cleaned without a refit.
+
+A full run learns the dropped columns, the fill values and the outlier bounds
+of each table.  They are saved in ``cleaning_params.json`` together with a
+marker of how much of each raw CSV they were fitted on: the byte offset the
+run read up to and a hash of the file's first bytes.  An incremental run
+checks the marker, parses only the bytes after the offset and cleans them with
+the saved parameters.  If the file was rewritten rather than appended to, the
+hash or the size no longer matches and a refit is required.
+"""
+import hashlib
+import json
+import os
+
+from imputation import Imputer
+from outliers import OutlierFilter
+
+HEAD_BYTES = 64 * 1024
+
+
+class StaleParamsError(RuntimeError):
+    """The raw file no longer extends the data the parameters were fitted on."""
+
+
+def _head_hash(path, offset):
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(min(offset, HEAD_BYTES)), digest_size=16).hexdigest()
+
+
+def source_marker(path, offset=None):
+    """How far into ``path`` a run has read (the whole file by default)."""
+    offset = os.path.getsize(path) if offset is None else offset
+    return {'offset': offset, 'head_hash': _head_hash(path, offset)}
+
+
+def unread_offset(path, marker):
+    """Byte offset where the rows not yet cleaned start."""
+    offset = marker['offset']
+    if os.path.getsize(path) < offset or _head_hash(path, offset) != marker['head_hash']:
+        raise StaleParamsError(f"{path} was rewritten since the parameters were fitted; "
+                               "run with 'refit' to rebuild the cleaned tables")
+    return offset
+
+
+def save_params(path, params):
+    state = {'reference_date': params['reference_date']}
+    for table, table_params in params.items():
+        if table == 'reference_date':
+            continue
+        state[table] = {key: value.state() if hasattr(value, 'state') else value
+                        for key, value in table_params.items()}
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=2)
+
+
+def load_params(path):
+    with open(path) as f:
+        state = json.load(f)
+    params = {'reference_date': state.pop('reference_date')}
+    for table, table_state in state.items():
+        table_params = dict(table_state)
+        table_params['imputer'] = Imputer.from_state(table_state['imputer'])
+        if 'outliers' in table_state:
+            table_params['outliers'] = OutlierFilter.from_state(table_state['outliers'])
+        params[table] = table_params
+    return params
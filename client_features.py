@@ -0,0 +1,225 @@
+"""Per-client features from previous_application, joined onto the applicants.
+
+The Power BI model relates Applicants to PreviousLoans on SK_ID_CURR and
+joins the two at query time.  Here the previous loans are aggregated once per
+SK_ID_CURR (loan counts per NAME_CONTRACT_STATUS, refused ratio, mean / max
+AMT_CREDIT and AMT_APPLICATION, most recent DAYS_DECISION) and the result is
+looked up for every applicant through the sorted SK_ID_CURR index.  The output
+is one narrow table, sorted by SK_ID_CURR, with the applicant columns the
+dashboard slices on and the features next to them.
+
+``build_client_features`` reads both tables one row group at a time: each
+group of previous loans becomes partial sums, counts and maxima per
+SK_ID_CURR that are merged into a running total, and the applicants are
+written group by group, so only the per-client totals are ever held whole.
+
+After an incremental run ``update_client_features`` recomputes only the
+clients that appear in the appended rows, from their own previous loans.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from storage import (
+    ChunkWriter, append_cleaned, column_max, empty_frame, iter_matching, iter_row_groups, read_cleaned,
+    sorted_row_groups,
+)
+
+STATUSES = ['Approved', 'Canceled', 'Refused', 'Unused offer']
+
+# Applicant columns kept next to the features
+CLIENT_COLUMNS = ['SK_ID_CURR', 'TARGET', 'CODE_GENDER', 'NAME_EDUCATION_TYPE', 'NAME_INCOME_TYPE',
+                  'NAME_CONTRACT_TYPE', 'AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY']
+PREV_COLUMNS = ['SK_ID_CURR', 'NAME_CONTRACT_STATUS', 'AMT_CREDIT', 'AMT_APPLICATION', 'DAYS_DECISION']
+
+COUNT_COLUMNS = ['PREV_COUNT'] + [
+    f"PREV_{status.upper().replace(' ', '_')}_COUNT" for status in STATUSES]
+
+
+# Partial aggregate -> how two partials of the same client combine
+PARTIALS = {
+    **dict.fromkeys(COUNT_COLUMNS, 'sum'),
+    'CREDIT_SUM': 'sum', 'CREDIT_N': 'sum', 'PREV_AMT_CREDIT_MAX': 'max',
+    'APPLICATION_SUM': 'sum', 'APPLICATION_N': 'sum', 'PREV_AMT_APPLICATION_MAX': 'max',
+    # DAYS_* count back from the application, so the largest is the latest
+    'PREV_DAYS_DECISION_LAST': 'max',
+}
+
+
+def previous_partials(prev_df):
+    """Sums, counts and maxima of ``prev_df``'s loans per SK_ID_CURR.
+
+    A partial is a dict of arrays: the sorted, unique ``SK_ID_CURR`` and one
+    array per ``PARTIALS`` column aligned with it.
+    """
+    status = prev_df['NAME_CONTRACT_STATUS'].astype('object')
+    credit, application = prev_df['AMT_CREDIT'], prev_df['AMT_APPLICATION']
+    columns = {
+        'SK_ID_CURR': prev_df['SK_ID_CURR'].to_numpy(),
+        'PREV_COUNT': 1,
+        # float32 amounts are summed in float64
+        'CREDIT_SUM': credit.to_numpy(dtype='float64', na_value=np.nan),
+        'CREDIT_N': credit.notna().to_numpy(),
+        'PREV_AMT_CREDIT_MAX': credit.to_numpy(),
+        'APPLICATION_SUM': application.to_numpy(dtype='float64', na_value=np.nan),
+        'APPLICATION_N': application.notna().to_numpy(),
+        'PREV_AMT_APPLICATION_MAX': application.to_numpy(),
+        'PREV_DAYS_DECISION_LAST': prev_df['DAYS_DECISION'].to_numpy(),
+    }
+    for name, value in zip(COUNT_COLUMNS[1:], STATUSES):
+        columns[name] = (status == value).to_numpy()
+    grouped = pd.DataFrame(columns).groupby('SK_ID_CURR', sort=True).agg(PARTIALS)
+    return {'SK_ID_CURR': grouped.index.to_numpy(), **{col: grouped[col].to_numpy() for col in PARTIALS}}
+
+
+def merge_partials(*partials):
+    """One partial per SK_ID_CURR from several (e.g. one per row group).
+
+    Every column is combined with one indexed add or maximum into arrays over
+    the union of the ids, without building a frame.
+    """
+    partials = [p for p in partials if p is not None]
+    if len(partials) == 1:
+        return partials[0]
+    ids = np.unique(np.concatenate([p['SK_ID_CURR'] for p in partials]))
+    positions = [np.searchsorted(ids, p['SK_ID_CURR']) for p in partials]
+    merged = {'SK_ID_CURR': ids}
+    for col, how in PARTIALS.items():
+        values = np.zeros(len(ids), dtype=np.result_type(*[p[col] for p in partials]))
+        seen = np.zeros(len(ids), dtype=bool)
+        for p, pos in zip(partials, positions):
+            part = p[col]
+            if how == 'sum':
+                values[pos] += part
+            else:
+                # fmax skips the NaN max of a client whose amounts were all missing
+                values[pos] = np.where(seen[pos], np.fmax(values[pos], part), part)
+                seen[pos] = True
+        merged[col] = values
+    return merged
+
+
+def features_from_partials(partials):
+    """The previous-loan features from merged partials, indexed by SK_ID_CURR."""
+    features = {col: partials[col].astype('int32') for col in COUNT_COLUMNS}
+    features['PREV_REFUSED_RATIO'] = features['PREV_REFUSED_COUNT'] / features['PREV_COUNT']
+    for name in ('CREDIT', 'APPLICATION'):
+        count = partials[f'{name}_N']
+        features[f'PREV_AMT_{name}_MEAN'] = partials[f'{name}_SUM'] / np.where(count > 0, count, np.nan)
+        features[f'PREV_AMT_{name}_MAX'] = partials[f'PREV_AMT_{name}_MAX']
+    features['PREV_DAYS_DECISION_LAST'] = partials['PREV_DAYS_DECISION_LAST']
+    return pd.DataFrame(features, index=pd.Index(partials['SK_ID_CURR'], name='SK_ID_CURR'))
+
+
+def previous_features(prev_df):
+    """One row per SK_ID_CURR (sorted) with the previous-loan features."""
+    return features_from_partials(previous_partials(prev_df))
+
+
+def read_previous_features(prev_path):
+    """``previous_features`` of a cleaned table, read one row group at a time."""
+    partials = None
+    for prev_df in iter_row_groups(prev_path, columns=PREV_COLUMNS):
+        partials = merge_partials(partials, previous_partials(prev_df))
+    if partials is None:
+        partials = previous_partials(empty_frame(prev_path, PREV_COLUMNS))
+    return features_from_partials(partials)
+
+
+def clients_features(prev_path, ids):
+    """``read_previous_features`` restricted to the clients in ``ids``."""
+    partials = None
+    for prev_df in iter_matching(prev_path, 'SK_ID_CURR', ids, columns=PREV_COLUMNS):
+        partials = merge_partials(partials, previous_partials(prev_df))
+    if partials is None:
+        partials = previous_partials(empty_frame(prev_path, PREV_COLUMNS))
+    return features_from_partials(partials)
+
+
+def add_client_features(app_df, features):
+    """``app_df`` sorted by SK_ID_CURR with the features of every applicant.
+
+    Applicants without previous loans get zero counts and missing values.
+    """
+    app_df = app_df.sort_values('SK_ID_CURR', kind='stable').reset_index(drop=True)
+    # one positional lookup per applicant on the sorted, unique feature index
+    positions = features.index.get_indexer(app_df['SK_ID_CURR'])
+    found = positions >= 0
+    for col in features.columns:
+        dtype = features[col].dtype
+        if col in COUNT_COLUMNS:
+            missing = 0
+        else:
+            # NaN does not fit an integer column such as PREV_DAYS_DECISION_LAST
+            missing, dtype = np.nan, np.result_type(dtype, np.float64)
+        values = np.full(len(app_df), missing, dtype=dtype)
+        values[found] = features[col].to_numpy()[positions[found]]
+        app_df[col] = values
+    return app_df
+
+
+def build_client_features(app_path, prev_path, output_path):
+    """Narrow applicants + previous-loan features table; returns its shape."""
+    features = read_previous_features(prev_path)
+    if sorted_row_groups(app_path, 'SK_ID_CURR'):
+        # sorting each group sorts the table
+        groups = iter_row_groups(app_path, columns=CLIENT_COLUMNS)
+    else:
+        groups = [read_cleaned(app_path, columns=CLIENT_COLUMNS)]
+    with ChunkWriter(output_path) as writer:
+        for app_df in groups:
+            writer.write(add_client_features(app_df, features))
+    return writer.rows, writer.columns
+
+
+def _count_changes(before, after):
+    changes = after[CLIENT_COLUMNS].copy()
+    for col in ('PREV_COUNT', 'PREV_REFUSED_COUNT'):
+        changes[col] = after[col].to_numpy() - before[col].to_numpy()
+    return changes
+
+
+def update_client_features(output_path, prev_path, new_app_paths, new_prev_paths):
+    """Update the features table for appended rows; returns ``(shape, added, changed)``.
+
+    ``new_app_paths`` and ``new_prev_paths`` are the part files an incremental
+    run appended to the cleaned tables.  Only the clients in them are
+    recomputed, from their previous loans alone.  ``added`` is the
+    feature rows of the new applicants and ``changed`` the slicing columns of
+    the existing applicants whose loan counts changed (their applicant columns
+    and the change in PREV_COUNT and PREV_REFUSED_COUNT).
+
+    New applicants whose ids all come after the table's last one, with no
+    previous loans for existing clients, are appended as a part.  Otherwise
+    the narrow table is rewritten one row group at a time with the changed
+    rows replaced and the new ones merged in SK_ID_CURR order.
+    """
+    apps = [read_cleaned(path, columns=CLIENT_COLUMNS) for path in new_app_paths]
+    new_apps = pd.concat(apps, ignore_index=True) if apps else empty_frame(output_path, CLIENT_COLUMNS)
+    ids = [new_apps['SK_ID_CURR'].to_numpy()] + [
+        read_cleaned(path, columns=['SK_ID_CURR'])['SK_ID_CURR'].to_numpy() for path in new_prev_paths]
+    touched = np.unique(np.concatenate(ids))
+    features = clients_features(prev_path, touched)
+    added = add_client_features(new_apps, features)
+    last = column_max(output_path, 'SK_ID_CURR')
+    if last is not None and (not len(touched) or touched.min() > last):
+        shape = append_cleaned(added, output_path)
+        return shape, added, _count_changes(added.iloc[:0], added.iloc[:0])
+
+    pending, changed = added, []
+    # the rows merged in bring their own categories; the table's schema keeps the columns categorical
+    with ChunkWriter(output_path, schema=pq.read_schema(output_path)) as writer:
+        for clients in iter_row_groups(output_path):
+            hit = clients['SK_ID_CURR'].isin(touched).to_numpy()
+            if hit.any():
+                updated = add_client_features(clients.loc[hit, CLIENT_COLUMNS], features)
+                changed.append(_count_changes(clients[hit].reset_index(drop=True), updated))
+                clients = pd.concat([clients[~hit], updated], ignore_index=True)
+            # the new applicants that sort before the next row group go in with this one
+            before = pending['SK_ID_CURR'] <= clients['SK_ID_CURR'].max()
+            clients = pd.concat([clients, pending[before]], ignore_index=True)
+            pending = pending[~before]
+            writer.write(clients.sort_values('SK_ID_CURR', kind='stable'))
+        writer.write(pending)
+    changed = pd.concat(changed, ignore_index=True) if changed else _count_changes(added.iloc[:0], added.iloc[:0])
+    return (writer.rows, writer.columns), added, changed
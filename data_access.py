@@ -0,0 +1,155 @@
+"""Process-wide cache for the datasets the report reads.
+
+Streamlit re-runs the report script on every widget interaction and for
+every session, but imported modules live for the whole server process.  The
+cache below therefore loads each dataset once per process and hands the same
+DataFrame to every session.  Entries are keyed by the file fingerprint
+(path, mtime, size and a hash of the first and last blocks, plus the parts
+appended to a cleaned table), so a rewritten or extended file is picked up on
+the next rerun, and the least recently used frames are
+evicted once the cache holds more than ``MAX_CACHE_BYTES``.
+
+Cleaned tables published by the cleaning run (``shared_tables.py``) are read
+from their memory-mapped Arrow copy, so the processes of a multi-process
+deployment share those columns instead of each decoding the Parquet file.
+Their entries are also keyed by the published version they were read from.
+
+Cached frames are shared between sessions: treat them as read-only.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from schema import read_table
+from shared_tables import published_head, published_version, read_published
+from storage import read_cleaned, read_head, table_files
+
+MAX_CACHE_BYTES = 1024 * 1024 ** 2
+# Bytes hashed at each end of the file; catches rewrites that keep mtime/size
+HASH_BLOCK = 64 * 1024
+
+
+def fingerprint(path):
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(HASH_BLOCK))
+        if stat.st_size > HASH_BLOCK:
+            f.seek(max(HASH_BLOCK, stat.st_size - HASH_BLOCK))
+            digest.update(f.read(HASH_BLOCK))
+    for part in table_files(path)[1:]:
+        part_stat = os.stat(part)
+        digest.update(f"{part}:{part_stat.st_mtime_ns}:{part_stat.st_size}".encode())
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size, digest.hexdigest()
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+class DatasetCache:
+    """Thread-safe LRU of loaded frames, bounded by their memory use.
+
+    ``sizeof`` measures a cached value; pass ``len`` to cache bytes payloads.
+    ``on_evict`` is called with every value that leaves the cache, for values
+    that own something besides memory, such as a file.
+    """
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES, sizeof=frame_bytes, on_evict=None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, path, loader, *args, **kwargs):
+        """Return ``loader(path, *args, **kwargs)``, loading it at most once per version."""
+        fp = fingerprint(path)
+        key = (fp, loader.__name__, args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # concurrent sessions asking for the same dataset wait for one load
+        with key_lock:
+            try:
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                        return self._entries[key][0]
+                df = loader(path, *args, **kwargs)
+                size = self.sizeof(df)
+                with self._lock:
+                    self._drop_stale(fp)
+                    self._entries[key] = (df, size)
+                    self.total_bytes += size
+                    self._evict()
+            finally:
+                # also when the loader fails, so failed versions leave no lock behind
+                with self._lock:
+                    self._key_locks.pop(key, None)
+        return df
+
+    def _drop_stale(self, fp):
+        # older versions of the same file can never be hit again
+        path = fp[0]
+        for key in [k for k in self._entries if k[0][0] == path and k[0] != fp]:
+            self._remove(key)
+
+    def _evict(self):
+        # the newest entry is kept even when it alone is over the limit
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        value, size = self._entries.pop(key)
+        self.total_bytes -= size
+        if self.on_evict is not None:
+            self.on_evict(value)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+            self.total_bytes = 0
+
+
+_cache = DatasetCache()
+
+
+def load_table(path, table, columns=None):
+    """Raw CSV table read through the schema."""
+    return _cache.get(path, read_table, table, columns=tuple(columns) if columns else None)
+
+
+def read_shared(path, columns=None, filters=None, version=None):
+    df = read_published(path, columns, filters, version) if version else None
+    return df if df is not None else read_cleaned(path, columns, filters)
+
+
+def read_shared_head(path, n=5, version=None):
+    df = published_head(path, n, version) if version else None
+    return df if df is not None else read_head(path, n)
+
+
+def _hashable(filters):
+    """``filters`` as nested tuples, ``in`` value lists included, for the cache key."""
+    if isinstance(filters, (list, tuple, set)):
+        return tuple(_hashable(item) for item in filters)
+    return filters
+
+
+def load_cleaned(path, columns=None, filters=None):
+    """Cleaned table, optionally projected and filtered; mapped if it is published."""
+    return _cache.get(path, read_shared, columns=tuple(columns) if columns else None,
+                      filters=_hashable(filters) if filters else None,
+                      version=published_version(path))
+
+
+def load_cleaned_head(path, n=5):
+    return _cache.get(path, read_shared_head, n, version=published_version(path))
@@ -0,0 +1,150 @@
+"""Download payloads for the report, built only when a user asks for them.
+
+The report used to read every downloadable file, base64-encode it and inline
+it into the page on every rerun.  Here a payload is produced on request by
+streaming the file in fixed-size blocks, optionally as a gzip / zstd
+compressed CSV rendered from the cleaned Parquet tables row group by row
+group.  Each payload is encoded block by block into a file in a temporary
+directory of this process, never as one bytes object, and cached per file
+fingerprint and format, so further sessions asking for the same download
+reuse the file.  The cache is bounded by the payloads' size on disk; evicted
+and stale payload files are deleted.  ``payload`` only reads the file when the
+user clicks the download button (the report passes it as a callable).
+
+zstd needs the optional ``zstandard`` package; without it only gzip is offered.
+"""
+import atexit
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+
+import pyarrow.parquet as pq
+
+from data_access import DatasetCache, fingerprint
+from storage import COMPRESSION, ROW_GROUP_SIZE, iter_batches, replacing, table_files
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BLOCK_SIZE = 1024 * 1024
+# on disk; at most one payload is in memory, while it is being served
+MAX_PAYLOAD_BYTES = 2 * 1024 ** 3
+
+COMPRESSIONS = ('gzip', 'zstd') if zstandard is not None else ('gzip',)
+EXTENSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+MIME_TYPES = {'gzip': 'application/gzip', 'zstd': 'application/zstd'}
+
+_payload_dir = None
+_dir_lock = threading.Lock()
+
+
+def payload_dir():
+    """Temporary directory of this process's payload files, removed at exit."""
+    global _payload_dir
+    with _dir_lock:
+        if _payload_dir is None:
+            _payload_dir = tempfile.mkdtemp(prefix='loan_report_downloads-')
+            atexit.register(shutil.rmtree, _payload_dir, ignore_errors=True)
+        return _payload_dir
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_payloads = DatasetCache(MAX_PAYLOAD_BYTES, sizeof=os.path.getsize, on_evict=_remove)
+
+
+def iter_file(path, block_size=BLOCK_SIZE):
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def iter_table_file(path):
+    """The file at ``path``; a cleaned table with appended parts is merged into one Parquet file."""
+    if len(table_files(path)) == 1:
+        yield from iter_file(path)
+        return
+    fd, merged = tempfile.mkstemp(suffix='.parquet', dir=payload_dir())
+    os.close(fd)
+    try:
+        with pq.ParquetWriter(merged, pq.read_schema(path), compression=COMPRESSION) as writer:
+            for batch in iter_batches(path):
+                writer.write_batch(batch, row_group_size=ROW_GROUP_SIZE)
+        yield from iter_file(merged)
+    finally:
+        _remove(merged)
+
+
+def iter_parquet_as_csv(path):
+    """CSV text of a Parquet table, one encoded block per record batch."""
+    header = True
+    for batch in iter_batches(path):
+        buffer = io.StringIO()
+        batch.to_pandas().to_csv(buffer, header=header, index=False)
+        header = False
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _compressor(compression):
+    if compression == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    if compression == 'zstd' and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    raise ValueError(f"unsupported compression: {compression}")
+
+
+def payload_path(path, as_csv=False, compression=None):
+    """Where the payload of this version of ``path`` is encoded to."""
+    key = repr((fingerprint(path), as_csv, compression)).encode()
+    name = hashlib.blake2b(key, digest_size=8).hexdigest() + '-' + file_name(path, as_csv, compression)
+    return os.path.join(payload_dir(), name)
+
+
+def _encode(path, as_csv, compression):
+    blocks = iter_parquet_as_csv(path) if as_csv else iter_table_file(path)
+    compressor = _compressor(compression) if compression else None
+    target = payload_path(path, as_csv, compression)
+    with replacing(target) as tmp, open(tmp, 'wb') as f:
+        for block in blocks:
+            f.write(compressor.compress(block) if compressor else block)
+        if compressor:
+            f.write(compressor.flush())
+    return target
+
+
+def payload_file(path, as_csv=False, compression=None):
+    """Path of the encoded payload for ``path``; cached until the file changes."""
+    return _payloads.get(path, _encode, as_csv, compression)
+
+
+def payload(path, as_csv=False, compression=None):
+    """Bytes to serve for ``path``, read from its cached payload file."""
+    with open(payload_file(path, as_csv, compression), 'rb') as f:
+        return f.read()
+
+
+def file_name(path, as_csv=False, compression=None):
+    name = os.path.basename(path)
+    if as_csv:
+        name = os.path.splitext(name)[0] + '.csv'
+    return name + EXTENSIONS[compression]
+
+
+def mime_type(as_csv=False, compression=None):
+    if compression:
+        return MIME_TYPES[compression]
+    return 'text/csv' if as_csv else 'application/octet-stream'
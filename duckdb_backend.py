@@ -0,0 +1,236 @@
+"""DuckDB query backend for the report, over the cleaned Parquet files.
+
+The pandas path loads the cleaned tables (or the KPI cube built from them)
+into every Streamlit server process.  Here the same aggregations run as SQL
+in an in-process DuckDB database that scans the Parquet files (and the parts
+appended to them) directly:
+
+- only the referenced columns are read, and slicer filters are pushed into
+  the scan, so row groups whose statistics rule out a match are skipped;
+- ``memory_limit`` caps DuckDB's working memory and anything larger spills to
+  ``temp_directory``, so tables bigger than RAM can still be aggregated.
+
+Results are memoized per file version and filter state, like ``measures``.
+``python duckdb_backend.py --check`` compares every result with the pandas
+path on the current cleaned files.
+
+Needs the optional ``duckdb`` package.
+"""
+import argparse
+import math
+import os
+import threading
+from functools import lru_cache
+
+import pandas as pd
+
+from data_access import fingerprint
+from measures import DEFAULT_STATUS, FILTER_COLUMNS, _divide, filter_key
+from storage import CLEANED_APP_PATH, CLEANED_DIR, CLEANED_PREV_PATH, table_files
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+MEMORY_LIMIT = '1GB'
+TEMP_DIRECTORY = os.path.join(CLEANED_DIR, '.duckdb_tmp')
+
+_connection = None
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def available():
+    return duckdb is not None
+
+
+def connect():
+    """Cursor on the shared in-process database, one per thread."""
+    global _connection
+    if duckdb is None:
+        raise ImportError("the DuckDB backend needs the 'duckdb' package")
+    with _lock:
+        if _connection is None:
+            _connection = duckdb.connect(config={'memory_limit': MEMORY_LIMIT,
+                                                 'temp_directory': TEMP_DIRECTORY})
+    cursor = getattr(_local, 'cursor', None)
+    if cursor is None:
+        cursor = _local.cursor = _connection.cursor()
+    return cursor
+
+
+def _quote(col):
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _where(filters):
+    """SQL condition and parameters for ``{column: allowed values}``."""
+    conditions, params = [], []
+    for col, values in filters:
+        if col not in FILTER_COLUMNS:
+            raise ValueError(f"cannot filter on {col!r}")
+        conditions.append(f"{_quote(col)} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+    return ' AND '.join(conditions) or 'TRUE', params
+
+
+def _applicants(filters):
+    condition, params = _where(filters)
+    return f"(SELECT * FROM read_parquet(?) WHERE {condition})", params
+
+
+@lru_cache(maxsize=256)
+def _measures(app_version, prev_version, key):
+    applicants, params = _applicants(key)
+    prev_scope = "WHERE SK_ID_CURR IN (SELECT SK_ID_CURR FROM apps)" if key else ""
+    sql = f"""
+        WITH apps AS {applicants}
+        SELECT
+            (SELECT count(*) FROM apps),
+            (SELECT avg(AMT_INCOME_TOTAL) FROM apps),
+            (SELECT avg(AMT_CREDIT) FROM apps),
+            count(*),
+            count(*) FILTER (WHERE NAME_CONTRACT_STATUS = ?)
+        FROM read_parquet(?) {prev_scope}
+    """
+    row = connect().execute(sql, [table_files(app_version[0])] + params + [DEFAULT_STATUS, table_files(prev_version[0])]).fetchone()
+    total_apps, avg_income, avg_credit, total_prev, total_defaults = row
+    return {
+        'Total Applicants': int(total_apps),
+        'Total Previous Loans': int(total_prev),
+        'Total Defaults': int(total_defaults),
+        'Average Income': avg_income,
+        'Average Credit Amount': avg_credit,
+        'Loan Approval Rate': _divide(total_prev - total_defaults, total_prev),
+        'Default Rate': _divide(total_defaults, total_prev),
+    }
+
+
+def measures(filters=None, app_path=CLEANED_APP_PATH, prev_path=CLEANED_PREV_PATH):
+    """The ``measures.measures`` results, computed by DuckDB."""
+    return dict(_measures(fingerprint(app_path), fingerprint(prev_path), filter_key(filters)))
+
+
+@lru_cache(maxsize=256)
+def _breakdown(app_version, prev_version, by, key):
+    if by not in FILTER_COLUMNS:
+        raise ValueError(f"cannot group by {by!r}")
+    applicants, params = _applicants(key)
+    sql = f"""
+        WITH apps AS {applicants},
+        loans AS (
+            SELECT SK_ID_CURR, count(*) AS prev_loans,
+                   count(*) FILTER (WHERE NAME_CONTRACT_STATUS = ?) AS prev_refused
+            FROM read_parquet(?) GROUP BY SK_ID_CURR
+        )
+        SELECT apps.{_quote(by)} AS {_quote(by)}, count(*) AS applicants,
+               coalesce(sum(loans.prev_loans), 0) AS prev_loans,
+               coalesce(sum(loans.prev_refused), 0) AS prev_refused
+        FROM apps LEFT JOIN loans USING (SK_ID_CURR)
+        WHERE apps.{_quote(by)} IS NOT NULL
+        GROUP BY 1 ORDER BY 1
+    """
+    return connect().execute(sql, [table_files(app_version[0])] + params + [DEFAULT_STATUS, table_files(prev_version[0])]).df()
+
+
+def breakdown(by, filters=None, app_path=CLEANED_APP_PATH, prev_path=CLEANED_PREV_PATH):
+    """The ``kpi_cube.breakdown`` table, computed by DuckDB."""
+    grouped = _breakdown(fingerprint(app_path), fingerprint(prev_path), by,
+                         filter_key(filters)).set_index(by)
+    grouped = grouped.astype('int64')
+    grouped['refusal_rate'] = grouped['prev_refused'] / grouped['prev_loans'].where(grouped['prev_loans'] > 0)
+    return grouped
+
+
+@lru_cache(maxsize=64)
+def _options(version, col):
+    sql = f"SELECT DISTINCT {_quote(col)} FROM read_parquet(?) WHERE {_quote(col)} IS NOT NULL ORDER BY 1"
+    return tuple(row[0] for row in connect().execute(sql, [table_files(version[0])]).fetchall())
+
+
+def slicer_options(col, app_path=CLEANED_APP_PATH):
+    """Distinct non-null values of a slicer column."""
+    if col not in FILTER_COLUMNS:
+        raise ValueError(f"cannot filter on {col!r}")
+    return list(_options(fingerprint(app_path), col))
+
+
+def head(path, n=5):
+    """First ``n`` rows of a cleaned table."""
+    return connect().execute("SELECT * FROM read_parquet(?) LIMIT ?", [table_files(path), n]).df()
+
+
+# ------------------------
+# Parity with the pandas path
+# ------------------------
+def _same(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def check_parity(app_path=CLEANED_APP_PATH, prev_path=CLEANED_PREV_PATH, max_values=3):
+    """Compare measures, breakdowns and heads with pandas; returns the mismatches."""
+    from client_features import CLIENT_COLUMNS, add_client_features, previous_features, PREV_COLUMNS
+    from kpi_cube import breakdown as cube_breakdown, build_cube
+    from measures import compute_measures
+    from storage import read_cleaned, read_head
+
+    app_df = read_cleaned(app_path, columns=CLIENT_COLUMNS)
+    prev_df = read_cleaned(prev_path, columns=PREV_COLUMNS)
+    cube = build_cube(add_client_features(app_df, previous_features(prev_df)),
+                      prev_df['NAME_CONTRACT_STATUS'].astype('object'))
+
+    filter_sets = [{}]
+    for col in FILTER_COLUMNS:
+        values = slicer_options(col, app_path)[:max_values]
+        filter_sets += [{col: values[:1]}, {col: values}]
+    filter_sets.append({col: slicer_options(col, app_path)[:1] for col in FILTER_COLUMNS[:2]})
+
+    problems = []
+    for filters in filter_sets:
+        expected = compute_measures(app_df, prev_df, filters)
+        actual = measures(filters, app_path, prev_path)
+        for name, value in expected.items():
+            if not _same(value, actual[name]):
+                problems.append(f"{name} {filters}: pandas {value}, duckdb {actual[name]}")
+        for by in FILTER_COLUMNS:
+            expected = cube_breakdown(cube, by, filters)
+            actual = breakdown(by, filters, app_path, prev_path)
+            try:
+                pd.testing.assert_frame_equal(expected, actual, check_dtype=False, check_names=False,
+                                              check_index_type=False)
+            except AssertionError as e:
+                problems.append(f"breakdown by {by} {filters}: {str(e).splitlines()[0]}")
+
+    for path in (app_path, prev_path):
+        try:
+            pd.testing.assert_frame_equal(read_head(path), head(path), check_dtype=False,
+                                          check_categorical=False)
+        except AssertionError as e:
+            problems.append(f"head of {path}: {str(e).splitlines()[0]}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the cleaned datasets with DuckDB.")
+    parser.add_argument('--check', action='store_true', help="compare every result with the pandas path")
+    parser.add_argument('--app', default=CLEANED_APP_PATH)
+    parser.add_argument('--prev', default=CLEANED_PREV_PATH)
+    args = parser.parse_args(argv)
+
+    if args.check:
+        problems = check_parity(args.app, args.prev)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            parser.exit(1)
+        print("✅ DuckDB results match the pandas path.")
+    else:
+        for name, value in measures(app_path=args.app, prev_path=args.prev).items():
+            print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Median / mode / group-mode imputation with a reusable fitted state.
+
+``fit`` computes every fill value of a table at once: medians with a single
+``DataFrame.median`` call, modes and per-group modes from factorized codes and
+one ``bincount`` per column (no Python lambda per group).  ``transform`` fills
+group modes with one indexed lookup of the group key.  The fitted values can
+be saved as JSON and loaded again to clean later runs or new batches without
+recomputing them.
+
+Ties are broken like ``Series.mode().iloc[0]``: the smallest of the most
+frequent values wins.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def _to_python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _modes_by_code(values, groups=None):
+    """Mode of ``values`` within each group (or overall), from integer codes."""
+    codes, uniques = pd.factorize(values, sort=True)
+    if groups is None:
+        valid = codes >= 0
+        if not valid.any():
+            return None
+        return uniques[np.bincount(codes[valid]).argmax()]
+
+    group_codes, group_uniques = pd.factorize(groups, sort=True)
+    valid = (codes >= 0) & (group_codes >= 0)
+    n_values = len(uniques)
+    counts = np.bincount(group_codes[valid] * n_values + codes[valid],
+                         minlength=len(group_uniques) * n_values)
+    counts = counts.reshape(len(group_uniques), n_values)
+    # sort=True orders the codes by value, so argmax picks the smallest tie
+    best = counts.argmax(axis=1)
+    has_values = counts.max(axis=1) > 0
+    return {group_uniques[i]: uniques[best[i]] for i in np.flatnonzero(has_values)}
+
+
+def _fill(series, values):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        new = pd.Index(pd.unique(values[values.notna()])).difference(series.cat.categories)
+        if len(new):
+            series = series.cat.add_categories(new)
+    return series.fillna(values)
+
+
+class Imputer:
+    """Fill values for one table.
+
+    ``median_cols`` are filled with their median (``'numeric'`` means every
+    numeric column), ``mode_cols`` with their mode (``'text'`` means every text
+    or categorical column) and ``group_mode_cols`` maps a column to the column
+    whose groups supply its mode.
+    """
+
+    def __init__(self, median_cols=(), mode_cols=(), group_mode_cols=None):
+        self.median_cols = median_cols
+        self.mode_cols = mode_cols
+        self.group_mode_cols = dict(group_mode_cols or {})
+        self.medians = {}
+        self.modes = {}
+        self.group_modes = {}
+
+    def _columns(self, df, spec, dtypes):
+        if isinstance(spec, str):
+            return list(df.select_dtypes(include=dtypes).columns)
+        return [col for col in spec if col in df.columns]
+
+    def fit(self, df, profile=None):
+        """Fit on ``df``; medians and modes found in ``profile`` (see profiling.py) are reused."""
+        columns = profile['columns'] if profile else {}
+        median_cols = self._columns(df, self.median_cols, 'number')
+        known = {col: columns[col]['median'] for col in median_cols
+                 if columns.get(col, {}).get('median') is not None}
+        rest = [col for col in median_cols if col not in known]
+        medians = df[rest].median() if rest else pd.Series(dtype='float64')
+        medians = {**known, **medians.to_dict()}
+        self.medians = {col: float(medians[col]) for col in median_cols if pd.notna(medians[col])}
+
+        self.modes = {}
+        for col in self._columns(df, self.mode_cols, ['object', 'string', 'category']):
+            known = columns.get(col, {}).get('mode')
+            mode = known if known is not None else _modes_by_code(df[col])
+            if mode is not None:
+                self.modes[col] = _to_python(mode)
+
+        self.group_modes = {}
+        for col, by in self.group_mode_cols.items():
+            if col in df.columns and by in df.columns:
+                modes = _modes_by_code(df[col], df[by])
+                self.group_modes[col] = {_to_python(k): _to_python(v) for k, v in modes.items()}
+        return self
+
+    def transform(self, df):
+        df = df.fillna({col: value for col, value in self.medians.items() if col in df.columns})
+        for col, value in self.modes.items():
+            if col in df.columns:
+                df[col] = _fill(df[col], pd.Series(value, index=df.index))
+        for col, modes in self.group_modes.items():
+            by = self.group_mode_cols[col]
+            if col in df.columns and by in df.columns:
+                # one lookup of every row's group key; unseen groups stay null
+                positions = pd.Index(list(modes)).get_indexer(df[by])
+                values = np.asarray(list(modes.values()) + [None], dtype=object)[positions]
+                df[col] = _fill(df[col], pd.Series(values, index=df.index))
+        return df
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    # ------------------------
+    # FITTED STATE
+    # ------------------------
+
+    def state(self):
+        return {
+            'group_mode_cols': self.group_mode_cols,
+            'medians': self.medians,
+            'modes': self.modes,
+            # JSON object keys must be strings, so group keys are stored as pairs
+            'group_modes': {col: [[k, v] for k, v in modes.items()]
+                            for col, modes in self.group_modes.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        imputer = cls(group_mode_cols=state['group_mode_cols'])
+        imputer.medians = dict(state['medians'])
+        imputer.modes = dict(state['modes'])
+        imputer.group_modes = {col: {k: v for k, v in pairs}
+                               for col, pairs in state['group_modes'].items()}
+        return imputer
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.state(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_state(json.load(f))
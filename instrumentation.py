@@ -0,0 +1,220 @@
+"""Per-stage timing and memory records for cleaning runs.
+
+A ``RunReport`` appends one JSON line per stage to a run report file:
+
+    {"run_id": ..., "table": "application_data", "stage": "impute",
+     "wall_s": 0.14, "cpu_s": 0.14, "rss_mb": 412.0, "rss_delta_mb": 3.1,
+     "peak_rss_mb": 530.2, "process_peak_rss_mb": 611.8, "rows_in": 49999,
+     "cols_in": 73, "rows_out": 49999, "cols_out": 73, ...}
+
+``peak_rss_mb`` is the peak of the stage itself: on Linux the kernel's
+high-water mark (VmHWM) is reset when the stage starts, by writing to
+/proc/self/clear_refs, and read when it ends.  Where that is not possible it
+is null, and only ``process_peak_rss_mb``, the peak of the whole process so
+far, is recorded.
+
+With ``trace_memory`` the tracemalloc peak and net allocation of the stage
+are added; with ``profile`` every stage runs under cProfile and the profile of
+the slowest one is kept for ``dump_profile``.
+
+Code being measured only calls the module-level ``stage()``; it records into
+the active report and does nothing when there is none, so the cleaning
+functions work the same when called from other scripts.
+"""
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+import uuid
+
+import pandas as pd
+
+_active = None
+
+
+def rss_mb():
+    """Current resident set size of this process, or None where unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# highest high-water mark seen before a reset; the reset also lowers ru_maxrss
+_reset_peak = 0.0
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max(peak / 1024 / (1024 if os.uname().sysname == 'Darwin' else 1), _reset_peak)
+
+
+def high_water_mb():
+    """The kernel's RSS high-water mark for this process (VmHWM), or None where unavailable."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def reset_high_water():
+    """Reset VmHWM to the current RSS; returns the mark before the reset, or None if it cannot be reset."""
+    global _reset_peak
+    before = high_water_mb()
+    if before is None:
+        return None
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return None
+    _reset_peak = max(_reset_peak, before)
+    return before
+
+
+def _shape(df):
+    return df.shape if hasattr(df, 'shape') else (None, None)
+
+
+def _round(value, digits=1):
+    return None if value is None else round(value, digits)
+
+
+class StageRecord(dict):
+    def output(self, df):
+        """Record the shape of the stage's result."""
+        self['rows_out'], self['cols_out'] = _shape(df)
+        return df
+
+
+class RunReport:
+    """Collects stage records for one run and appends them to ``path`` (JSON lines)."""
+
+    def __init__(self, path, trace_memory=False, profile=False, run_id=None):
+        self.path = path
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self._hottest = None
+        # peak so far of every stage still open, outermost first
+        self._peaks = []
+
+    @contextlib.contextmanager
+    def stage(self, name, table=None, df=None):
+        record = StageRecord(run_id=self.run_id, table=table, stage=name, pid=os.getpid(),
+                             started=time.strftime('%Y-%m-%dT%H:%M:%S'))
+        record['rows_in'], record['cols_in'] = _shape(df)
+        record['rows_out'], record['cols_out'] = None, None
+
+        if self.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+        profiler = cProfile.Profile() if self.profile else None
+        # an enclosing stage keeps the peak it had reached before this one resets it
+        before = reset_high_water()
+        for peak in self._peaks:
+            peak[0] = None if before is None or peak[0] is None else max(peak[0], before)
+        peak = [0.0 if before is not None else None]
+        self._peaks.append(peak)
+        rss_before = rss_mb()
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            record['wall_s'] = round(time.perf_counter() - wall_start, 4)
+            record['cpu_s'] = round(time.process_time() - cpu_start, 4)
+            rss_after = rss_mb()
+            record['rss_mb'] = _round(rss_after)
+            record['rss_delta_mb'] = _round(rss_after - rss_before if rss_after is not None else None)
+            self._peaks.pop()
+            if peak[0] is not None:
+                peak[0] = max(peak[0], high_water_mb() or 0.0)
+                for outer in self._peaks:
+                    if outer[0] is not None:
+                        outer[0] = max(outer[0], peak[0])
+            record['peak_rss_mb'] = _round(peak[0])
+            record['process_peak_rss_mb'] = _round(peak_rss_mb())
+            if self.trace_memory:
+                traced, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                record['alloc_peak_mb'] = _round((peak - traced_before) / 1024 ** 2)
+                record['alloc_delta_mb'] = _round((traced - traced_before) / 1024 ** 2)
+            if profiler and (self._hottest is None or record['wall_s'] > self._hottest[0]['wall_s']):
+                self._hottest = (dict(record), profiler)
+            self._write(record)
+
+    def _write(self, record):
+        # one short append per line, so parallel workers can share the file
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def records(self):
+        """This run's records, including those written by worker processes."""
+        records = []
+        with open(self.path) as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get('run_id') == self.run_id:
+                    records.append(record)
+        return records
+
+    def summary(self):
+        columns = ['table', 'stage', 'wall_s', 'cpu_s', 'rss_delta_mb', 'peak_rss_mb',
+                   'process_peak_rss_mb', 'rows_in', 'cols_in', 'rows_out', 'cols_out']
+        if self.trace_memory:
+            columns += ['alloc_peak_mb', 'alloc_delta_mb']
+        return pd.DataFrame(self.records()).reindex(columns=columns)
+
+    def dump_profile(self, output_dir, top=20):
+        """Write the slowest stage's profile to ``output_dir``; returns its path."""
+        if self._hottest is None:
+            return None
+        record, profiler = self._hottest
+        path = os.path.join(output_dir, f"profile_{record['table']}_{record['stage']}.prof")
+        profiler.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(top)
+        print(f"🔥 Slowest stage: {record['table']}/{record['stage']} ({record['wall_s']} s)")
+        print(text.getvalue())
+        return path
+
+
+def activate(report):
+    """Make ``report`` receive the records of ``stage()`` in this process."""
+    global _active
+    _active = report
+    return report
+
+
+def active():
+    return _active
+
+
+@contextlib.contextmanager
+def stage(name, table=None, df=None):
+    """Measure the enclosed block as stage ``name`` of the active report, if any."""
+    if _active is None:
+        yield StageRecord()
+        return
+    with _active.stage(name, table, df) as record:
+        yield record
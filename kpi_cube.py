@@ -0,0 +1,152 @@
+"""Precomputed KPI cube behind the dashboard slicers.
+
+The slicers filter on CODE_GENDER, NAME_EDUCATION_TYPE, NAME_INCOME_TYPE and
+NAME_CONTRACT_TYPE.  Every measure in ``measures.py`` is a count, a sum or a
+ratio of sums, so it can be added up over the cells of a cube grouped by those
+four columns: a few hundred rows at most, whatever the number of applicants.
+A slicer change then filters the cube and sums it instead of rescanning the
+tables.
+
+Previous loans whose SK_ID_CURR is not among the cleaned applicants (their
+applicant was removed as an outlier) sit in one extra cell with empty
+dimensions.  It only counts when no slicer is set, which matches
+``measures.compute_measures``.
+
+``write_kpi_cube`` builds the cells of each row group of the client features
+and adds them up, so it never holds more than one row group of either table.
+After an incremental run ``update_kpi_cube`` adds the cells of the new and
+changed applicants and the new previous loans to the existing cube.
+"""
+import numpy as np
+import pandas as pd
+
+from client_features import CLIENT_COLUMNS
+from measures import DEFAULT_STATUS, FILTER_COLUMNS, _divide
+from storage import iter_row_groups, read_cleaned, write_cleaned
+
+DIMENSIONS = FILTER_COLUMNS
+
+SUM_COLUMNS = ['applicants', 'income_sum', 'income_count', 'credit_sum', 'credit_count',
+               'target_defaults', 'prev_loans', 'prev_refused']
+
+
+CUBE_INPUTS = CLIENT_COLUMNS + ['PREV_COUNT', 'PREV_REFUSED_COUNT']
+
+
+def cube_cells(clients):
+    """Cells of the applicants in ``clients``, without the unmatched loans."""
+    cube = clients.groupby(DIMENSIONS, observed=True, dropna=False, sort=True).agg(
+        applicants=('SK_ID_CURR', 'size'),
+        income_sum=('AMT_INCOME_TOTAL', 'sum'),
+        income_count=('AMT_INCOME_TOTAL', 'count'),
+        credit_sum=('AMT_CREDIT', 'sum'),
+        credit_count=('AMT_CREDIT', 'count'),
+        target_defaults=('TARGET', 'sum'),
+        prev_loans=('PREV_COUNT', 'sum'),
+        prev_refused=('PREV_REFUSED_COUNT', 'sum'),
+    ).reset_index()
+    for col in DIMENSIONS:
+        cube[col] = cube[col].astype('object')
+    return cube
+
+
+def merge_cells(*cells):
+    """Add up the cells of several cubes that share dimensions."""
+    cells = pd.concat(cells, ignore_index=True)
+    return cells.groupby(DIMENSIONS, dropna=False, sort=True)[SUM_COLUMNS].sum().reset_index()
+
+
+def finish_cube(cells, prev_loans, prev_refused):
+    """Cube from the applicant cells and the totals over every previous loan."""
+    unmatched = {col: None for col in DIMENSIONS}
+    unmatched.update(dict.fromkeys(SUM_COLUMNS, 0))
+    unmatched['prev_loans'] = prev_loans - int(cells['prev_loans'].sum())
+    unmatched['prev_refused'] = prev_refused - int(cells['prev_refused'].sum())
+    cube = pd.concat([cells, pd.DataFrame([unmatched])], ignore_index=True)
+    return cube.astype({col: 'int64' for col in SUM_COLUMNS if 'sum' not in col})
+
+
+def build_cube(clients, prev_status):
+    """Cube cells from the client features table and every previous loan's status."""
+    return finish_cube(cube_cells(clients), len(prev_status),
+                       int((prev_status == DEFAULT_STATUS).sum()))
+
+
+def prev_totals(prev_path):
+    """Previous loans and refused previous loans, counted one row group at a time."""
+    loans = refused = 0
+    for prev in iter_row_groups(prev_path, columns=['NAME_CONTRACT_STATUS']):
+        loans += len(prev)
+        refused += int((prev['NAME_CONTRACT_STATUS'].astype('object') == DEFAULT_STATUS).sum())
+    return loans, refused
+
+
+def changed_cells(changed):
+    """Cells that only move previous loans, from ``update_client_features``' changed clients."""
+    cells = changed.groupby(DIMENSIONS, observed=True, dropna=False, sort=True).agg(
+        prev_loans=('PREV_COUNT', 'sum'), prev_refused=('PREV_REFUSED_COUNT', 'sum')).reset_index()
+    for col in SUM_COLUMNS:
+        if col not in cells:
+            cells[col] = 0
+    for col in DIMENSIONS:
+        cells[col] = cells[col].astype('object')
+    return cells[DIMENSIONS + SUM_COLUMNS]
+
+
+def update_kpi_cube(output_path, added, changed, new_prev_paths):
+    """Add appended applicants (``added``), changed loan counts and new previous loans to the cube."""
+    cube = read_cleaned(output_path)
+    prev_loans, prev_refused = int(cube['prev_loans'].sum()), int(cube['prev_refused'].sum())
+    for path in new_prev_paths:
+        loans, refused = prev_totals(path)
+        prev_loans, prev_refused = prev_loans + loans, prev_refused + refused
+    # the last cell holds the unmatched loans (see ``finish_cube``); it is recomputed
+    cells = merge_cells(cube.iloc[:-1], cube_cells(added[CUBE_INPUTS]), changed_cells(changed))
+    cube = finish_cube(cells, prev_loans, prev_refused)
+    write_cleaned(cube, output_path)
+    return cube.shape
+
+
+def write_kpi_cube(features_path, prev_path, output_path):
+    cells = [cube_cells(clients) for clients in iter_row_groups(features_path, columns=CUBE_INPUTS)]
+    cells = cells or [cube_cells(read_cleaned(features_path, columns=CUBE_INPUTS))]
+    cube = finish_cube(merge_cells(*cells) if len(cells) > 1 else cells[0], *prev_totals(prev_path))
+    write_cleaned(cube, output_path)
+    return cube.shape
+
+
+def slice_cube(cube, filters=None):
+    """Cells matching ``{column: allowed values}``; an empty selection means no filter."""
+    mask = np.ones(len(cube), dtype=bool)
+    for col, values in (filters or {}).items():
+        if values:
+            mask &= cube[col].isin(list(values)).to_numpy()
+    return cube[mask]
+
+
+def dimension_values(cube, col):
+    """Sorted values of a slicer column, without the empty one."""
+    return sorted(cube[col].dropna().unique())
+
+
+def cube_measures(cube, filters=None):
+    """The ``measures.compute_measures`` results, summed from the cube."""
+    totals = slice_cube(cube, filters)[SUM_COLUMNS].sum()
+    total_prev, total_defaults = int(totals['prev_loans']), int(totals['prev_refused'])
+    return {
+        'Total Applicants': int(totals['applicants']),
+        'Total Previous Loans': total_prev,
+        'Total Defaults': total_defaults,
+        'Average Income': _divide(float(totals['income_sum']), totals['income_count']),
+        'Average Credit Amount': _divide(float(totals['credit_sum']), totals['credit_count']),
+        'Loan Approval Rate': _divide(total_prev - total_defaults, total_prev),
+        'Default Rate': _divide(total_defaults, total_prev),
+    }
+
+
+def breakdown(cube, by, filters=None):
+    """Applicants, previous loans and refusal rate per value of ``by``."""
+    cells = slice_cube(cube, filters).dropna(subset=[by])
+    grouped = cells.groupby(by, sort=True)[['applicants', 'prev_loans', 'prev_refused']].sum()
+    grouped['refusal_rate'] = grouped['prev_refused'] / grouped['prev_loans'].where(grouped['prev_loans'] > 0)
+    return grouped
@@ -1,7 +1,22 @@
+import os
+from functools import partial
+
 import streamlit as st
 import pandas as pd
-import base64
-from PIL import Image
+import plotly.graph_objects as go
+
+import assets
+import downloads
+import duckdb_backend
+import kpi_cube
+import report_loader
+from data_access import load_cleaned, load_cleaned_head
+from previews import load_preview, preview_head, sidecar_path
+from profiling import load_profile, observations, profile_path
+from shared_tables import manifest_path, shared_dir
+from storage import (
+    CLEANED_APP_PATH, CLEANED_PREV_PATH, DEFAULT_TREND_PATH, INCOME_CREDIT_GRID_PATH, KPI_CUBE_PATH,
+)
 
 # Configure page
 st.set_page_config(
@@ -70,12 +85,104 @@ def display_code_with_output(code, output=None):
             st.text(output)
     st.markdown('</div>', unsafe_allow_html=True)
 
-# Helper function for download links
-def get_binary_file_downloader_html(bin_file, file_label='File'):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    bin_str = base64.b64encode(data).decode()
-    return f'<a href="data:application/octet-stream;base64,{bin_str}" download="{bin_file}" style="color: #1f77b4; text-decoration: none; font-weight: bold;">⬇️ {file_label}</a>'
+# Download widgets: a file is only read and encoded once someone asks for it
+TABLE_FORMATS = [(False, None)] + [(True, compression) for compression in downloads.COMPRESSIONS]
+
+def format_label(fmt):
+    as_csv, compression = fmt
+    if not as_csv:
+        return "Parquet"
+    return f"CSV ({compression})" if compression else "CSV"
+
+def file_download(path, file_label='File', formats=((False, None),)):
+    if not os.path.exists(path):
+        st.caption(f"{file_label}: not available yet")
+        return
+    fmt = formats[0]
+    if len(formats) > 1:
+        fmt = st.selectbox(file_label, formats, format_func=format_label, key=f"format_{path}")
+    prepared = st.session_state.setdefault("prepared_downloads", set())
+    if (path, fmt) not in prepared:
+        if not st.button(f"⬇️ {file_label}", key=f"prepare_{path}"):
+            return
+        prepared.add((path, fmt))
+    as_csv, compression = fmt
+    name = downloads.file_name(path, as_csv, compression)
+    # a callable is only run when the button is clicked, so the bytes are not held per rerun
+    st.download_button(f"💾 Save {name}", data=lambda: downloads.payload(path, as_csv, compression),
+                       file_name=name, mime=downloads.mime_type(as_csv, compression),
+                       key=f"download_{path}")
+
+# Sample rows and column summary from the preview sidecar, when it is up to date
+def show_preview_details(preview):
+    if preview is None:
+        return
+    with st.expander(f"Random sample and column summary ({preview['rows']:,} rows)"):
+        st.dataframe(preview['sample'])
+        st.dataframe(preview['summary'])
+
+# Initial observations computed from the column profile the cleaning run writes,
+# or the hand-written ones until it exists
+def show_observations(profile, fallback):
+    bullets = observations(profile) if profile is not None else fallback
+    st.markdown("#### Initial Observations:\n" + "\n".join(f"- {bullet}" for bullet in bullets))
+
+# REPORT_BACKEND=duckdb queries the cleaned files with DuckDB instead of loading them
+BACKEND = os.environ.get('REPORT_BACKEND', 'pandas')
+if BACKEND == 'duckdb' and not duckdb_backend.available():
+    st.warning("duckdb is not installed; using the pandas backend.")
+    BACKEND = 'pandas'
+
+# Datasets and images load in background threads started by the session's first
+# run; the text renders right away and each section waits only on its own job
+RAW_DATA = {
+    "Application Data": ("DATASETS/application_data.csv", "application_data"),
+    "Previous Applications": ("DATASETS/previous_application.csv", "previous_application"),
+}
+
+def raw_preview(path, table):
+    return preview_head(path, table), load_preview(path), load_profile(path)
+
+def cleaned_head(path):
+    if BACKEND == 'duckdb':
+        return duckdb_backend.head(path, 5)
+    return load_cleaned_head(path, 5)
+
+def load_visuals():
+    return load_cleaned(INCOME_CREDIT_GRID_PATH), load_cleaned(DEFAULT_TREND_PATH)
+
+# Cleaned tables are read from the published version while there is one
+PUBLISHED = manifest_path(shared_dir(KPI_CUBE_PATH))
+
+# name -> (files the result depends on, loader, *args)
+JOBS = {
+    'kpi_cube': ([KPI_CUBE_PATH, PUBLISHED], load_cleaned, KPI_CUBE_PATH),
+    'screenshot': (["dashboard_screenshot.png"], assets.image, "dashboard_screenshot.png"),
+    'cleaned_head': ([CLEANED_APP_PATH, PUBLISHED], cleaned_head, CLEANED_APP_PATH),
+    'kpi_cards': (["kpi_cards.png"], assets.image, "kpi_cards.png", 350),
+    'visuals': ([INCOME_CREDIT_GRID_PATH, DEFAULT_TREND_PATH, PUBLISHED], load_visuals),
+}
+for label, (path, table) in RAW_DATA.items():
+    JOBS[label] = ([path, sidecar_path(path), profile_path(path)], raw_preview, path, table)
+
+def start(name):
+    paths, loader, *args = JOBS[name]
+    return report_loader.submit(name, paths, loader, *args)
+
+def wait(name):
+    future = start(name)
+    if not future.done():
+        with st.spinner("Loading..."):
+            return future.result()
+    return future.result()
+
+# Only the raw data tab that is open gets loaded up front
+startup = ['screenshot', 'cleaned_head', 'kpi_cards', 'visuals',
+           st.session_state.get('raw_data_tab', next(iter(RAW_DATA)))]
+if BACKEND == 'pandas':
+    startup.insert(0, 'kpi_cube')
+for name in startup:
+    start(name)
 
 # Dashboard Title
 st.markdown('<div class="header">Loan Risk Analytics Dashboard</div>', unsafe_allow_html=True)
@@ -86,7 +193,7 @@ st.markdown("""
 This report documents my complete process for building a Loan Risk Analytics Dashboard in Power BI.
 """)
 
-st.image(Image.open("dashboard_screenshot.png"), caption="Final Power BI Dashboard")
+st.image(wait('screenshot'), caption="Final Power BI Dashboard")
 
 st.markdown("""
 #### Objective
@@ -106,61 +213,112 @@ The project involved:
 # KPI Metrics Row
 st.markdown('<div class="section-header">Key Performance Indicators</div>', unsafe_allow_html=True)
 
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.markdown("""
-    <div class="metric-box">
-        <h3>Total Applicants</h3>
-        <h1>45,468</h1>
-    </div>
-    """, unsafe_allow_html=True)
-    
-with col2:
-    st.markdown("""
+def metric_box(title, value):
+    st.markdown(f"""
     <div class="metric-box">
-        <h3>Total Previous Loans</h3>
-        <h1>49,999</h1>
-    </div>
-    """, unsafe_allow_html=True)
-    
-with col3:
-    st.markdown("""
-    <div class="metric-box">
-        <h3>Loan Approval Rate</h3>
-        <h1>91.8%</h1>
+        <h3>{title}</h3>
+        <h1>{value}</h1>
     </div>
     """, unsafe_allow_html=True)
 
+def format_measure(value, kind='count'):
+    if value is None:
+        return "–"
+    if kind == 'rate':
+        return f"{value:.1%}"
+    if kind == 'amount':
+        return f"{value:,.0f}"
+    return f"{value:,}"
+
+# Slicers are served from the precomputed KPI cube: a change only re-sums a few hundred cells
+SLICERS = {
+    'CODE_GENDER': "Gender",
+    'NAME_EDUCATION_TYPE': "Education",
+    'NAME_INCOME_TYPE': "Income Type",
+    'NAME_CONTRACT_TYPE': "Contract Type",
+}
+
+kpis_ready = True
+if BACKEND == 'duckdb':
+    kpis_ready = os.path.exists(CLEANED_APP_PATH) and os.path.exists(CLEANED_PREV_PATH)
+    slicer_options = duckdb_backend.slicer_options
+    compute_kpis = duckdb_backend.measures
+    group_kpis = duckdb_backend.breakdown
+else:
+    try:
+        cube = wait('kpi_cube')
+        slicer_options = partial(kpi_cube.dimension_values, cube)
+        compute_kpis = partial(kpi_cube.cube_measures, cube)
+        group_kpis = partial(kpi_cube.breakdown, cube)
+    except FileNotFoundError:
+        kpis_ready = False
+if not kpis_ready:
+    st.info("Run loan_data_cleaning.py to compute the KPIs from the cleaned datasets.")
+
+if kpis_ready:
+    filters = {}
+    for col, slicer in zip(SLICERS, st.columns(len(SLICERS))):
+        with slicer:
+            filters[col] = st.multiselect(SLICERS[col], slicer_options(col), key=f"slicer_{col}")
+    kpis = compute_kpis(filters)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        metric_box("Total Applicants", format_measure(kpis['Total Applicants']))
+    with col2:
+        metric_box("Total Previous Loans", format_measure(kpis['Total Previous Loans']))
+    with col3:
+        metric_box("Loan Approval Rate", format_measure(kpis['Loan Approval Rate'], 'rate'))
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        metric_box("Total Defaults", format_measure(kpis['Total Defaults']))
+    with col2:
+        metric_box("Default Rate", format_measure(kpis['Default Rate'], 'rate'))
+    with col3:
+        metric_box("Average Income", format_measure(kpis['Average Income'], 'amount'))
+    with col4:
+        metric_box("Average Credit Amount", format_measure(kpis['Average Credit Amount'], 'amount'))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Applicants by Education**")
+        st.bar_chart(group_kpis('NAME_EDUCATION_TYPE', filters)['applicants'])
+    with col2:
+        st.markdown("**Previous-Loan Refusal Rate by Income Type**")
+        st.bar_chart(group_kpis('NAME_INCOME_TYPE', filters)['refusal_rate'])
+
 # Raw Data Section
 st.markdown('<div class="section-header">Raw Data Preview</div>', unsafe_allow_html=True)
 
-tab1, tab2 = st.tabs(["Application Data", "Previous Applications"])
+# Tabs rerun on switch, so a tab's data is only loaded once it is opened
+tab1, tab2 = st.tabs(list(RAW_DATA), key='raw_data_tab', on_change='rerun')
     
 with tab1:
     st.subheader("Application Data (Uncleaned)")
-    app_data = pd.read_csv("DATASETS/application_data.csv")
-    st.dataframe(app_data.head())
-    
-    st.markdown("""
-    #### Initial Observations:
-    - Many columns with >40% missing values
-    - Date fields in negative day counts
-    - Outliers in financial columns (income, credit amounts)
-    - Placeholder values (e.g., 365243 for DAYS_EMPLOYED)
-    """)
+    if tab1.open:
+        head, preview, profile = wait("Application Data")
+        st.dataframe(head)
+        show_preview_details(preview)
+        show_observations(profile, [
+            "Many columns with >40% missing values",
+            "Date fields in negative day counts",
+            "Outliers in financial columns (income, credit amounts)",
+            "Placeholder values (e.g., 365243 for DAYS_EMPLOYED)",
+        ])
 
 with tab2:
     st.subheader("Previous Applications (Uncleaned)")
-    prev_data = pd.read_csv("DATASETS/previous_application.csv")
-    st.dataframe(prev_data.head())
-    
-    st.markdown("""
-    #### Initial Observations:
-    - Inconsistent contract status values
-    - Missing values in financial columns
-    - Date fields needing conversion
-    - Need to merge with application data on SK_ID_CURR
-    """)
+    if tab2.open:
+        head, preview, profile = wait("Previous Applications")
+        st.dataframe(head)
+        show_preview_details(preview)
+        show_observations(profile, [
+            "Inconsistent contract status values",
+            "Missing values in financial columns",
+            "Date fields needing conversion",
+            "Need to merge with application data on SK_ID_CURR",
+        ])
 
 # Data Cleaning Section
 st.markdown('<div class="section-header">Data Cleaning Process</div>', unsafe_allow_html=True)
@@ -228,8 +386,7 @@ Cleaned previous_application shape: (49999, 43)
 display_code_with_output(cleaning_script, output_text)
 
 st.subheader("Cleaned Data Preview")
-cleaned_app = pd.read_csv("DATASETS/cleaned_datasets/cleaned_application_data.csv")
-st.dataframe(cleaned_app.head())
+st.dataframe(wait('cleaned_head'))
 
 st.markdown("""
 #### Key Cleaning Steps:
@@ -283,7 +440,7 @@ These measures power the dashboard's interactive visualizations and KPIs.
 st.markdown('<div class="section-header">Power BI Dashboard Components</div>', unsafe_allow_html=True)
 
 st.subheader("Dashboard Overview")
-st.image(Image.open("dashboard_screenshot.png"), caption="Complete Loan Risk Analytics Dashboard")
+st.image(wait('screenshot'), caption="Complete Loan Risk Analytics Dashboard")
 
 st.markdown("""
 ### Visual Breakdown
@@ -292,7 +449,7 @@ st.markdown("""
 col1, col2 = st.columns(2)
 
 with col1:
-    st.image(Image.open("kpi_cards.png"), width=350)
+    st.image(wait('kpi_cards'), width=350)
     st.markdown("""
     **KPI Cards**:
     - Top-level metrics
@@ -308,21 +465,43 @@ with col1:
     # - Interactive with slicers
     # """)
 
-# with col2:
-#     # st.image(Image.open("income_vs_credit.png"), width=350)
-#     # st.markdown("""
-#     # **Income vs Credit Scatter**:
-#     # - Shows relationship between income and loan amount
-#     # - Colored by loan status
-#     # - Reveals risk patterns
-#     # """)
-    
-#     # st.image(Image.open("default_trend.png"), width=350)
-#     # st.markdown("""
-#     # **Default Trend**:
-#     # - Shows defaults over time
-#     # - Helps identify seasonal patterns
-#     # """)
+# Both visuals are drawn from aggregates written by the cleaning run, so the
+# browser gets a fixed-size grid and one point per month whatever the row count
+def income_credit_figure(grid):
+    heat = grid.pivot_table(index='credit_low', columns='income_low', values='default_rate', aggfunc='first')
+    counts = grid.pivot_table(index='credit_low', columns='income_low', values='applicants', aggfunc='first')
+    income_width = (grid['income_high'] - grid['income_low']).iloc[0]
+    credit_width = (grid['credit_high'] - grid['credit_low']).iloc[0]
+    figure = go.Figure(go.Heatmap(
+        x=heat.columns + income_width / 2, y=heat.index + credit_width / 2, z=heat.to_numpy(),
+        customdata=counts.to_numpy(), colorscale='Reds', colorbar=dict(title="Default rate"),
+        hovertemplate="Income %{x:,.0f}<br>Credit %{y:,.0f}<br>Default rate %{z:.1%}"
+                      "<br>Applicants %{customdata:,.0f}<extra></extra>",
+    ))
+    figure.update_layout(xaxis_title="AMT_INCOME_TOTAL", yaxis_title="AMT_CREDIT",
+                         height=350, margin=dict(l=0, r=0, t=10, b=0))
+    return figure
+
+with col2:
+    try:
+        grid, trend = wait('visuals')
+    except FileNotFoundError:
+        st.info("Run loan_data_cleaning.py to build the Income vs Credit and Default Trend visuals.")
+    else:
+        st.plotly_chart(income_credit_figure(grid), width='stretch')
+        st.markdown("""
+        **Income vs Credit Scatter**:
+        - Shows relationship between income and loan amount
+        - Binned into a grid, colored by default rate
+        - Reveals risk patterns
+        """)
+
+        st.line_chart(trend.set_index('month')[['default_rate']], height=250)
+        st.markdown("""
+        **Default Trend**:
+        - Shows the share of refused previous loans per month of decision
+        - Helps identify seasonal patterns
+        """)
 
 st.subheader("Interactive Features")
 st.markdown("""
@@ -356,17 +535,17 @@ col1, col2, col3 = st.columns(3)
 
 with col1:
     st.markdown("**Power BI File**")
-    st.markdown(get_binary_file_downloader_html('Loan Risk Analytics Dashboard.pbix', 'Power BI File'), unsafe_allow_html=True)
+    file_download('Loan Risk Analytics Dashboard.pbix', 'Power BI File')
 
 with col2:
     st.markdown("**Cleaned Datasets**")
-    st.markdown(get_binary_file_downloader_html('DATASETS/cleaned_datasets/cleaned_application_data.csv', 'Application Data'), unsafe_allow_html=True)
-    st.markdown(get_binary_file_downloader_html('DATASETS/cleaned_datasets/cleaned_previous_application.csv', 'Previous Applications'), unsafe_allow_html=True)
+    file_download(CLEANED_APP_PATH, 'Application Data', TABLE_FORMATS)
+    file_download(CLEANED_PREV_PATH, 'Previous Applications', TABLE_FORMATS)
 
 with col3:
     st.markdown("**Python Scripts**")
-    st.markdown(get_binary_file_downloader_html('loan_data_cleaning.py', 'Cleaning Script'), unsafe_allow_html=True)
-    st.markdown(get_binary_file_downloader_html('loan_data-analytics_report.py', 'Script of this report'), unsafe_allow_html=True)
+    file_download('loan_data_cleaning.py', 'Cleaning Script')
+    file_download('loan_data-analytics_report.py', 'Script of this report')
 
 # Conclusion Section
 st.markdown('<div class="section-header">Conclusion</div>', unsafe_allow_html=True)
@@ -1,147 +1,516 @@
+import argparse
+import contextlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
+
+from cleaning_params import StaleParamsError, load_params, save_params, source_marker, unread_offset
+from client_features import build_client_features, update_client_features
+from dates import DaysConverter
+from imputation import Imputer
+from instrumentation import RunReport, activate, active, peak_rss_mb, stage
+from kpi_cube import update_kpi_cube, write_kpi_cube
+from outliers import MODES as OUTLIER_MODES, OutlierFilter
+from previews import write_preview
+from profiling import missing_columns, profile_frame, write_profile
+from schema import read_appended_rows, read_table
+from shared_tables import SHARED_SUBDIR, publish, withdraw
+from storage import append_cleaned, table_files, write_cleaned
+from visuals import update_visuals, write_visuals
 
 pd.options.mode.chained_assignment = None  # suppress SettingWithCopyWarning
 
 # File paths
-app_data_path = r"D:\cobalt\application_data.csv"
-prev_app_path = r"D:\cobalt\previous_application.csv"
-desc_path = r"D:\cobalt\columns_description.csv"
+app_data_path = os.path.join("DATASETS", "application_data.csv")
+prev_app_path = os.path.join("DATASETS", "previous_application.csv")
+output_dir = os.path.join("DATASETS", "cleaned_datasets")
 
 # ------------------------
-# LOAD DATA
+# CLEANING RULES
 # ------------------------
 
-print("🔄 Loading datasets...")
-app_df = pd.read_csv(app_data_path)
-prev_df = pd.read_csv(prev_app_path)
-desc_df = pd.read_csv(desc_path, encoding='latin1')  # fix for encoding error
-print("✅ Datasets loaded.\n")
+# Columns with a larger share of missing values than this are dropped
+MISSING_THRESHOLD = 0.4
 
-# ------------------------
-# HANDLE MISSING VALUES
-# ------------------------
+EXT_SOURCE_COLS = ['EXT_SOURCE_1', 'EXT_SOURCE_2', 'EXT_SOURCE_3']
+
+# Column to fill -> column whose groups supply the mode
+GROUP_MODE_FILLS = {
+    'OCCUPATION_TYPE': 'NAME_INCOME_TYPE',
+    'NAME_EDUCATION_TYPE': 'NAME_FAMILY_STATUS',
+}
 
-print("🔍 Handling missing values...")
+# Everything a full run learns, reused by incremental runs
+PARAMS_FILE = "cleaning_params.json"
+RUN_REPORT_FILE = "run_report.jsonl"
+TABLES = ('application_data', 'previous_application')
 
-# Drop columns with > 40% missing values
-missing_percent = app_df.isnull().mean().sort_values(ascending=False)
-to_drop = missing_percent[missing_percent > 0.4].index.tolist()
-app_df.drop(columns=to_drop, inplace=True)
-print(f"Dropped columns with >40% missing values: {to_drop}\n")
+# Filtered one after another, so the order matters
+OUTLIER_COLS = ['AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY', 'CNT_CHILDREN']
 
-# Fill EXT_SOURCE columns with median
-for col in ['EXT_SOURCE_1', 'EXT_SOURCE_2', 'EXT_SOURCE_3']:
-    if col in app_df.columns:
-        app_df[col].fillna(app_df[col].median(), inplace=True)
+# DAYS_* column -> converted date column
+APP_DATE_COLS = {'DAYS_BIRTH': 'BIRTH_DATE', 'DAYS_EMPLOYED': 'EMPLOYMENT_START_DATE',
+                 'DAYS_REGISTRATION': 'REGISTRATION_DATE', 'DAYS_ID_PUBLISH': 'ID_PUBLISH_DATE',
+                 'DAYS_LAST_PHONE_CHANGE': 'LAST_PHONE_CHANGE_DATE'}
 
-# Fill OCCUPATION_TYPE based on NAME_INCOME_TYPE
-if 'OCCUPATION_TYPE' in app_df.columns and 'NAME_INCOME_TYPE' in app_df.columns:
-    app_df['OCCUPATION_TYPE'] = app_df.groupby('NAME_INCOME_TYPE')['OCCUPATION_TYPE']\
-        .transform(lambda x: x.fillna(x.mode().iloc[0]) if not x.mode().empty else x)
+PREV_DATE_COLS = ['DAYS_FIRST_DRAWING', 'DAYS_FIRST_DUE', 'DAYS_LAST_DUE_1ST_VERSION',
+                  'DAYS_LAST_DUE', 'DAYS_TERMINATION', 'DAYS_DECISION']
 
-# Fill NAME_EDUCATION_TYPE based on NAME_FAMILY_STATUS
-if 'NAME_EDUCATION_TYPE' in app_df.columns and 'NAME_FAMILY_STATUS' in app_df.columns:
-    app_df['NAME_EDUCATION_TYPE'] = app_df.groupby('NAME_FAMILY_STATUS')['NAME_EDUCATION_TYPE']\
-        .transform(lambda x: x.fillna(x.mode().iloc[0]) if not x.mode().empty else x)
+reference_date = pd.to_datetime("2025-08-03")
 
-print("✅ Missing values handled.\n")
 
 # ------------------------
-# REMOVE OUTLIERS USING IQR
+# DATE CONVERSION
 # ------------------------
 
-print("📊 Removing outliers from numeric columns...")
+def date_converter(table, ref_date=None, epoch_days=False):
+    # 365243 and other values outside VALID_DAYS_RANGE become NaT
+    if table == 'application_data':
+        columns = APP_DATE_COLS
+    else:
+        columns = {col: col + '_ACTUAL' for col in PREV_DATE_COLS}
+    return DaysConverter(columns, reference_date if ref_date is None else ref_date,
+                         epoch_days=epoch_days)
 
-def remove_outliers(df, col):
-    Q1 = df[col].quantile(0.25)
-    Q3 = df[col].quantile(0.75)
-    IQR = Q3 - Q1
-    lower = Q1 - 1.5 * IQR
-    upper = Q3 + 1.5 * IQR
-    return df[(df[col] >= lower) & (df[col] <= upper)]
 
-numeric_cols = ['AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY', 'CNT_CHILDREN']
-for col in numeric_cols:
-    if col in app_df.columns:
-        before = len(app_df)
-        app_df = remove_outliers(app_df, col)
-        after = len(app_df)
-        print(f"{col}: removed {before - after} outliers")
+def convert_application_dates(app_df, ref_date=None):
+    return date_converter('application_data', ref_date).transform(app_df)
+
+
+def convert_previous_dates(prev_df, ref_date=None):
+    return date_converter('previous_application', ref_date).transform(prev_df)
 
-print("✅ Outliers removed.\n")
 
 # ------------------------
-# CONVERT DATE COLUMNS
+# CLEANING STEPS
 # ------------------------
+# Each step fits what ``params`` does not hold yet, stores it there and applies
+# it; the pipeline stages (pipeline.py) are built from the same steps.
 
-print("📆 Converting date columns...")
+def drop_missing_columns(df, params, profile=None, threshold=MISSING_THRESHOLD):
+    """Drop the columns with more than ``threshold`` missing values."""
+    if 'to_drop' not in params and profile is not None:
+        params['to_drop'] = missing_columns(profile, threshold)
+    elif 'to_drop' not in params:
+        missing_percent = df.isnull().mean().sort_values(ascending=False)
+        params['to_drop'] = missing_percent[missing_percent > threshold].index.tolist()
+    return df.drop(columns=params['to_drop'], errors='ignore')
 
-reference_date = pd.to_datetime("2025-08-03")
 
-# DAYS_BIRTH conversion
-app_df['BIRTH_DATE'] = reference_date + pd.to_timedelta(app_df['DAYS_BIRTH'], unit='D')
+def impute_missing(df, params, imputer, profile=None):
+    """Fill missing values; ``imputer`` is fitted unless ``params`` has one."""
+    if 'imputer' not in params:
+        params['imputer'] = imputer.fit(df, profile)
+    return params['imputer'].transform(df)
 
-# DAYS_EMPLOYED with filtering
-app_df['EMPLOYMENT_START_DATE'] = pd.NaT
-valid_emp = app_df['DAYS_EMPLOYED'].between(-30000, 30000)
-app_df.loc[valid_emp, 'EMPLOYMENT_START_DATE'] = reference_date + pd.to_timedelta(app_df.loc[valid_emp, 'DAYS_EMPLOYED'], unit='D')
 
-print("✅ Date fields converted.\n")
+def remove_outliers(df, params, columns=OUTLIER_COLS, mode='sequential', k=1.5):
+    """Drop the rows outside the IQR bounds; returns the frame and the rows removed per column."""
+    if 'outliers' not in params:
+        params['outliers'] = OutlierFilter(columns, mode, k).fit(df)
+    return params['outliers'].transform(df)
+
 
 # ------------------------
-# SAVE CLEANED application_data.csv
+# CLEAN application_data.csv
 # ------------------------
 
-output_app_path = r"D:\cobalt\cleaned_application_data.csv"
-app_df.to_csv(output_app_path, index=False)
-print(f"💾 Cleaned application data saved to: {output_app_path}\n")
+def application_imputer():
+    # EXT_SOURCE columns get their median, OCCUPATION_TYPE / NAME_EDUCATION_TYPE a group mode
+    return Imputer(median_cols=EXT_SOURCE_COLS, group_mode_cols=GROUP_MODE_FILLS)
 
-# ------------------------
-# CLEAN previous_application.csv
-# ------------------------
 
-print("🧼 Cleaning previous_application.csv...")
+def previous_imputer():
+    # numeric columns get their median, categorical columns their mode
+    return Imputer(median_cols='numeric', mode_cols='text')
+
+
+def clean_application_data(app_df, params=None, outlier_mode='sequential', ref_date=None, profile=None):
+    """Clean application_data and return it with the parameters used.
+
+    ``params`` may hold ``to_drop``, ``imputer`` and ``outliers`` from an
+    earlier run; whatever is missing is fitted on ``app_df``, reading the
+    null fractions, medians and modes from its ``profile`` if one is given.
+    """
+    params = dict(params or {})
+    print("🔍 Handling missing values...")
+
+    # Drop columns with > 40% missing values
+    with stage('drop_missing', 'application_data', app_df) as record:
+        app_df = record.output(drop_missing_columns(app_df, params, profile))
+    print(f"Dropped columns with >40% missing values: {params['to_drop']}\n")
 
-# Fill numerical missing values with median
-prev_df.fillna(prev_df.median(numeric_only=True), inplace=True)
+    # Fill EXT_SOURCE columns with median, OCCUPATION_TYPE based on NAME_INCOME_TYPE
+    # and NAME_EDUCATION_TYPE based on NAME_FAMILY_STATUS
+    with stage('impute', 'application_data', app_df) as record:
+        app_df = record.output(impute_missing(app_df, params, application_imputer(), profile))
 
-# Fill categorical missing values with mode
-for col in prev_df.select_dtypes(include='object'):
-    prev_df[col].fillna(prev_df[col].mode()[0], inplace=True)
+    print("✅ Missing values handled.\n")
 
-# Convert DAYS_* columns with overflow safety
-date_cols = ['DAYS_FIRST_DRAWING', 'DAYS_FIRST_DUE', 'DAYS_LAST_DUE_1ST_VERSION',
-             'DAYS_LAST_DUE', 'DAYS_TERMINATION', 'DAYS_DECISION']
+    print("📊 Removing outliers from numeric columns...")
+    with stage('outliers', 'application_data', app_df) as record:
+        app_df, removed = remove_outliers(app_df, params, mode=outlier_mode)
+        record.output(app_df)
+    for col, n in removed.items():
+        print(f"{col}: removed {n} outliers")
+    print("✅ Outliers removed.\n")
 
-for col in date_cols:
-    if col in prev_df.columns:
-        new_col = col + '_ACTUAL'
-        prev_df[new_col] = pd.NaT
-        valid_mask = prev_df[col].between(-30000, 30000)
-        prev_df.loc[valid_mask, new_col] = reference_date + pd.to_timedelta(prev_df.loc[valid_mask, col], unit='D')
+    print("📆 Converting date columns...")
+    with stage('dates', 'application_data', app_df) as record:
+        app_df = record.output(convert_application_dates(app_df, ref_date))
+    print("✅ Date fields converted.\n")
+    return app_df, params
 
-print("✅ previous_application.csv cleaned.\n")
 
 # ------------------------
-# SAVE CLEANED previous_application.csv
+# CLEAN previous_application.csv
 # ------------------------
 
-output_prev_path = r"D:\cobalt\cleaned_previous_application.csv"
-prev_df.to_csv(output_prev_path, index=False)
-print(f"💾 Cleaned previous application data saved to: {output_prev_path}\n")
+def clean_previous_application(prev_df, params=None, ref_date=None, profile=None):
+    params = dict(params or {})
+    print("🧼 Cleaning previous_application.csv...")
+
+    # Fill numerical missing values with median, categorical ones with mode
+    with stage('impute', 'previous_application', prev_df) as record:
+        prev_df = record.output(impute_missing(prev_df, params, previous_imputer(), profile))
+
+    # Convert DAYS_* columns with overflow safety
+    with stage('dates', 'previous_application', prev_df) as record:
+        prev_df = record.output(convert_previous_dates(prev_df, ref_date))
+
+    print("✅ previous_application.csv cleaned.\n")
+    return prev_df, params
+
 
 # ------------------------
-# OPTIONAL: Summary Report
+# RUN MODES
 # ------------------------
 
-print("📋 Final Summary:")
-print(f"Cleaned application_data shape: {app_df.shape}")
-print(f"Cleaned previous_application shape: {prev_df.shape}")
-print("🟢 Step 1 (Data Cleaning & Preparation) complete.")
+def clean_table(table, args, paths, reuse):
+    """Full clean of one table; returns its output shape and fitted parameters.
+
+    ``reuse`` maps a table to parameters kept from an earlier run, if any.
+    """
+    path, output_path = paths[table], paths['output_' + table]
+    params = reuse.get(table)
+    if args.engine == 'polars':
+        from polars_backend import polars_clean_application_data, polars_clean_previous_application
+
+        if table == 'application_data':
+            shape, params = polars_clean_application_data(path, output_path, csv=args.csv, params=params,
+                                                          outlier_mode=args.outlier_mode)
+        else:
+            shape, params = polars_clean_previous_application(path, output_path, csv=args.csv,
+                                                              params=params)
+    elif args.stream:
+        from streaming import stream_clean_application_data, stream_clean_previous_application
+
+        if table == 'application_data':
+            shape, params = stream_clean_application_data(path, output_path, args.chunksize,
+                                                          csv=args.csv, params=params,
+                                                          outlier_mode=args.outlier_mode)
+        else:
+            shape, params = stream_clean_previous_application(path, output_path, args.chunksize,
+                                                              csv=args.csv, params=params)
+    else:
+        print(f"🔄 Loading {table}...")
+        with stage('load', table) as record:
+            df = record.output(read_table(path, table))
+        print("✅ Dataset loaded.\n")
+
+        # small sidecar for the report's "Raw Data Preview" tabs
+        with stage('preview', table, df):
+            write_preview(path, df)
+
+        # column profile, read by the cleaning rules below and the report
+        with stage('profile', table, df):
+            profile = profile_frame(df)
+            write_profile(path, profile, table)
+
+        if table == 'application_data':
+            df, params = clean_application_data(df, params, args.outlier_mode, profile=profile)
+        else:
+            df, params = clean_previous_application(df, params, profile=profile)
+        with stage('write', table, df):
+            write_cleaned(df, output_path, csv=args.csv)
+        shape = df.shape
+    print(f"💾 Cleaned {table} saved to: {output_path}\n")
+    return shape, params
+
+
+def append_table(table, args, paths, saved):
+    """Clean the rows appended to one table; returns its new shape and source marker."""
+    offset = unread_offset(paths[table], saved[table]['source'])
+    with stage('read_appended', table) as record:
+        new_rows = record.output(read_appended_rows(paths[table], table, offset))
+    print(f"🆕 {table}: {len(new_rows)} new rows")
+    cleaned = new_rows
+    if len(new_rows):
+        clean = clean_application_data if table == 'application_data' else clean_previous_application
+        table_params = {k: v for k, v in saved[table].items() if k != 'source'}
+        cleaned, _ = clean(new_rows, table_params, ref_date=pd.to_datetime(saved['reference_date']))
+    with stage('append', table, cleaned):
+        shape = append_cleaned(cleaned, paths['output_' + table])
+    print(f"💾 Appended {len(cleaned)} rows to: {paths['output_' + table]}\n")
+    return shape, source_marker(paths[table], offset + new_rows.attrs['bytes_read'])
+
+
+def _captured(report, task, *task_args):
+    activate(report)
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        result = task(*task_args)
+    return buffer.getvalue(), result
+
+
+def run_tables(task, args, *task_args):
+    """``task(table, args, ...)`` for every table, on up to ``args.jobs`` processes.
+
+    The tables are cleaned independently of each other, so the results are the
+    same as a serial run; each worker's log is printed once it is done, in
+    table order.
+    """
+    if args.jobs <= 1:
+        return [task(table, args, *task_args) for table in TABLES]
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(_captured, active(), task, table, args, *task_args)
+                   for table in TABLES]
+        results = []
+        for future in futures:
+            output, result = future.result()
+            print(output, end='')
+            results.append(result)
+    return results
+
+
+def run_full(args, paths, saved=None):
+    """Fit on every row and rewrite the cleaned outputs."""
+    reuse = {}
+    if args.reuse_fill_values:
+        reuse = {table: {'imputer': saved[table]['imputer']} for table in TABLES}
+    sources = {table: source_marker(paths[table]) for table in TABLES}
+
+    results = run_tables(clean_table, args, paths, reuse)
+    params = {'reference_date': str(reference_date.date())}
+    for table, (_, table_params) in zip(TABLES, results):
+        params[table] = {**table_params, 'source': sources[table]}
+    return params, results[0][0], results[1][0]
+
+
+def run_incremental(args, paths, saved):
+    """Clean only the rows appended since the last run, with the saved parameters.
+
+    Nothing is refitted, so the appended rows are cleaned exactly as they would
+    have been by the run that saved the parameters.  The new rows are added
+    to the cleaned tables as part files; a CSV copy is kept in step if one
+    exists.  Also returns the part files this run added, per table.
+    """
+    before = {table: len(table_files(paths['output_' + table])) for table in TABLES}
+    results = run_tables(append_table, args, paths, saved)
+    for table, (_, source) in zip(TABLES, results):
+        saved[table]['source'] = source
+    new_parts = {table: table_files(paths['output_' + table])[before[table]:] for table in TABLES}
+    return saved, results[0][0], results[1][0], new_parts
+
+
+def output_paths(output_dir):
+    """Every file a run writes to ``output_dir``, keyed like ``paths``."""
+    return {
+        'output_application_data': os.path.join(output_dir, "cleaned_application_data.parquet"),
+        'output_previous_application': os.path.join(output_dir, "cleaned_previous_application.parquet"),
+        'output_client_features': os.path.join(output_dir, "client_features.parquet"),
+        'output_kpi_cube': os.path.join(output_dir, "kpi_cube.parquet"),
+        'output_income_credit_grid': os.path.join(output_dir, "income_credit_grid.parquet"),
+        'output_default_trend': os.path.join(output_dir, "default_trend.parquet"),
+    }
+
+
+def build_derived(paths, output_dir, publish_tables=True):
+    """Rebuild everything the report reads from the two cleaned tables."""
+    # previous loans aggregated per applicant, so the dashboard reads one narrow table
+    with stage('client_features', 'client_features') as record:
+        record['rows_out'], record['cols_out'] = build_client_features(
+            paths['output_application_data'], paths['output_previous_application'],
+            paths['output_client_features'])
+    print(f"💾 Per-client features saved to: {paths['output_client_features']}\n")
+    with stage('kpi_cube', 'kpi_cube') as record:
+        record['rows_out'], record['cols_out'] = write_kpi_cube(
+            paths['output_client_features'], paths['output_previous_application'],
+            paths['output_kpi_cube'])
+    print(f"💾 KPI cube saved to: {paths['output_kpi_cube']}\n")
+    with stage('visuals', 'visuals'):
+        grid_shape, trend_shape = write_visuals(
+            paths['output_client_features'], paths['output_previous_application'],
+            paths['output_income_credit_grid'], paths['output_default_trend'])
+    print(f"💾 Income vs Credit grid ({grid_shape[0]} cells) and default trend "
+          f"({trend_shape[0]} months) saved to: {output_dir}\n")
+    publish_outputs(paths, output_dir, publish_tables)
+
+
+def update_derived(paths, new_parts, output_dir, publish_tables=True):
+    """Bring the derived tables up to date with the part files of an incremental run.
+
+    Only the clients and loans in the new parts are aggregated; the result is
+    the same as ``build_derived`` over the extended tables.
+    """
+    derived = ['output_client_features', 'output_kpi_cube', 'output_income_credit_grid',
+               'output_default_trend']
+    if not all(os.path.exists(paths[key]) for key in derived):
+        return build_derived(paths, output_dir, publish_tables)
+    with stage('client_features', 'client_features') as record:
+        (record['rows_out'], record['cols_out']), added, changed = update_client_features(
+            paths['output_client_features'], paths['output_previous_application'],
+            new_parts['application_data'], new_parts['previous_application'])
+    print(f"💾 Per-client features: {len(added)} new and {len(changed)} updated clients in: "
+          f"{paths['output_client_features']}\n")
+    with stage('kpi_cube', 'kpi_cube') as record:
+        record['rows_out'], record['cols_out'] = update_kpi_cube(
+            paths['output_kpi_cube'], added, changed, new_parts['previous_application'])
+    print(f"💾 KPI cube updated: {paths['output_kpi_cube']}\n")
+    with stage('visuals', 'visuals'):
+        grid_shape, trend_shape = update_visuals(
+            paths['output_client_features'], paths['output_income_credit_grid'],
+            paths['output_default_trend'], added, new_parts['previous_application'])
+    print(f"💾 Income vs Credit grid ({grid_shape[0]} cells) and default trend "
+          f"({trend_shape[0]} months) updated in: {output_dir}\n")
+    publish_outputs(paths, output_dir, publish_tables)
+
+
+def publish_outputs(paths, output_dir, publish_tables=True):
+    # uncompressed Arrow copies the report's processes map and share, swapped in atomically
+    if publish_tables:
+        with stage('publish', 'shared'):
+            manifest = publish([path for key, path in paths.items() if key.startswith('output_')],
+                               os.path.join(output_dir, SHARED_SUBDIR))
+        print(f"🔗 Memory-mapped tables {manifest['version']} published to: "
+              f"{os.path.join(output_dir, SHARED_SUBDIR)}\n")
+    else:
+        # an older published set would keep masking the tables just written
+        withdraw(os.path.join(output_dir, SHARED_SUBDIR))
+
+
+def report_param_changes(saved, params):
+    """What a refit changed compared with the saved parameters."""
+    old, new = saved['application_data'], params['application_data']
+    added = sorted(set(new['to_drop']) - set(old['to_drop']))
+    kept = sorted(set(old['to_drop']) - set(new['to_drop']))
+    print(f"🔁 Refit: newly dropped columns {added}, no longer dropped {kept}")
+    for col, (low, high) in new['outliers'].bounds.items():
+        old_low, old_high = old['outliers'].bounds.get(col, (None, None))
+        print(f"   {col}: bounds {old_low} .. {old_high} -> {low} .. {high}")
+    for table in TABLES:
+        old_imputer, new_imputer = saved[table]['imputer'], params[table]['imputer']
+        changed = [col for kind in ('medians', 'modes', 'group_modes')
+                   for col, value in getattr(new_imputer, kind).items()
+                   if value != getattr(old_imputer, kind).get(col)]
+        print(f"   {table}: fill values changed for {changed}")
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean the loan application datasets.")
+    parser.add_argument('command', nargs='?', default='full', choices=['full', 'incremental', 'refit'],
+                        help="full: fit and clean every row (default); incremental: clean only rows "
+                             "appended since the last run with the saved parameters; refit: "
+                             "explicitly refit the parameters on every row and rebuild the outputs")
+    parser.add_argument('--app-data', default=app_data_path)
+    parser.add_argument('--prev-data', default=prev_app_path)
+    parser.add_argument('--output-dir', default=output_dir)
+    parser.add_argument('--stream', action='store_true',
+                        help="clean in two passes over CSV chunks with bounded memory")
+    parser.add_argument('--engine', choices=['pandas', 'polars'], default='pandas',
+                        help="polars: run each table's cleaning as one lazy, multithreaded Polars "
+                             "query that streams into the Parquet output (needs polars)")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help=f"clean the tables in parallel on up to this many processes "
+                             f"(at most {len(TABLES)}, one per table)")
+    parser.add_argument('--chunksize', type=int, default=100_000,
+                        help="rows per chunk in --stream mode")
+    parser.add_argument('--csv', action='store_true',
+                        help="also write CSV copies next to the Parquet outputs")
+    parser.add_argument('--outlier-mode', choices=OUTLIER_MODES, default='sequential',
+                        help="sequential: each column's IQR over the rows left by the previous "
+                             "columns (original behaviour); simultaneous: all IQRs over the same rows")
+    parser.add_argument('--reuse-fill-values', action='store_true',
+                        help=f"fill missing values with the medians and modes saved in {PARAMS_FILE} "
+                             "instead of recomputing them")
+    parser.add_argument('--run-report', default=None,
+                        help=f"JSON-lines file the per-stage timings and memory are appended to "
+                             f"(default: {RUN_REPORT_FILE} in the output directory)")
+    parser.add_argument('--summary', action='store_true',
+                        help="print a table of the per-stage measurements at the end")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="also record tracemalloc allocations per stage (slower)")
+    parser.add_argument('--profile', action='store_true',
+                        help="run every stage under cProfile and dump the slowest one's profile")
+    parser.add_argument('--no-publish', action='store_true',
+                        help="do not publish the outputs as memory-mapped Arrow files for the report")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+
+    if args.engine == 'polars' and args.stream:
+        parser.error("--stream applies to the pandas engine; the polars engine always streams its output")
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.jobs > len(TABLES):
+        # each table is one task, so further processes would only sit idle
+        print(f"ℹ️ --jobs {args.jobs}: only {len(TABLES)} tables run in parallel, using --jobs {len(TABLES)}\n")
+        args.jobs = len(TABLES)
+    if args.profile and args.jobs > 1:
+        print("ℹ️ --profile runs the tables one after the other (--jobs 1)\n")
+        args.jobs = 1
+    report = activate(RunReport(args.run_report or os.path.join(args.output_dir, RUN_REPORT_FILE),
+                                trace_memory=args.trace_memory, profile=args.profile))
+    paths = {
+        'application_data': args.app_data,
+        'previous_application': args.prev_data,
+        **output_paths(args.output_dir),
+    }
+    params_path = os.path.join(args.output_dir, PARAMS_FILE)
+    saved = None
+    if args.command != 'full' or args.reuse_fill_values:
+        if not os.path.exists(params_path):
+            parser.exit(1, f"❌ {params_path} not found; run a full clean first\n")
+        saved = load_params(params_path)
+
+    if args.command == 'incremental':
+        try:
+            params, app_shape, prev_shape, new_parts = run_incremental(args, paths, saved)
+        except StaleParamsError as e:
+            parser.exit(1, f"❌ {e}\n")
+        update_derived(paths, new_parts, args.output_dir, publish_tables=not args.no_publish)
+    else:
+        params, app_shape, prev_shape = run_full(args, paths, saved)
+        if args.command == 'refit':
+            report_param_changes(saved, params)
+        build_derived(paths, args.output_dir, publish_tables=not args.no_publish)
+
+    save_params(params_path, params)
+    print(f"💾 Cleaning parameters saved to: {params_path}\n")
+
+    # ------------------------
+    # OPTIONAL: Summary Report
+    # ------------------------
+
+    print("📋 Final Summary:")
+    print(f"Cleaned application_data shape: {app_shape}")
+    print(f"Cleaned previous_application shape: {prev_shape}")
+    print(f"Wall time: {time.perf_counter() - start:.1f} s ({args.jobs} job(s))")
+    if args.stream and peak_rss_mb() is not None:
+        print(f"Peak RSS: {peak_rss_mb():.0f} MB")
+    print(f"Stage report ({report.run_id}) appended to: {report.path}")
+    if args.summary:
+        print(report.summary().to_string(index=False))
+    if args.profile:
+        print(f"💾 Profile saved to: {report.dump_profile(args.output_dir)}")
+    print("🟢 Step 1 (Data Cleaning & Preparation) complete.")
+
+
+if __name__ == "__main__":
+    main()
 
 
 #output::::
@@ -408,4 +777,4 @@ print("🟢 Step 1 (Data Cleaning & Preparation) complete.")
 # >> 📋 Final Summary:
 # >> Cleaned application_data shape: (45468, 75)
 # >> Cleaned previous_application shape: (49999, 43)
-# >> 🟢 Step 1 (Data Cleaning & Preparation) complete.
\ No newline at end of file
+# >> 🟢 Step 1 (Data Cleaning & Preparation) complete.
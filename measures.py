@@ -0,0 +1,91 @@
+"""Python versions of the dashboard's DAX measures.
+
+Each measure is a vectorized aggregation over the cleaned tables, with the
+same definitions as the ``dax_measures`` shown in the report:
+
+    Total Applicants       COUNTROWS(Applicants)
+    Total Previous Loans   COUNTROWS(PreviousLoans)
+    Total Defaults         previous loans with NAME_CONTRACT_STATUS = "Refused"
+    Average Income         AVERAGE(Applicants[AMT_INCOME_TOTAL])
+    Average Credit Amount  AVERAGE(Applicants[AMT_CREDIT])
+    Loan Approval Rate     (Total Previous Loans - Total Defaults) / Total Previous Loans
+    Default Rate           Total Defaults / Total Previous Loans
+
+Filters act on applicant columns and reach the previous loans through
+SK_ID_CURR, like the Applicants -> PreviousLoans relationship in the Power BI
+model.  Results are memoized per dataset version and filter state.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from data_access import fingerprint, load_cleaned
+from shared_tables import published_version
+from storage import CLEANED_APP_PATH, CLEANED_PREV_PATH
+
+# Applicant columns the dashboard can filter on
+FILTER_COLUMNS = ['CODE_GENDER', 'NAME_EDUCATION_TYPE', 'NAME_INCOME_TYPE', 'NAME_CONTRACT_TYPE']
+
+APP_COLUMNS = ['SK_ID_CURR', 'AMT_INCOME_TOTAL', 'AMT_CREDIT'] + FILTER_COLUMNS
+PREV_COLUMNS = ['SK_ID_CURR', 'NAME_CONTRACT_STATUS']
+
+DEFAULT_STATUS = 'Refused'
+
+
+def _divide(numerator, denominator):
+    # DIVIDE() returns blank rather than failing on zero
+    return numerator / denominator if denominator else None
+
+
+def _mean(series):
+    return float(series.mean()) if len(series) else None
+
+
+def apply_filters(app_df, filters):
+    """Rows of ``app_df`` matching ``{column: allowed values}``.
+
+    An empty selection means no filter, as with an untouched slicer.
+    """
+    mask = np.ones(len(app_df), dtype=bool)
+    for col, values in (filters or {}).items():
+        if values:
+            mask &= app_df[col].isin(list(values)).to_numpy()
+    return app_df[mask]
+
+
+def compute_measures(app_df, prev_df, filters=None):
+    filters = {col: values for col, values in (filters or {}).items() if values}
+    if filters:
+        app_df = apply_filters(app_df, filters)
+        prev_df = prev_df[prev_df['SK_ID_CURR'].isin(app_df['SK_ID_CURR']).to_numpy()]
+
+    total_prev = len(prev_df)
+    total_defaults = int((prev_df['NAME_CONTRACT_STATUS'] == DEFAULT_STATUS).sum())
+    return {
+        'Total Applicants': len(app_df),
+        'Total Previous Loans': total_prev,
+        'Total Defaults': total_defaults,
+        'Average Income': _mean(app_df['AMT_INCOME_TOTAL']),
+        'Average Credit Amount': _mean(app_df['AMT_CREDIT']),
+        'Loan Approval Rate': _divide(total_prev - total_defaults, total_prev),
+        'Default Rate': _divide(total_defaults, total_prev),
+    }
+
+
+def filter_key(filters):
+    """Hashable, order-independent form of a filter state."""
+    return tuple(sorted((col, tuple(sorted(map(str, values))))
+                        for col, values in (filters or {}).items() if values))
+
+
+@lru_cache(maxsize=256)
+def _memoized(app_version, prev_version, published, key):
+    app_df = load_cleaned(app_version[0], columns=APP_COLUMNS)
+    prev_df = load_cleaned(prev_version[0], columns=PREV_COLUMNS)
+    return compute_measures(app_df, prev_df, dict(key))
+
+
+def measures(filters=None, app_path=CLEANED_APP_PATH, prev_path=CLEANED_PREV_PATH):
+    """All measures for the current cleaned files under ``filters``."""
+    published = published_version(app_path), published_version(prev_path)
+    return dict(_memoized(fingerprint(app_path), fingerprint(prev_path), published, filter_key(filters)))
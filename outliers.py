@@ -0,0 +1,97 @@
+"""IQR outlier filtering over several columns with one combined mask.
+
+Two semantics are supported:
+
+- ``'sequential'`` reproduces the original script: each column's quartiles
+  are taken over the rows that survived the columns before it, so the result
+  depends on the column order.
+- ``'simultaneous'`` takes every column's quartiles over the same rows with
+  one ``DataFrame.quantile`` call, independent of the order.
+
+Either way the frame is copied once, when the combined mask is applied, and
+the per-column drop counts come out of the same boolean matrix.
+"""
+import numpy as np
+
+MODES = ('sequential', 'simultaneous')
+
+
+def iqr_bounds(q1, q3, k=1.5):
+    iqr = q3 - q1
+    return q1 - k * iqr, q3 + k * iqr
+
+
+class OutlierFilter:
+    """IQR bounds for ``columns``, fitted once and applied to any frame."""
+
+    def __init__(self, columns, mode='sequential', k=1.5, bounds=None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.columns = list(columns)
+        self.mode = mode
+        self.k = k
+        self.bounds = dict(bounds or {})
+
+    def fit(self, df):
+        columns = [col for col in self.columns if col in df.columns]
+        self.bounds = {}
+        if self.mode == 'simultaneous':
+            quartiles = df[columns].quantile([0.25, 0.75])
+            for col in columns:
+                self.bounds[col] = iqr_bounds(quartiles.at[0.25, col], quartiles.at[0.75, col], self.k)
+            return self
+
+        # sequential: narrow the row mask column by column, without copying the frame
+        keep = np.ones(len(df), dtype=bool)
+        for col in columns:
+            values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+            q1, q3 = np.nanquantile(values[keep], [0.25, 0.75])
+            self.bounds[col] = iqr_bounds(q1, q3, self.k)
+            low, high = self.bounds[col]
+            keep &= (values >= low) & (values <= high)
+        return self
+
+    def within(self, df):
+        """Boolean matrix (rows x fitted columns): value inside its bounds."""
+        columns = list(self.bounds)
+        values = df[columns].to_numpy(dtype='float64', na_value=np.nan)
+        lower = np.array([self.bounds[col][0] for col in columns])
+        upper = np.array([self.bounds[col][1] for col in columns])
+        # NaN compares False, so missing values are dropped like in the original filter
+        return (values >= lower) & (values <= upper)
+
+    def mask(self, df):
+        """Rows to keep, and the number of rows each column removed.
+
+        Sequential counts attribute a row to the first column it fails, like
+        filtering one column after another; simultaneous counts include every
+        column a row fails.
+        """
+        columns = list(self.bounds)
+        if not columns:
+            # nothing fitted, e.g. every outlier column was dropped: keep every row
+            return np.ones(len(df), dtype=bool), {}
+        within = self.within(df)
+        keep = within.all(axis=1)
+        if self.mode == 'sequential':
+            first_fail = np.argmin(within[~keep], axis=1)
+            counts = np.bincount(first_fail, minlength=len(columns))
+        else:
+            counts = (~within).sum(axis=0)
+        return keep, dict(zip(columns, counts.tolist()))
+
+    def transform(self, df):
+        keep, removed = self.mask(df)
+        return df[keep], removed
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def state(self):
+        return {'columns': self.columns, 'mode': self.mode, 'k': self.k,
+                'bounds': {col: list(bounds) for col, bounds in self.bounds.items()}}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state['columns'], state['mode'], state['k'],
+                   {col: tuple(bounds) for col, bounds in state['bounds'].items()})
@@ -0,0 +1,262 @@
+"""The cleaning steps as a configurable pipeline of named, checkpointed stages.
+
+``pipeline.json`` lists, for each table, its source CSV, its output and the
+stages to run in order, each with its parameters:
+
+    load          read the CSV with the schema applied
+    drop_missing  drop columns with more than ``threshold`` missing values
+    impute        median / mode / group-mode fills (see ``imputation.Imputer``)
+    outliers      IQR filter over ``columns`` (see ``outliers.OutlierFilter``)
+    dates         DAYS_* offsets -> datetime64 (or int32 epoch-day) columns
+
+The stages call the cleaning steps of ``loan_data_cleaning.py``, and ``load``
+writes the same raw preview and column profile sidecars, so a pipeline run
+leaves the same files behind as a ``loan_data_cleaning.py`` run.
+
+Every stage's output is checkpointed as Parquet under the cache directory,
+keyed by a hash of the key of its input (for ``load``, the source file's
+fingerprint), its name and its parameters.  A rerun reuses every stage whose
+key is unchanged, so editing one stage's parameters only recomputes that
+stage and the ones after it.  What each stage did (dropped columns, fill
+values, outlier bounds and counts) is saved next to the output as
+``<output>.stages.json``, and the fitted parameters in ``cleaning_params.json``
+next to the outputs, so ``loan_data_cleaning.py incremental`` and ``refit``
+continue from a pipeline run.  Once both cleaned tables exist, the derived
+tables the report reads (client features, KPI cube, visual aggregates) are
+rebuilt next to them.
+
+    python pipeline.py                       # run every table
+    python pipeline.py --table application_data
+    python pipeline.py --config my_pipeline.json --no-cache
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from cleaning_params import load_params, save_params, source_marker
+from data_access import fingerprint
+from imputation import Imputer
+from loan_data_cleaning import (
+    PARAMS_FILE, TABLES, build_derived, date_converter, drop_missing_columns, impute_missing,
+    output_paths, reference_date, remove_outliers,
+)
+from previews import load_preview, write_preview
+from profiling import load_profile, profile_frame, write_profile
+from schema import read_table
+from storage import write_cleaned
+
+CONFIG_PATH = "pipeline.json"
+
+
+# ------------------------
+# STAGES
+# ------------------------
+# Each stage takes the frame, the table name and its parameters and returns the
+# new frame plus a JSON-serializable record of what it did.
+
+def write_sidecars(df, table, path):
+    # the report's "Raw Data Preview" tabs and column profile, as loan_data_cleaning.py writes them
+    write_preview(path, df)
+    write_profile(path, profile_frame(df), table)
+
+
+def load(df, table, path):
+    df = read_table(path, table)
+    write_sidecars(df, table, path)
+    return df, {'rows': len(df), 'source': source_marker(path)}
+
+
+def drop_missing(df, table, threshold):
+    params = {}
+    df = drop_missing_columns(df, params, threshold=threshold)
+    return df, {'to_drop': params['to_drop']}
+
+
+def impute(df, table, median_cols=(), mode_cols=(), group_mode_cols=None):
+    params = {}
+    df = impute_missing(df, params, Imputer(median_cols, mode_cols, group_mode_cols))
+    return df, params['imputer'].state()
+
+
+def outliers(df, table, columns, mode='sequential', k=1.5):
+    params = {}
+    df, removed = remove_outliers(df, params, columns, mode, k)
+    return df, {**params['outliers'].state(), 'removed': removed}
+
+
+def dates(df, table, reference=None, epoch_days=False):
+    converter = date_converter(table, reference, epoch_days)
+    return converter.transform(df), {'columns': converter.columns}
+
+
+STAGES = {
+    'load': load,
+    'drop_missing': drop_missing,
+    'impute': impute,
+    'outliers': outliers,
+    'dates': dates,
+}
+
+
+# ------------------------
+# RUNNER
+# ------------------------
+
+def stage_key(input_key, name, params):
+    payload = json.dumps([input_key, name, params], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=12).hexdigest()
+
+
+def source_key(path):
+    # the absolute path is left out so a moved checkout keeps its cache
+    return list(fingerprint(path)[1:])
+
+
+class StageCache:
+    """Stage outputs on disk: ``<dir>/<table>/<stage>-<key>.parquet`` plus a .json record."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _path(self, table, name, key):
+        return os.path.join(self.cache_dir, table, f"{name}-{key}")
+
+    def get(self, table, name, key):
+        base = self._path(table, name, key)
+        if not (os.path.exists(base + '.parquet') and os.path.exists(base + '.json')):
+            return None
+        with open(base + '.json') as f:
+            info = json.load(f)
+        return pd.read_parquet(base + '.parquet'), info
+
+    def put(self, table, name, key, df, info):
+        base = self._path(table, name, key)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        write_cleaned(df, base + '.parquet')
+        # the record is written last, so a half-written entry is never read back
+        with open(base + '.json', 'w') as f:
+            json.dump(info, f, indent=2, default=str)
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def run_table(table, spec, cache=None):
+    """Run ``spec['stages']`` for one table; returns the frame and each stage's record."""
+    df, key, records = None, None, {}
+    for stage in spec['stages']:
+        name = stage['name']
+        params = {k: v for k, v in stage.items() if k != 'name'}
+        if name == 'load':
+            params = {'path': spec['source'], **params}
+            key = stage_key(source_key(spec['source']), name, params)
+        else:
+            key = stage_key(key, name, params)
+
+        cached = cache.get(table, name, key) if cache else None
+        if cached is not None:
+            df, info = cached
+            print(f"♻️  {table}/{name}: reused checkpoint {key}")
+            if name == 'load' and (load_preview(spec['source']) is None
+                                   or load_profile(spec['source']) is None):
+                write_sidecars(df, table, spec['source'])
+        else:
+            df, info = STAGES[name](df, table, **params)
+            if cache:
+                cache.put(table, name, key, df, info)
+            print(f"⚙️  {table}/{name}: computed {key}")
+        records[name] = info
+    return df, records
+
+
+def table_params(spec, records):
+    """A table's entry of ``cleaning_params.json``, from its stage records."""
+    params = {'source': records['load']['source']}
+    if 'drop_missing' in records:
+        params['to_drop'] = records['drop_missing']['to_drop']
+    # incremental runs expect a fill state even when nothing is imputed
+    params['imputer'] = records.get('impute', Imputer().state())
+    if 'outliers' in records:
+        params['outliers'] = {k: v for k, v in records['outliers'].items() if k != 'removed'}
+    return params
+
+
+def stage_reference(spec):
+    """Reference date of the table's ``dates`` stage (the default one without it)."""
+    for stage in spec['stages']:
+        if stage['name'] == 'dates' and stage.get('reference'):
+            return str(pd.to_datetime(stage['reference']).date())
+    return str(reference_date.date())
+
+
+def save_table_params(path, config, records):
+    """Merge the tables run into ``path``; written once every table has parameters."""
+    params = load_params(path) if os.path.exists(path) else {}
+    for table, table_records in records.items():
+        spec = config['tables'][table]
+        params[table] = table_params(spec, table_records)
+        params['reference_date'] = stage_reference(spec)
+    if all(table in params for table in TABLES):
+        save_params(path, params)
+        print(f"💾 Cleaning parameters saved to: {path}\n")
+
+
+def load_config(path=CONFIG_PATH):
+    with open(path) as f:
+        config = json.load(f)
+    for table, spec in config['tables'].items():
+        unknown = [stage['name'] for stage in spec['stages'] if stage['name'] not in STAGES]
+        if unknown:
+            raise ValueError(f"{table}: unknown stages {unknown}; available: {list(STAGES)}")
+    return config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the cleaning pipeline from a config file.")
+    parser.add_argument('--config', default=CONFIG_PATH)
+    parser.add_argument('--table', action='append',
+                        help="run only this table (may be repeated)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="recompute every stage without reading or writing checkpoints")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="delete all checkpoints before running")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    cache = None if args.no_cache else StageCache(config['cache_dir'])
+    if args.clear_cache:
+        StageCache(config['cache_dir']).clear()
+
+    run = {}
+    for table, spec in config['tables'].items():
+        if args.table and table not in args.table:
+            continue
+        df, records = run_table(table, spec, cache)
+        os.makedirs(os.path.dirname(spec['output']) or '.', exist_ok=True)
+        write_cleaned(df, spec['output'])
+        with open(os.path.splitext(spec['output'])[0] + '.stages.json', 'w') as f:
+            json.dump(records, f, indent=2, default=str)
+        print(f"💾 {table}: {df.shape} saved to {spec['output']}\n")
+        run[table] = records
+        del df
+
+    cleaned = {table: records for table, records in run.items() if table in TABLES}
+    if cleaned:
+        first = config['tables'][next(iter(cleaned))]['output']
+        save_table_params(os.path.join(os.path.dirname(first), PARAMS_FILE), config, cleaned)
+
+    # the report's cube, visuals and mapped copies come from the cleaned tables,
+    # so they are rebuilt next to them like after a loan_data_cleaning.py run
+    outputs = {'output_' + table: config['tables'][table]['output']
+               for table in TABLES if table in config['tables']}
+    if len(outputs) == len(TABLES) and all(os.path.exists(path) for path in outputs.values()):
+        output_dir = os.path.dirname(outputs['output_application_data'])
+        build_derived({**output_paths(output_dir), **outputs}, output_dir)
+
+
+if __name__ == "__main__":
+    main()
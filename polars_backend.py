@@ -0,0 +1,330 @@
+"""Lazy Polars engine for loan_data_cleaning.py (``--engine polars``).
+
+The cleaning steps are built as one Polars LazyFrame over the raw CSV: drop
+the mostly-null columns, fill medians / modes / group modes, keep the rows
+inside every IQR bound and add the converted date columns.  Polars optimizes
+that plan as a whole (only the needed columns are parsed for each query, the
+fills run in parallel across columns) and the result is streamed to the
+Parquet output in row-group sized batches, without the cleaned table ever
+being held in memory.
+
+The fill values and bounds are fitted with a few aggregate queries before the
+plan runs, following the pandas rules exactly (same tie-breaking for modes,
+same quartile interpolation, same reading dtypes), so the output matches the
+pandas engine row for row.  They are returned as the usual ``Imputer`` and
+``OutlierFilter`` objects, so ``incremental`` runs can reuse them.
+
+Needs the optional ``polars`` package.
+"""
+import pandas as pd
+
+from dates import NS_PER_DAY
+from instrumentation import stage
+from loan_data_cleaning import (
+    MISSING_THRESHOLD, OUTLIER_COLS, application_imputer, date_converter, previous_imputer,
+)
+from outliers import OutlierFilter, iqr_bounds
+from schema import table_dtypes
+from storage import ROW_GROUP_SIZE, ChunkWriter
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+# Rows the CSV column types are inferred from (see scan_table)
+INFER_ROWS = 10_000
+
+# schema.py dtype -> Polars dtype name
+POLARS_DTYPES = {'int8': 'Int8', 'float32': 'Float32', 'category': 'Categorical', 'string': 'String'}
+
+
+def available():
+    return pl is not None
+
+
+# ------------------------
+# READING
+# ------------------------
+
+def _struct(name, exprs):
+    return [pl.struct(exprs).alias(name)] if exprs else []
+
+
+def _column_stats(lf, schema, overrides):
+    amounts = [col for col, dtype in schema.items() if col.startswith('AMT_') and dtype == pl.Float64]
+    categories = [col for col, dtype in schema.items() if dtype == pl.Categorical]
+    texts = [col for col, dtype in schema.items() if dtype == pl.String and col not in overrides]
+    stats = lf.select(
+        pl.len().alias('rows'),
+        *_struct('nulls', [pl.col(col).null_count() for col in schema]),
+        *_struct('lossless', [(pl.col(col).cast(pl.Float32).cast(pl.Float64) == pl.col(col)).all()
+                              for col in amounts]),
+        *_struct('categories', [pl.col(col).cast(pl.String).drop_nulls().unique().sort().implode()
+                                for col in categories]),
+        # text only because the rows the types were inferred from had no values
+        *_struct('numeric_text', [
+            (pl.col(col).cast(pl.Float64, strict=False).null_count() == pl.col(col).null_count())
+            & (pl.col(col).null_count() < pl.len()) for col in texts]),
+    ).collect().row(0, named=True)
+    return {'rows': stats['rows'], **{name: stats.get(name) or {} for name in
+                                      ('nulls', 'lossless', 'categories', 'numeric_text')}}
+
+
+def scan_table(path, table):
+    """Lazy scan of a raw CSV with the dtypes ``schema.read_table`` gives pandas.
+
+    Returns the frame, its row count and per-column null counts.  A first query
+    counts the nulls, so integer columns with missing values become Float64 and
+    AMT_* columns become Float32 where that loses nothing, as with pandas.
+    """
+    header = pl.read_csv(path, n_rows=0).columns
+    overrides = {col: getattr(pl, POLARS_DTYPES[dtype])
+                 for col, dtype in table_dtypes(table, header).items()}
+    # pandas infers types from the whole file; inferring from the first rows is far
+    # cheaper and the stats query checks every row, so a type that does not hold for
+    # the rest of the file is caught and inferred again from the whole file
+    for infer_rows in (INFER_ROWS, None):
+        schema = pl.scan_csv(path, schema_overrides=overrides,
+                             infer_schema_length=infer_rows).collect_schema()
+        lf = pl.scan_csv(path, schema=schema)
+        try:
+            stats = _column_stats(lf, schema, overrides)
+        except pl.exceptions.ComputeError:
+            if infer_rows is None:
+                raise
+            continue
+        if not any(stats['numeric_text'].values()):
+            break
+
+    rows, nulls = stats['rows'], stats['nulls']
+    casts = [pl.col(col).cast(pl.Float32) for col, lossless in stats['lossless'].items() if lossless]
+    # sorted categories, as pandas infers them
+    casts += [pl.col(col).cast(pl.Enum(values)) for col, values in stats['categories'].items()]
+    for col, dtype in schema.items():
+        if dtype.is_integer() and nulls[col] and col not in overrides:
+            casts.append(pl.col(col).cast(pl.Float64))
+        elif dtype == pl.String and nulls[col] == rows and col not in overrides:
+            # an all-empty column is float64 NaN in pandas
+            casts.append(pl.col(col).cast(pl.Float64))
+    return lf.with_columns(casts), rows, nulls
+
+
+def _is_category(dtype):
+    return isinstance(dtype, (pl.Categorical, pl.Enum))
+
+
+def _text(col, schema):
+    return pl.col(col).cast(pl.String) if _is_category(schema[col]) else pl.col(col)
+
+
+# ------------------------
+# FITTING
+# ------------------------
+
+def _columns(schema, spec, kind):
+    if isinstance(spec, str):
+        if kind == 'number':
+            return [col for col, dtype in schema.items() if dtype.is_numeric()]
+        return [col for col, dtype in schema.items() if dtype == pl.String or _is_category(dtype)]
+    return [col for col in spec if col in schema]
+
+
+def _mode_query(lf, col, schema, by=None):
+    # the smallest of the most frequent values wins, like Imputer
+    keys = [by] if by else []
+    counts = (lf.select([_text(c, schema) for c in keys + [col]]).drop_nulls()
+              .group_by(keys + [col]).agg(pl.len().alias('__n')))
+    ordered = counts.sort(keys + ['__n', col], descending=[False] * len(keys) + [True, False])
+    if by:
+        return ordered.group_by(by, maintain_order=True).first().select(by, col)
+    return ordered.head(1).select(col)
+
+
+def fit_imputer(lf, imputer):
+    """``imputer`` with the fill values of the frame behind ``lf``, in one collect."""
+    schema = lf.collect_schema()
+    median_cols = _columns(schema, imputer.median_cols, 'number')
+    mode_cols = _columns(schema, imputer.mode_cols, 'text')
+    group_cols = {col: by for col, by in imputer.group_mode_cols.items()
+                  if col in schema and by in schema}
+
+    queries = [lf.select([pl.col(col).median() for col in median_cols])]
+    queries += [_mode_query(lf, col, schema) for col in mode_cols]
+    queries += [_mode_query(lf, col, schema, by) for col, by in group_cols.items()]
+    results = pl.collect_all(queries)
+
+    medians = results[0].row(0, named=True) if median_cols else {}
+    imputer.medians = {col: float(value) for col, value in medians.items() if value is not None}
+    imputer.modes = {col: frame[col][0] for col, frame in zip(mode_cols, results[1:]) if len(frame)}
+    imputer.group_modes = {col: dict(frame.iter_rows())
+                           for (col, _), frame in zip(group_cols.items(), results[1 + len(mode_cols):])}
+    return imputer
+
+
+def imputer_exprs(imputer, schema):
+    """Fill expressions for the fitted ``imputer``."""
+    # integer columns have no nulls to fill: scan_table made the others Float64
+    exprs = [pl.col(col).fill_null(pl.lit(value).cast(schema[col]))
+             for col, value in imputer.medians.items() if col in schema and not schema[col].is_integer()]
+    for col, value in imputer.modes.items():
+        if col in schema:
+            exprs.append(_text(col, schema).fill_null(pl.lit(value)).cast(schema[col]))
+    for col, modes in imputer.group_modes.items():
+        by = imputer.group_mode_cols[col]
+        if col in schema and by in schema:
+            # one lookup of every row's group key; unseen groups stay null
+            fill = _text(by, schema).replace_strict(list(modes), list(modes.values()),
+                                                    default=None, return_dtype=pl.String)
+            exprs.append(_text(col, schema).fill_null(fill).cast(schema[col]))
+    return exprs
+
+
+def _values(col):
+    return pl.col(col).cast(pl.Float64)
+
+
+def fit_outliers(lf, outliers):
+    """``outliers`` with the IQR bounds of the frame behind ``lf``."""
+    schema = lf.collect_schema()
+    columns = [col for col in outliers.columns if col in schema]
+    outliers.bounds = {}
+    if outliers.mode == 'simultaneous':
+        row = lf.select([_values(col).quantile(q, 'linear').alias(f'{col}:{q}')
+                         for col in columns for q in (0.25, 0.75)]).collect().row(0, named=True)
+        for col in columns:
+            outliers.bounds[col] = iqr_bounds(row[f'{col}:0.25'], row[f'{col}:0.75'], outliers.k)
+        return outliers
+
+    # sequential: every column's quartiles over the rows left by the ones before it,
+    # expressed as one chain of filters with the quartiles computed inside the query
+    frame = lf.select(columns)
+    queries = []
+    for col in columns:
+        q1, q3 = _values(col).quantile(0.25, 'linear'), _values(col).quantile(0.75, 'linear')
+        low, high = iqr_bounds(q1, q3, outliers.k)
+        queries.append(frame.select(q1.alias('q1'), q3.alias('q3')))
+        frame = frame.filter(_values(col).is_between(low, high))
+    for col, quartiles in zip(columns, pl.collect_all(queries)):
+        q1, q3 = quartiles.row(0)
+        outliers.bounds[col] = iqr_bounds(q1, q3, outliers.k)
+    return outliers
+
+
+def _within(col, bounds):
+    low, high = bounds
+    # missing values are dropped, like in OutlierFilter
+    return _values(col).is_between(low, high).fill_null(False)
+
+
+def removed_counts(lf, outliers):
+    """Rows each column removes, counted like ``OutlierFilter.mask``."""
+    within = [_within(col, bounds) for col, bounds in outliers.bounds.items()]
+    counts = []
+    for i, (col, inside) in enumerate(zip(outliers.bounds, within)):
+        failed = ~inside
+        if outliers.mode == 'sequential':
+            # attributed to the first column a row fails
+            failed = pl.all_horizontal(within[:i] + [failed]) if i else failed
+        counts.append(failed.sum().alias(col))
+    if not counts:
+        return {}
+    return lf.select(counts).collect().row(0, named=True)
+
+
+def date_exprs(converter, schema):
+    """``DaysConverter.transform`` as expressions."""
+    low, high = converter.valid_range
+    reference = converter.reference.as_unit('ns').value
+    exprs = []
+    for col, new in converter.columns.items():
+        if col in schema:
+            days = _values(col)
+            valid = days.is_between(low, high) & (days != converter.sentinel)
+            ns = (days * NS_PER_DAY).cast(pl.Int64) + reference
+            exprs.append(pl.when(valid).then(ns).cast(pl.Datetime('ns')).alias(new))
+    return exprs
+
+
+# ------------------------
+# WRITING
+# ------------------------
+
+def _pandas(batch):
+    df = batch.to_pandas()
+    # Enum columns arrive as ordered categoricals; pandas reads plain ones
+    for col in df.select_dtypes(include='category').columns:
+        df[col] = df[col].cat.as_unordered()
+    return df
+
+
+def sink(lf, output_path, csv=False):
+    """Run the plan in row-group sized batches into the Parquet output; returns its shape."""
+    with ChunkWriter(output_path, csv=csv) as writer:
+        for batch in lf.collect_batches(chunk_size=ROW_GROUP_SIZE):
+            writer.write(_pandas(batch))
+        if writer.rows == 0:
+            writer.write(_pandas(lf.clear().collect()))
+    return writer.rows, writer.columns
+
+
+# ------------------------
+# CLEANING
+# ------------------------
+
+def polars_clean_application_data(path, output_path, csv=False, params=None,
+                                  outlier_mode='sequential'):
+    """Clean application_data as one lazy plan; returns the output shape and parameters."""
+    params = dict(params or {})
+    print("🔍 Fitting fill values and bounds...")
+    with stage('fit', 'application_data') as record:
+        lf, rows, nulls = scan_table(path, 'application_data')
+        record['rows_in'] = rows
+        if 'to_drop' not in params:
+            missing_percent = (pd.Series(nulls, dtype='float64') / max(rows, 1)).sort_values(ascending=False)
+            params['to_drop'] = missing_percent[missing_percent > MISSING_THRESHOLD].index.tolist()
+        lf = lf.drop([col for col in params['to_drop'] if col in nulls])
+        schema = lf.collect_schema()
+
+        if 'imputer' not in params:
+            params['imputer'] = fit_imputer(lf, application_imputer())
+        lf = lf.with_columns(imputer_exprs(params['imputer'], schema))
+        if 'outliers' not in params:
+            params['outliers'] = fit_outliers(
+                lf, OutlierFilter([col for col in OUTLIER_COLS if col in schema], outlier_mode))
+        removed = removed_counts(lf, params['outliers'])
+    print(f"Dropped columns with >40% missing values: {params['to_drop']}\n")
+
+    print("🧹 Running the cleaning plan...")
+    with stage('clean_plan', 'application_data') as record:
+        keep = [_within(col, bounds) for col, bounds in params['outliers'].bounds.items()]
+        if keep:
+            lf = lf.filter(pl.all_horizontal(keep))
+        lf = lf.with_columns(date_exprs(date_converter('application_data'), schema))
+        shape = sink(lf, output_path, csv)
+        record['rows_in'] = rows
+        record['rows_out'], record['cols_out'] = shape
+    for col, n in removed.items():
+        print(f"{col}: removed {n} outliers")
+    print("✅ application_data.csv cleaned.\n")
+    return shape, params
+
+
+def polars_clean_previous_application(path, output_path, csv=False, params=None):
+    params = dict(params or {})
+    print("🧼 Cleaning previous_application.csv as a lazy plan...")
+    with stage('fit', 'previous_application') as record:
+        lf, rows, _ = scan_table(path, 'previous_application')
+        record['rows_in'] = rows
+        if 'imputer' not in params:
+            params['imputer'] = fit_imputer(lf, previous_imputer())
+
+    with stage('clean_plan', 'previous_application') as record:
+        schema = lf.collect_schema()
+        lf = lf.with_columns(imputer_exprs(params['imputer'], schema))
+        lf = lf.with_columns(date_exprs(date_converter('previous_application'), schema))
+        shape = sink(lf, output_path, csv)
+        record['rows_in'] = rows
+        record['rows_out'], record['cols_out'] = shape
+    print("✅ previous_application.csv cleaned.\n")
+    return shape, params
@@ -0,0 +1,138 @@
+"""Small preview sidecars written next to the raw datasets.
+
+The cleaning run already reads every row of the raw CSVs, so it also records
+what the report's "Raw Data Preview" tabs show: the first rows, a uniform
+random sample and a per-column summary.  They are stored in
+``<dataset>.preview.json`` together with the fingerprint of the source file.
+The report renders from the sidecar and only falls back to an ``nrows``-limited
+read when the sidecar is missing or the source has changed since.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_access import fingerprint
+from schema import read_table
+
+HEAD_ROWS = 20
+SAMPLE_ROWS = 200
+
+
+def sidecar_path(path):
+    return os.path.splitext(path)[0] + '.preview.json'
+
+
+def _source_version(path):
+    # the absolute path is left out so a moved checkout keeps its sidecars
+    return list(fingerprint(path)[1:])
+
+
+def _frame_to_json(df):
+    return json.loads(df.to_json(orient='split', index=False, date_format='iso'))
+
+
+def _frame_from_json(data):
+    return pd.DataFrame(data['data'], columns=data['columns'])
+
+
+class PreviewBuilder:
+    """Collects head rows, a reservoir sample and column stats chunk by chunk.
+
+    The sample keeps the rows with the smallest random priorities seen so far,
+    which is a uniform sample of everything passed to ``update`` no matter how
+    the rows were split into chunks.
+    """
+
+    def __init__(self, head_rows=HEAD_ROWS, sample_rows=SAMPLE_ROWS, seed=0):
+        self.head_rows = head_rows
+        self.sample_rows = sample_rows
+        self.rows = 0
+        self.head = None
+        self._sample = None
+        self._priorities = np.empty(0)
+        self._stats = {}
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk):
+        if self.head is None:
+            self.head = chunk.head(self.head_rows).copy()
+        elif len(self.head) < self.head_rows:
+            self.head = pd.concat([self.head, chunk.head(self.head_rows - len(self.head))])
+        self._update_sample(chunk)
+        self._update_stats(chunk)
+        self.rows += len(chunk)
+        return self
+
+    def _update_sample(self, chunk):
+        priorities = self._rng.random(len(chunk))
+        if len(self._priorities) >= self.sample_rows:
+            # only rows that beat the current worst priority can get in
+            candidates = priorities < self._priorities.max()
+            chunk, priorities = chunk[candidates], priorities[candidates]
+        rows = chunk if self._sample is None else pd.concat([self._sample, chunk])
+        priorities = np.concatenate([self._priorities, priorities])
+        keep = np.argsort(priorities, kind='stable')[:self.sample_rows]
+        self._sample = rows.iloc[keep]
+        self._priorities = priorities[keep]
+
+    def _update_stats(self, chunk):
+        non_null = chunk.notna().sum()
+        numeric = chunk.select_dtypes(include='number')
+        mins, maxs = numeric.min(), numeric.max()
+        for col in chunk.columns:
+            stats = self._stats.setdefault(col, {'dtype': None, 'non_null': 0, 'min': None, 'max': None})
+            stats['dtype'] = str(chunk[col].dtype)
+            stats['non_null'] += int(non_null[col])
+            if col in numeric.columns and not pd.isna(mins[col]):
+                low, high = float(mins[col]), float(maxs[col])
+                stats['min'] = low if stats['min'] is None else min(stats['min'], low)
+                stats['max'] = high if stats['max'] is None else max(stats['max'], high)
+
+    def summary(self):
+        summary = pd.DataFrame.from_dict(self._stats, orient='index')
+        summary['nulls'] = self.rows - summary['non_null']
+        summary['null_fraction'] = summary['nulls'] / max(self.rows, 1)
+        return summary.rename_axis('column').reset_index()
+
+    def write(self, source_path):
+        sidecar = {
+            'source': _source_version(source_path),
+            'rows': self.rows,
+            'head': _frame_to_json(self.head),
+            'sample': _frame_to_json(self._sample),
+            'summary': _frame_to_json(self.summary()),
+        }
+        with open(sidecar_path(source_path), 'w') as f:
+            json.dump(sidecar, f)
+
+
+def write_preview(source_path, df):
+    """Sidecar for a table that is already in memory."""
+    PreviewBuilder().update(df).write(source_path)
+
+
+def load_preview(path):
+    """The sidecar of ``path`` as DataFrames, or None if missing or stale."""
+    try:
+        with open(sidecar_path(path)) as f:
+            sidecar = json.load(f)
+        if sidecar['source'] != _source_version(path):
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return {
+        'rows': sidecar['rows'],
+        'head': _frame_from_json(sidecar['head']),
+        'sample': _frame_from_json(sidecar['sample']),
+        'summary': _frame_from_json(sidecar['summary']),
+    }
+
+
+def preview_head(path, table, n=5):
+    """First ``n`` rows from the sidecar, or from a read of only ``n`` rows."""
+    preview = load_preview(path)
+    if preview is not None and len(preview['head']) >= min(n, preview['rows']):
+        return preview['head'].head(n)
+    return read_table(path, table, nrows=n)
@@ -0,0 +1,355 @@
+"""Column profiles of the raw loan tables, written next to them.
+
+One pass over a table (a whole frame, or CSV chunks in ``--stream`` mode)
+collects per column: null count and fraction, number of distinct values,
+min / max, median and a few quantiles, the mode and most frequent values of
+text columns, and counts of placeholder values such as 365243 in the DAYS_*
+columns.  The profile is saved as ``<dataset>.profile.json`` with the source
+file's fingerprint, like the preview sidecars.
+
+The cleaning reuses it instead of rescanning the table: the >40% missing rule
+reads the null fractions and the imputers take their medians and modes from
+it.  The report renders its "Initial Observations" from it with
+``observations``.
+
+In memory the statistics are exact, computed with one vectorized call per
+statistic.  Over chunks the quantiles come from ``QuantileSketch``; the
+columns whose median fills missing values get a sketch big enough to stay
+exact on the sizes the in-memory path handles.
+"""
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from dates import DAYS_SENTINEL
+from imputation import _modes_by_code, _to_python
+from previews import _source_version
+
+QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+# Distinct values are counted up to this many; above it ``distinct`` is None,
+# except for the keys of a table profiled in memory
+DISTINCT_LIMIT = 1000
+KEY_COLUMNS = ('SK_ID_CURR', 'SK_ID_PREV')
+TOP_VALUES = 5
+# Values each column's sketch keeps exactly; median columns keep QuantileSketch's default
+SKETCH_K = 4096
+TEXT_PLACEHOLDERS = ('XNA', 'XAP')
+
+
+# ------------------------
+# QUANTILE SKETCH
+# ------------------------
+
+class QuantileSketch:
+    """Mergeable KLL-style quantile sketch.
+
+    Values are kept exactly until a level holds more than ``k`` items; the level
+    is then sorted and every other item is promoted to the next level with twice
+    the weight.  Quantiles are exact while nothing has been compacted (which
+    matches ``Series.quantile``) and approximate with O(1/k) rank error after.
+    """
+
+    def __init__(self, k=65536, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.count += values.size
+            self._compact()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compact()
+        return self
+
+    def _compact(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self.k:
+                items = np.sort(items)
+                # an odd item out stays behind so the total weight is preserved
+                keep = items[-1:] if items.size % 2 else items[:0]
+                pairs = items[:items.size - keep.size]
+                promoted = pairs[self._rng.integers(2)::2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = keep
+            level += 1
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.nan
+        if len(self.levels) == 1 or all(items.size == 0 for items in self.levels[1:]):
+            return float(np.quantile(self.levels[0], q))
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(items.size, 2 ** level)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(values)
+        values, weights = values[order], weights[order]
+        # midpoint ranks, interpolated the same way as the exact case
+        ranks = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return float(np.interp(q, ranks, values))
+
+    def median(self):
+        return self.quantile(0.5)
+
+
+def mode_of_counts(counts):
+    # same tie-break as Series.mode().iloc[0]: the smallest of the most frequent values
+    if not counts:
+        return None
+    top = max(counts.values())
+    return min(value for value, n in counts.items() if n == top)
+
+
+# ------------------------
+# PROFILES
+# ------------------------
+
+def _is_text(series):
+    return (series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+            or isinstance(series.dtype, pd.CategoricalDtype))
+
+
+def _number(value):
+    return None if value is None or pd.isna(value) else _to_python(value)
+
+
+def _top_values(counts):
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+    return [[_to_python(value), int(n)] for value, n in ranked[:TOP_VALUES]]
+
+
+def _sentinel_counts(numeric):
+    days = [col for col in numeric.columns if col.startswith('DAYS_')]
+    return (numeric[days] == DAYS_SENTINEL).sum() if days else pd.Series(dtype='int64')
+
+
+def _column(dtype, rows, nulls):
+    return {'dtype': dtype, 'kind': 'other', 'nulls': int(nulls),
+            'null_fraction': nulls / rows if rows else 0.0, 'distinct': None,
+            'min': None, 'max': None, 'median': None, 'quantiles': None,
+            'mode': None, 'top_values': None, 'sentinels': {}}
+
+
+def profile_frame(df):
+    """Exact profile of a table held in memory."""
+    rows = len(df)
+    nulls = df.isna().sum()
+    numeric = df.select_dtypes(include='number')
+    mins, maxs, medians = numeric.min(), numeric.max(), numeric.median()
+    quantiles = numeric.quantile(list(QUANTILES)) if len(numeric.columns) else None
+    sentinels = _sentinel_counts(numeric)
+
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        stats = columns[col] = _column(str(series.dtype), rows, nulls[col])
+        if col in numeric.columns:
+            distinct = series.nunique()
+            stats.update(kind='numeric', min=_number(mins[col]), max=_number(maxs[col]),
+                         median=_number(medians[col]),
+                         distinct=int(distinct) if distinct <= DISTINCT_LIMIT or col in KEY_COLUMNS
+                         else None,
+                         quantiles={str(q): _number(quantiles.at[q, col]) for q in QUANTILES})
+            if sentinels.get(col):
+                stats['sentinels'] = {str(DAYS_SENTINEL): int(sentinels[col])}
+        elif _is_text(series):
+            counts = series.value_counts()
+            counts = counts[counts > 0]
+            mode = _modes_by_code(series) if len(counts) else None
+            stats.update(kind='text', distinct=int(len(counts)) if len(counts) <= DISTINCT_LIMIT else None,
+                         mode=None if mode is None else _to_python(mode),
+                         top_values=_top_values(counts.to_dict()),
+                         sentinels={value: int(counts[value]) for value in TEXT_PLACEHOLDERS
+                                    if value in counts.index})
+    return {'rows': rows, 'columns': columns}
+
+
+class Profiler:
+    """The ``profile_frame`` statistics, collected chunk by chunk.
+
+    ``median_cols`` (``'numeric'`` for every numeric column) get a full-size
+    quantile sketch, the others one of ``sketch_k`` items.
+    """
+
+    def __init__(self, median_cols=(), sketch_k=SKETCH_K):
+        self.median_cols = median_cols
+        self.sketch_k = sketch_k
+        self.rows = 0
+        self._stats = {}
+
+    def _new(self, col):
+        exact = self.median_cols == 'numeric' or col in self.median_cols
+        return {'dtype': None, 'nulls': 0, 'text': False, 'numeric': False, 'min': None, 'max': None,
+                'sketch': QuantileSketch() if exact else QuantileSketch(self.sketch_k),
+                'values': np.empty(0), 'counts': Counter(), 'sentinels': 0}
+
+    def update(self, chunk):
+        nulls = chunk.isna().sum()
+        numeric = chunk.select_dtypes(include='number')
+        mins, maxs = numeric.min(), numeric.max()
+        sentinels = _sentinel_counts(numeric)
+        for col in chunk.columns:
+            series = chunk[col]
+            stats = self._stats.get(col) or self._stats.setdefault(col, self._new(col))
+            stats['dtype'] = str(series.dtype)
+            stats['nulls'] += int(nulls[col])
+            if _is_text(series):
+                # a column that is text in any chunk is text overall
+                stats['text'] = True
+                stats['counts'].update(series.dropna().value_counts().to_dict())
+            elif col in numeric.columns:
+                stats['numeric'] = True
+                if not pd.isna(mins[col]):
+                    low, high = mins[col], maxs[col]
+                    stats['min'] = low if stats['min'] is None else min(stats['min'], low)
+                    stats['max'] = high if stats['max'] is None else max(stats['max'], high)
+                values = series.to_numpy(dtype='float64', na_value=np.nan)
+                stats['sketch'].update(values)
+                if stats['values'] is not None:
+                    stats['values'] = np.union1d(stats['values'], pd.unique(values[~np.isnan(values)]))
+                    if len(stats['values']) > DISTINCT_LIMIT:
+                        stats['values'] = None
+                stats['sentinels'] += int(sentinels.get(col, 0))
+        self.rows += len(chunk)
+        return self
+
+    def text_values(self):
+        """Every value seen in each text column, sorted like pandas categories."""
+        return {col: sorted(state['counts']) for col, state in self._stats.items() if state['text']}
+
+    def profile(self):
+        columns = {}
+        for col, state in self._stats.items():
+            stats = columns[col] = _column(state['dtype'], self.rows, state['nulls'])
+            counts = state['counts']
+            if state['text']:
+                mode = mode_of_counts(counts)
+                stats.update(kind='text', distinct=len(counts) if len(counts) <= DISTINCT_LIMIT else None,
+                             mode=None if mode is None else _to_python(mode),
+                             top_values=_top_values(counts),
+                             sentinels={value: int(counts[value]) for value in TEXT_PLACEHOLDERS
+                                        if counts.get(value)})
+                continue
+            if not state['numeric']:
+                continue
+            sketch = state['sketch']
+            stats.update(kind='numeric', min=_number(state['min']), max=_number(state['max']),
+                         distinct=None if state['values'] is None else len(state['values']))
+            if sketch.count:
+                stats['median'] = sketch.median()
+                stats['quantiles'] = {str(q): sketch.quantile(q) for q in QUANTILES}
+            if state['sentinels']:
+                stats['sentinels'] = {str(DAYS_SENTINEL): state['sentinels']}
+        return {'rows': self.rows, 'columns': columns}
+
+
+# ------------------------
+# ARTIFACT
+# ------------------------
+
+def profile_path(path):
+    return os.path.splitext(path)[0] + '.profile.json'
+
+
+def write_profile(source_path, profile, table=None):
+    with open(profile_path(source_path), 'w') as f:
+        json.dump({'source': _source_version(source_path), 'table': table, **profile}, f)
+
+
+def load_profile(path):
+    """The profile of ``path``, or None if missing or stale."""
+    try:
+        with open(profile_path(path)) as f:
+            profile = json.load(f)
+        if profile['source'] != _source_version(path):
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return profile
+
+
+def missing_columns(profile, threshold):
+    """Columns with a larger null fraction than ``threshold``, most missing first."""
+    fractions = pd.Series({col: stats['null_fraction'] for col, stats in profile['columns'].items()},
+                          dtype='float64')
+    fractions = fractions.sort_values(ascending=False)
+    return fractions[fractions > threshold].index.tolist()
+
+
+# ------------------------
+# OBSERVATIONS
+# ------------------------
+
+def _names(items, limit=4, sep=', '):
+    shown = sep.join(items[:limit])
+    return shown + (f" and {len(items) - limit} more" if len(items) > limit else "")
+
+
+def observations(profile, missing_threshold=0.4):
+    """Markdown bullets describing the raw table behind ``profile``."""
+    columns, rows = profile['columns'], profile['rows']
+    bullets = []
+
+    missing = missing_columns(profile, missing_threshold)
+    if missing:
+        worst = ', '.join(f"{col} {columns[col]['null_fraction']:.0%}" for col in missing[:3])
+        bullets.append(f"{len(missing)} of {len(columns)} columns have >{missing_threshold:.0%} "
+                       f"missing values (e.g. {worst})")
+    amounts = [col for col in columns if col.startswith('AMT_') and columns[col]['nulls']
+               and col not in missing]
+    if amounts:
+        bullets.append("Missing values in financial columns: " + ', '.join(
+            f"{col} {columns[col]['null_fraction']:.1%}" for col in amounts))
+
+    days = [col for col, stats in columns.items() if col.startswith('DAYS_')
+            and stats['quantiles'] and stats['quantiles']['0.5'] is not None
+            and stats['quantiles']['0.5'] <= 0]
+    if days:
+        bullets.append(f"Date fields stored as negative day counts: {_names(days)}")
+
+    placeholders = {}
+    for col, stats in columns.items():
+        for value, n in stats['sentinels'].items():
+            placeholders.setdefault(value, []).append(f"{col} {n / rows:.1%}")
+    for value, cols in placeholders.items():
+        bullets.append(f"Placeholder value {value} in {_names(cols, 3)}")
+
+    outliers = []
+    for col, stats in columns.items():
+        q = stats['quantiles']
+        if col.startswith('AMT_') and q and None not in (q['0.25'], q['0.75'], stats['max']):
+            fence = q['0.75'] + 1.5 * (q['0.75'] - q['0.25'])
+            if stats['max'] > fence:
+                outliers.append(f"{col} up to {stats['max']:,.0f} (99th percentile {q['0.99']:,.0f})")
+    if outliers:
+        bullets.append("Outliers in financial columns: " + _names(outliers, 3, sep='; '))
+
+    for col, stats in columns.items():
+        if stats['kind'] == 'text' and stats['distinct'] and stats['distinct'] <= TOP_VALUES and \
+                stats['null_fraction'] < missing_threshold and col.endswith('STATUS'):
+            shares = ', '.join(f"{value} {n / rows:.0%}" for value, n in stats['top_values'])
+            bullets.append(f"{col} values: {shares}")
+
+    ids = columns.get('SK_ID_CURR')
+    if ids and ids['distinct'] is not None and ids['distinct'] < rows:
+        bullets.append(f"{rows:,} rows for {ids['distinct']:,} SK_ID_CURR values: aggregate per "
+                       "client before joining with the applicants")
+    return bullets
@@ -0,0 +1,52 @@
+"""Background loading for the report.
+
+Streamlit runs the report script top to bottom, so every dataset or image it
+loads holds back everything below it.  Here loads are jobs on a small
+process-wide thread pool: the report submits them when a session's first run
+starts, renders its text straight away and only waits, section by section,
+on the jobs that section shows.
+
+A job is keyed by its name and the mtime / size of its input files.  Reruns
+and other sessions reuse the finished result, and a rewritten file starts the
+job again.  A job whose input file is missing fails with FileNotFoundError,
+which ``result()`` raises in the section that waits on it.
+
+Jobs run outside the Streamlit script thread, so they must only read files,
+never call ``st``.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+LOADER_THREADS = 4
+
+_executor = ThreadPoolExecutor(LOADER_THREADS, thread_name_prefix='report-loader')
+_jobs = {}
+_lock = threading.Lock()
+
+
+def file_version(paths):
+    versions = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            versions.append(None)
+        else:
+            versions.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(versions)
+
+
+def submit(name, paths, fn, *args):
+    """Future of ``fn(*args)``, started unless it already ran on the current ``paths``."""
+    version = file_version(paths)
+    with _lock:
+        job = _jobs.get(name)
+        if job is None or job[0] != version:
+            job = _jobs[name] = (version, _executor.submit(fn, *args))
+    return job[1]
+
+
+def clear():
+    with _lock:
+        _jobs.clear()
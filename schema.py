@@ -0,0 +1,150 @@
+"""Column dtypes for the loan tables, built from DATASETS/columns_description.csv.
+
+``pd.read_csv`` without a ``dtype`` turns every 0/1 flag into int64 and every
+categorical into Python strings.  The description file already lists the
+columns of both tables, so the dtypes are derived from the column names:
+
+- FLAG_* / NFLAG_* / REG_* / LIVE_* (0/1 indicators)   -> int8
+- NAME_* / CODE_* and the other text columns           -> category
+- AMT_REQ_CREDIT_BUREAU_* (small counts)               -> float32
+- other AMT_* columns                                  -> float32 after loading,
+  only when the downcast is lossless
+
+Columns that do not follow the naming rules are set in ``TABLE_OVERRIDES``.
+"""
+import io
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DESCRIPTION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "DATASETS", "columns_description.csv")
+
+# Table name used in the code -> label in the description file
+TABLE_LABELS = {
+    'application_data': 'application_data',
+    'previous_application': 'previous_application.csv',
+}
+
+FLAG_PREFIXES = ('FLAG_', 'NFLAG_', 'REG_', 'LIVE_')
+CATEGORY_PREFIXES = ('NAME_', 'CODE_')
+
+TABLE_OVERRIDES = {
+    'application_data': {
+        # Y/N strings, not 0/1
+        'FLAG_OWN_CAR': 'category',
+        'FLAG_OWN_REALTY': 'category',
+        'OCCUPATION_TYPE': 'category',
+        'ORGANIZATION_TYPE': 'category',
+        'WEEKDAY_APPR_PROCESS_START': 'category',
+        'FONDKAPREMONT_MODE': 'category',
+        'HOUSETYPE_MODE': 'category',
+        'WALLSMATERIAL_MODE': 'category',
+        'EMERGENCYSTATE_MODE': 'category',
+        'TARGET': 'int8',
+    },
+    'previous_application': {
+        'FLAG_LAST_APPL_PER_CONTRACT': 'category',
+        'WEEKDAY_APPR_PROCESS_START': 'category',
+        'CHANNEL_TYPE': 'category',
+        'PRODUCT_COMBINATION': 'category',
+        # has missing values, so it cannot be a plain int8
+        'NFLAG_INSURED_ON_APPROVAL': 'float32',
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def table_columns(table, description_path=DESCRIPTION_PATH):
+    """Columns of ``table`` in the order of the description file."""
+    desc = pd.read_csv(description_path, encoding='latin1')
+    rows = desc[desc['Table'].str.strip() == TABLE_LABELS[table]]['Row']
+    return tuple(rows.str.strip())
+
+
+def column_dtype(table, col):
+    override = TABLE_OVERRIDES.get(table, {}).get(col)
+    if override:
+        return override
+    if col.startswith(FLAG_PREFIXES):
+        return 'int8'
+    if col.startswith(CATEGORY_PREFIXES):
+        return 'category'
+    if col.startswith('AMT_REQ_CREDIT_BUREAU_'):
+        return 'float32'
+    return None
+
+
+def table_dtypes(table, columns=None, categories=True):
+    """``dtype=`` mapping for ``pd.read_csv``.
+
+    ``categories=False`` reads text columns as ``string`` instead; chunked
+    readers need this because every chunk would otherwise get its own set of
+    categories, and a chunk where the column is all null would come back as
+    float64.
+    """
+    dtypes = {}
+    for col in columns or table_columns(table):
+        dtype = column_dtype(table, col)
+        if dtype == 'category' and not categories:
+            dtype = 'string'
+        if dtype:
+            dtypes[col] = dtype
+    return dtypes
+
+
+def csv_options(table, columns=None, categories=True):
+    """Keyword arguments for ``pd.read_csv`` that apply the schema.
+
+    ``columns`` limits the read to what a stage needs; names missing from the
+    file are ignored so the same list works for raw and cleaned tables.
+    """
+    options = {'dtype': table_dtypes(table, columns, categories)}
+    if columns is not None:
+        wanted = set(columns)
+        options['usecols'] = lambda col: col in wanted
+    return options
+
+
+def float32_exact(values):
+    """True if every value of the numeric array ``values`` survives a float32 round trip."""
+    values = np.asarray(values, dtype='float64')
+    return np.array_equal(values.astype('float32').astype('float64'), values, equal_nan=True)
+
+
+def shrink_amounts(df):
+    """Downcast float64 AMT_* columns to float32 where no value changes."""
+    for col in df.columns:
+        if col.startswith('AMT_') and df[col].dtype == 'float64' and float32_exact(df[col]):
+            df[col] = df[col].astype('float32')
+    return df
+
+
+def read_table(path, table, columns=None, **read_csv_kwargs):
+    """Read one of the loan tables with the schema applied."""
+    df = pd.read_csv(path, **csv_options(table, columns), **read_csv_kwargs)
+    return shrink_amounts(df)
+
+
+def read_appended_rows(path, table, offset):
+    """Rows of the CSV at ``path`` that start at byte ``offset``.
+
+    Only complete lines are parsed, so a writer still appending does not leave
+    half a row behind; ``df.attrs['bytes_read']`` says how far the parse got.
+    The header is taken from the first line of the file.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(max(offset, len(header)))
+        data = f.read()
+    data = data[:data.rfind(b'\n') + 1]
+    names = pd.read_csv(io.BytesIO(header), nrows=0).columns
+    if data.strip():
+        df = pd.read_csv(io.BytesIO(data), header=None, names=names, **csv_options(table))
+    else:
+        df = pd.DataFrame(columns=names)
+    df = shrink_amounts(df)
+    df.attrs['bytes_read'] = max(offset, len(header)) - offset + len(data)
+    return df
@@ -0,0 +1,351 @@
+"""Default-probability scoring of applicants, fitted on TARGET.
+
+The model is an L2-regularized logistic regression over a few numeric
+applicant columns, two affordability ratios, the slicer categories (one-hot)
+and the per-client previous-loan features of ``client_features.py``.  It is
+fitted with Newton steps in NumPy on up to ``FIT_ROWS`` cleaned applicants and
+saved as JSON, like the cleaning parameters.
+
+Scoring needs nothing but NumPy: the standardization is folded into the
+weights, so a batch is one feature matrix, one matrix-vector product and a
+sigmoid.  Input is read in fixed-size batches (Parquet row groups or CSV
+chunks), the previous-loan features are looked up per batch on their sorted
+SK_ID_CURR index, and ``--jobs`` spreads Parquet row groups over processes.
+Memory therefore depends on the batch size, not on the number of applicants.
+
+    python scoring.py fit
+    python scoring.py score --input DATASETS/cleaned_datasets/cleaned_application_data.parquet --jobs 4
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from client_features import COUNT_COLUMNS, PREV_COLUMNS, add_client_features, previous_features
+from data_access import read_shared
+from dates import DAYS_SENTINEL
+from measures import FILTER_COLUMNS
+from schema import csv_options, shrink_amounts
+from storage import CLEANED_APP_PATH, CLEANED_DIR, CLEANED_PREV_PATH, ChunkWriter, table_files
+
+MODEL_PATH = os.path.join(CLEANED_DIR, "default_model.json")
+SCORES_PATH = os.path.join(CLEANED_DIR, "default_scores.parquet")
+
+NUMERIC_FEATURES = ['AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY', 'AMT_GOODS_PRICE',
+                    'EXT_SOURCE_1', 'EXT_SOURCE_2', 'EXT_SOURCE_3', 'CNT_CHILDREN',
+                    'CNT_FAM_MEMBERS', 'REGION_POPULATION_RELATIVE', 'DAYS_BIRTH', 'DAYS_EMPLOYED']
+PREV_FEATURES = COUNT_COLUMNS + ['PREV_REFUSED_RATIO', 'PREV_AMT_CREDIT_MEAN',
+                                 'PREV_AMT_APPLICATION_MEAN', 'PREV_DAYS_DECISION_LAST']
+# name -> (numerator, denominator)
+RATIO_FEATURES = {
+    'CREDIT_INCOME_RATIO': ('AMT_CREDIT', 'AMT_INCOME_TOTAL'),
+    'ANNUITY_INCOME_RATIO': ('AMT_ANNUITY', 'AMT_INCOME_TOTAL'),
+    'CREDIT_TERM': ('AMT_CREDIT', 'AMT_ANNUITY'),
+}
+CATEGORY_FEATURES = FILTER_COLUMNS
+# Levels kept per category; the rest fall into the baseline
+MAX_LEVELS = 20
+
+FIT_ROWS = 250_000
+BATCH_ROWS = 100_000
+
+
+def _sigmoid(z):
+    return 1 / (1 + np.exp(-np.clip(z, -35, 35)))
+
+
+def roc_auc(y, p):
+    """Area under the ROC curve, from the ranks of the scores."""
+    y = np.asarray(y, dtype=bool)
+    positives, negatives = y.sum(), (~y).sum()
+    if not positives or not negatives:
+        return None
+    ranks = pd.Series(p).rank().to_numpy()
+    return float((ranks[y].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def fit_logistic(X, y, l2=1.0, max_iter=25, tol=1e-8):
+    """Intercept and weights of an L2-regularized logistic regression (Newton's method)."""
+    X1 = np.column_stack([np.ones(len(X)), X])
+    penalty = np.full(X1.shape[1], l2)
+    penalty[0] = 0  # the intercept is not shrunk
+    w = np.zeros(X1.shape[1])
+    for _ in range(max_iter):
+        p = _sigmoid(X1 @ w)
+        gradient = X1.T @ (p - y) + penalty * w
+        hessian = (X1 * (p * (1 - p))[:, None]).T @ X1 + np.diag(penalty)
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.abs(step).max() < tol:
+            break
+    return w[0], w[1:]
+
+
+class DefaultModel:
+    """Feature layout and weights of the default-probability model."""
+
+    def __init__(self, numeric=(), categories=None, medians=None, means=None, stds=None,
+                 intercept=0.0, weights=None, metrics=None):
+        self.numeric = list(numeric)
+        self.categories = dict(categories or {})
+        self.medians = dict(medians or {})
+        self.means = dict(means or {})
+        self.stds = dict(stds or {})
+        self.intercept = intercept
+        self.weights = dict(weights or {})
+        self.metrics = dict(metrics or {})
+        self._compile()
+
+    # ------------------------
+    # FEATURES
+    # ------------------------
+
+    @property
+    def input_columns(self):
+        """Applicant columns read for scoring; the previous-loan features are looked up."""
+        columns = ['SK_ID_CURR']
+        for col in self.numeric:
+            if col in RATIO_FEATURES:
+                columns += RATIO_FEATURES[col]
+            elif col not in PREV_FEATURES:
+                columns.append(col)
+        return list(dict.fromkeys(columns + list(self.categories)))
+
+    @property
+    def feature_names(self):
+        return self.numeric + [f'{col}={level}' for col, levels in self.categories.items()
+                               for level in levels]
+
+    @staticmethod
+    def _numeric_values(df, col):
+        if col in RATIO_FEATURES:
+            numerator, denominator = RATIO_FEATURES[col]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = (df[numerator].to_numpy(dtype='float64', na_value=np.nan)
+                          / df[denominator].to_numpy(dtype='float64', na_value=np.nan))
+            values[~np.isfinite(values)] = np.nan
+            return values
+        values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+        if col.startswith('DAYS_'):
+            values = np.where(values == DAYS_SENTINEL, np.nan, values)
+        return values
+
+    def matrix(self, df):
+        """Raw feature matrix of ``df``: missing numbers get the fitted median."""
+        X = np.zeros((len(df), len(self.numeric) + sum(map(len, self.categories.values()))))
+        for i, col in enumerate(self.numeric):
+            values = self._numeric_values(df, col)
+            X[:, i] = np.where(np.isnan(values), self.medians[col], values)
+        offset = len(self.numeric)
+        for col, levels in self.categories.items():
+            codes = pd.Index(levels).get_indexer(df[col].astype('object'))
+            rows = np.flatnonzero(codes >= 0)
+            X[rows, offset + codes[rows]] = 1.0
+            offset += len(levels)
+        return X
+
+    # ------------------------
+    # FIT / PREDICT
+    # ------------------------
+
+    def fit(self, df, l2=1.0, holdout=0.2, seed=0):
+        """Fit on ``df`` (applicants with TARGET and previous-loan features)."""
+        df = df[df['TARGET'].notna()]
+        candidates = [col for col in NUMERIC_FEATURES + PREV_FEATURES if col in df.columns]
+        candidates += [col for col, (a, b) in RATIO_FEATURES.items() if a in df.columns and b in df.columns]
+        self.numeric = []
+        self.medians = {}
+        for col in candidates:
+            median = np.nanmedian(self._numeric_values(df, col)) if len(df) else np.nan
+            if not np.isnan(median):
+                self.numeric.append(col)
+                self.medians[col] = float(median)
+        self.categories = {}
+        for col in CATEGORY_FEATURES:
+            if col in df.columns:
+                counts = df[col].astype('object').value_counts()
+                # the most frequent level is the baseline
+                self.categories[col] = [str(level) for level in counts.index[1:MAX_LEVELS + 1]]
+
+        X = self.matrix(df)
+        y = df['TARGET'].to_numpy(dtype='float64')
+        mean, std = X.mean(axis=0), X.std(axis=0)
+        std[std == 0] = 1
+        rng = np.random.default_rng(seed)
+        test = rng.random(len(X)) < holdout
+        intercept, weights = fit_logistic((X[~test] - mean) / std, y[~test], l2)
+
+        names = self.feature_names
+        self.means, self.stds = dict(zip(names, mean.tolist())), dict(zip(names, std.tolist()))
+        self.intercept, self.weights = float(intercept), dict(zip(names, weights.tolist()))
+        self._compile()
+        self.metrics = {'train_rows': int((~test).sum()), 'holdout_rows': int(test.sum()),
+                        'default_rate': float(y.mean()) if len(y) else None,
+                        'holdout_auc': roc_auc(y[test], self.predict_matrix(X[test]))}
+        return self
+
+    def _compile(self):
+        # standardization folded into the weights: p = sigmoid(X @ w + b)
+        names = self.feature_names
+        weights = np.array([self.weights.get(name, 0.0) for name in names])
+        stds = np.array([self.stds.get(name, 1.0) for name in names])
+        means = np.array([self.means.get(name, 0.0) for name in names])
+        self._w = weights / stds
+        self._b = self.intercept - float((weights * means / stds).sum())
+
+    def predict_matrix(self, X):
+        return _sigmoid(X @ self._w + self._b)
+
+    def predict(self, df):
+        """Default probability of every row of ``df``."""
+        return self.predict_matrix(self.matrix(df))
+
+    # ------------------------
+    # FITTED STATE
+    # ------------------------
+
+    def state(self):
+        return {'numeric': self.numeric, 'categories': self.categories, 'medians': self.medians,
+                'means': self.means, 'stds': self.stds, 'intercept': self.intercept,
+                'weights': self.weights, 'metrics': self.metrics}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(**state)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.state(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_state(json.load(f))
+
+
+def load_previous_features(prev_path):
+    return previous_features(read_shared(prev_path, columns=PREV_COLUMNS))
+
+
+def fit_model(app_path=CLEANED_APP_PATH, prev_path=CLEANED_PREV_PATH, fit_rows=FIT_ROWS, seed=0):
+    """Fit the model on (a sample of) the cleaned applicants."""
+    available = set(pq.read_schema(app_path).names)
+    columns = ['SK_ID_CURR', 'TARGET'] + NUMERIC_FEATURES + CATEGORY_FEATURES
+    apps = read_shared(app_path, columns=[col for col in columns if col in available])
+    if len(apps) > fit_rows:
+        apps = apps.sample(fit_rows, random_state=seed)
+    apps = add_client_features(apps, load_previous_features(prev_path))
+    return DefaultModel().fit(apps, seed=seed)
+
+
+# ------------------------
+# BATCH SCORING
+# ------------------------
+
+_worker = {}
+
+
+def _init_worker(model_state, features):
+    _worker['model'] = DefaultModel.from_state(model_state)
+    _worker['features'] = features
+
+
+def score_batch(batch, model, features):
+    """SK_ID_CURR and default probability of every applicant in ``batch``."""
+    batch = add_client_features(batch, features)
+    return pd.DataFrame({'SK_ID_CURR': batch['SK_ID_CURR'].to_numpy(),
+                         'DEFAULT_PROBABILITY': model.predict(batch).astype('float32')})
+
+
+def _score_row_groups(path, row_groups, columns, batch_rows):
+    parquet = pq.ParquetFile(path)
+    scores = [score_batch(batch.to_pandas(), _worker['model'], _worker['features'])
+              for batch in parquet.iter_batches(batch_size=batch_rows, row_groups=row_groups,
+                                                columns=columns)]
+    return pd.concat(scores, ignore_index=True) if scores else None
+
+
+def _csv_batches(path, columns, batch_rows):
+    reader = pd.read_csv(path, chunksize=batch_rows,
+                         **csv_options('application_data', columns, categories=False))
+    for chunk in reader:
+        yield shrink_amounts(chunk)
+
+
+def _write_part(writer, part):
+    if part is not None:
+        writer.write(part)
+
+
+def score_file(model, input_path, output_path=SCORES_PATH, prev_path=CLEANED_PREV_PATH,
+               batch_rows=BATCH_ROWS, jobs=1):
+    """Score a cleaned Parquet table or a raw CSV batch by batch; returns the row count."""
+    features = load_previous_features(prev_path)
+    columns = model.input_columns
+    _init_worker(model.state(), features)
+    with ChunkWriter(output_path) as writer:
+        if input_path.endswith('.csv'):
+            for batch in _csv_batches(input_path, columns, batch_rows):
+                writer.write(score_batch(batch, model, features))
+        else:
+            # the row groups of the table and of the parts appended to it
+            groups = [(file, [i]) for file in table_files(input_path)
+                      for i in range(pq.ParquetFile(file).num_row_groups)]
+            if jobs > 1:
+                with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                                         initargs=(model.state(), features)) as pool:
+                    # at most two row groups per process in flight, written in order
+                    pending = deque()
+                    for file, group in groups:
+                        pending.append(pool.submit(_score_row_groups, file, group, columns, batch_rows))
+                        if len(pending) >= 2 * jobs:
+                            _write_part(writer, pending.popleft().result())
+                    while pending:
+                        _write_part(writer, pending.popleft().result())
+            else:
+                for file, group in groups:
+                    _write_part(writer, _score_row_groups(file, group, columns, batch_rows))
+    return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit and run the default-probability model.")
+    parser.add_argument('command', choices=['fit', 'score'])
+    parser.add_argument('--app', default=CLEANED_APP_PATH, help="cleaned application table to fit on")
+    parser.add_argument('--prev', default=CLEANED_PREV_PATH, help="cleaned previous_application table")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--input', default=CLEANED_APP_PATH,
+                        help="applicants to score: cleaned Parquet table or application CSV")
+    parser.add_argument('--output', default=SCORES_PATH)
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS)
+    parser.add_argument('--jobs', type=int, default=1, help="processes scoring Parquet row groups")
+    args = parser.parse_args(argv)
+
+    if args.command == 'fit':
+        print("🧮 Fitting the default-probability model...")
+        model = fit_model(args.app, args.prev)
+        model.save(args.model)
+        metrics = model.metrics
+        auc = metrics['holdout_auc']
+        print(f"✅ {len(model.feature_names)} features, {metrics['train_rows']} training rows, "
+              f"holdout AUC {'n/a' if auc is None else f'{auc:.3f}'}")
+        print(f"💾 Model saved to: {args.model}")
+    else:
+        if not os.path.exists(args.model):
+            parser.exit(1, f"❌ {args.model} not found; run `python scoring.py fit` first\n")
+        model = DefaultModel.load(args.model)
+        start = time.perf_counter()
+        rows = score_file(model, args.input, args.output, args.prev, args.batch_rows, args.jobs)
+        wall = time.perf_counter() - start
+        print(f"💾 Scored {rows} applicants in {wall:.2f} s "
+              f"({rows / wall * 60:,.0f} rows/min) to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Cleaned tables published as memory-mapped Arrow IPC files.
+
+A DataFrame loaded from Parquet lives in the memory of the process that
+decoded it, so every Streamlit server process (and every worker) behind the
+load balancer holds its own copy.  After a cleaning run the outputs are also
+written here as uncompressed Arrow IPC files; readers ``pa.memory_map`` them
+and the columns point straight into the mapped file, so all processes share
+one copy in the OS page cache.  Numeric and datetime columns without nulls
+reach pandas without a copy; categorical codes and columns with nulls are
+converted.
+
+Every publish writes a new version directory and then swaps ``current.json``
+(the manifest naming the version and the Parquet file each table came from)
+with ``os.replace``.  Readers pin to the version in the manifest and read
+every table it lists from that version, even while a later cleaning run is
+rewriting the Parquet files, so they see either the old or the new set of
+tables, never a mix.  Only without a manifest (never published, or withdrawn
+by a ``--no-publish`` run) are all tables read from Parquet.  The last
+``KEEP_VERSIONS`` versions are kept for readers that are still opening the
+previous one; a mapped file removed later stays readable for whoever already
+maps it.
+
+Frames from the map are read-only and shared: treat them like the cached
+frames of ``data_access``.
+
+    python shared_tables.py                      # publish the current cleaned tables
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from storage import CLEANED_DIR, table_files
+
+SHARED_SUBDIR = "shared"
+MANIFEST = "current.json"
+KEEP_VERSIONS = 2
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def shared_dir(parquet_path):
+    """Where the tables published from ``parquet_path``'s directory live."""
+    return os.path.join(os.path.dirname(parquet_path), SHARED_SUBDIR)
+
+
+def table_name(parquet_path):
+    return os.path.splitext(os.path.basename(parquet_path))[0]
+
+
+def _source(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def manifest_path(directory):
+    return os.path.join(directory, MANIFEST)
+
+
+def read_manifest(directory):
+    try:
+        with open(manifest_path(directory)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def published_version(parquet_path):
+    """Version ``parquet_path`` is currently published in, or None."""
+    manifest = read_manifest(shared_dir(parquet_path))
+    if manifest and table_name(parquet_path) in manifest['tables']:
+        return manifest['version']
+    return None
+
+
+# ------------------------
+# PUBLISH
+# ------------------------
+
+def _write_arrow(parquet_path, target):
+    # one record batch: pandas can only use a column in place if it is one contiguous array
+    table = pq.read_table(table_files(parquet_path)).combine_chunks()
+    options = ipc.IpcWriteOptions(unify_dictionaries=True)
+    with ipc.new_file(target, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return table.num_rows, table.num_columns
+
+
+def _prune(directory, current):
+    versions = sorted(name for name in os.listdir(directory) if name.startswith('v')
+                      and not name.endswith('.tmp') and os.path.isdir(os.path.join(directory, name)))
+    for name in versions[:-KEEP_VERSIONS]:
+        if name != current:
+            # a file still mapped elsewhere cannot be removed on Windows; retried next time
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def publish(parquet_paths, directory=None):
+    """Publish the cleaned Parquet tables as one new version; returns its manifest."""
+    directory = directory or shared_dir(parquet_paths[0])
+    os.makedirs(directory, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    staging = os.path.join(directory, version + '.tmp')
+    os.makedirs(staging)
+    tables = {}
+    for path in parquet_paths:
+        name = table_name(path)
+        source = _source(path)
+        rows, columns = _write_arrow(path, os.path.join(staging, name + '.arrow'))
+        tables[name] = {'file': os.path.join(version, name + '.arrow'), 'source': source,
+                        'rows': rows, 'columns': columns}
+    os.replace(staging, os.path.join(directory, version))
+
+    manifest = {'version': version, 'tables': tables}
+    tmp = manifest_path(directory) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path(directory))
+    _prune(directory, version)
+    return manifest
+
+
+def withdraw(directory):
+    """Send readers back to the Parquet files; the versions stay until the next publish prunes them."""
+    try:
+        os.remove(manifest_path(directory))
+    except FileNotFoundError:
+        pass
+
+
+# ------------------------
+# READ
+# ------------------------
+
+def _mapped(directory, version, file):
+    path = os.path.join(directory, file)
+    with _lock:
+        if path not in _tables:
+            # maps of older versions go once the frames built on them are dropped
+            for other in [key for key, (d, v, _) in _tables.items() if d == directory and v != version]:
+                del _tables[other]
+            # read_all only parses the IPC metadata; the buffers stay in the map
+            _tables[path] = (directory, version, ipc.open_file(pa.memory_map(path, 'r')).read_all())
+        return _tables[path][2]
+
+
+def open_table(parquet_path, version=None):
+    """Mapped Arrow table published from ``parquet_path``, or None.
+
+    ``version`` pins the read to one published set (see ``published_version``);
+    by default the current one is used.  None if the table is not published.
+    """
+    version = version or published_version(parquet_path)
+    if version is None:
+        return None
+    try:
+        return _mapped(shared_dir(parquet_path), version,
+                       os.path.join(version, table_name(parquet_path) + '.arrow'))
+    except OSError:
+        # pruned after the version was read
+        return None
+
+
+def to_pandas(table, columns=None, filters=None):
+    if columns is not None:
+        table = table.select(list(columns))
+    if filters is not None:
+        table = table.filter(pq.filters_to_expression(list(filters)))
+    # split_blocks keeps every column its own (mapped) array instead of consolidating
+    return table.to_pandas(split_blocks=True)
+
+
+def read_published(parquet_path, columns=None, filters=None, version=None):
+    """``read_cleaned`` from the mapped copy; None if it is not published."""
+    table = open_table(parquet_path, version)
+    return None if table is None else to_pandas(table, columns, filters)
+
+
+def published_head(parquet_path, n=5, version=None):
+    table = open_table(parquet_path, version)
+    return None if table is None else to_pandas(table.slice(0, n))
+
+
+def clear():
+    with _lock:
+        _tables.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish the cleaned tables as memory-mapped Arrow files.")
+    parser.add_argument('--dir', default=CLEANED_DIR, help="directory of the cleaned Parquet tables")
+    args = parser.parse_args(argv)
+
+    paths = sorted(os.path.join(args.dir, name) for name in os.listdir(args.dir)
+                   if name.endswith('.parquet'))
+    if not paths:
+        parser.exit(1, f"❌ no Parquet tables in {args.dir}\n")
+    manifest = publish(paths, os.path.join(args.dir, SHARED_SUBDIR))
+    for name, entry in manifest['tables'].items():
+        print(f"🔗 {name}: {entry['rows']:,} rows x {entry['columns']} columns")
+    print(f"💾 Version {manifest['version']} published to: {os.path.join(args.dir, SHARED_SUBDIR)}")
+
+
+if __name__ == "__main__":
+    main()
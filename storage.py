@@ -0,0 +1,258 @@
+"""Columnar storage for the cleaned datasets.
+
+The cleaned tables are written as zstd-compressed Parquet so that dtypes
+survive the round trip (categories, int8 flags, float32 amounts and the
+datetime64 columns converted from DAYS_*: *_DATE and *_ACTUAL).  Readers
+ask only for the columns and row groups they need instead of re-parsing text.
+CSV is still available as an optional side output.
+
+Every file is written under a temporary name next to its target and moved
+into place with ``os.replace``, so a reader opens either the old or the new
+file, never a half-written one.
+
+Rows added by an incremental run go to part files in ``<table>.parquet.parts/``
+instead of rewriting the table, so the existing row groups are neither
+decoded nor re-encoded.  The readers here treat a table file and its parts as
+one table (``table_files``), and rewriting the table drops its parts.
+"""
+import os
+import shutil
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CLEANED_DIR = os.path.join("DATASETS", "cleaned_datasets")
+CLEANED_APP_PATH = os.path.join(CLEANED_DIR, "cleaned_application_data.parquet")
+CLEANED_PREV_PATH = os.path.join(CLEANED_DIR, "cleaned_previous_application.parquet")
+# Narrow applicants table with the previous-loan features (client_features.py)
+CLIENT_FEATURES_PATH = os.path.join(CLEANED_DIR, "client_features.parquet")
+# Slicer cube for the dashboard KPIs (kpi_cube.py)
+KPI_CUBE_PATH = os.path.join(CLEANED_DIR, "kpi_cube.parquet")
+# Aggregates behind the Income vs Credit and Default Trend visuals (visuals.py)
+INCOME_CREDIT_GRID_PATH = os.path.join(CLEANED_DIR, "income_credit_grid.parquet")
+DEFAULT_TREND_PATH = os.path.join(CLEANED_DIR, "default_trend.parquet")
+
+COMPRESSION = 'zstd'
+# Small enough that a preview or a filtered read skips most of the file
+ROW_GROUP_SIZE = 100_000
+
+
+def csv_path(path):
+    return os.path.splitext(path)[0] + '.csv'
+
+
+def parts_dir(path):
+    return path + '.parts'
+
+
+def table_files(path):
+    """The table file followed by the parts appended to it, in order."""
+    directory = parts_dir(path)
+    if not os.path.isdir(directory):
+        return [path]
+    return [path] + [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                     if name.endswith('.parquet')]
+
+
+def _drop_parts(path):
+    # after the new table is in place: a crash in between leaves rows twice, never none
+    shutil.rmtree(parts_dir(path), ignore_errors=True)
+
+
+def _tmp(path):
+    return path + '.tmp'
+
+
+def _discard(path):
+    if os.path.exists(_tmp(path)):
+        os.remove(_tmp(path))
+
+
+@contextmanager
+def replacing(path):
+    """Yield a temporary path that replaces ``path`` once the block succeeds."""
+    try:
+        yield _tmp(path)
+    except BaseException:
+        _discard(path)
+        raise
+    os.replace(_tmp(path), path)
+
+
+def write_cleaned(df, path, csv=False):
+    """Write a cleaned table to Parquet, plus a CSV copy if asked."""
+    with replacing(path) as tmp:
+        df.to_parquet(tmp, engine='pyarrow', compression=COMPRESSION,
+                      row_group_size=ROW_GROUP_SIZE, index=False)
+    _drop_parts(path)
+    if csv:
+        with replacing(csv_path(path)) as tmp:
+            df.to_csv(tmp, index=False)
+
+
+def append_cleaned(df, path):
+    """Add rows to a cleaned table; returns the table's new shape.
+
+    ``df`` is cast to the table's schema and written as the next part file, so
+    the cost depends on the new rows only.  A CSV copy next to the table, if
+    there is one, gets the rows appended too.
+    """
+    files = table_files(path)
+    schema = pq.read_schema(path)
+    rows = sum(pq.read_metadata(file).num_rows for file in files)
+    shape = (rows + len(df), len(schema.names))
+    if not len(df):
+        return shape
+    new_rows = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+    os.makedirs(parts_dir(path), exist_ok=True)
+    with replacing(os.path.join(parts_dir(path), f"part-{len(files):05d}.parquet")) as tmp_path:
+        pq.write_table(new_rows, tmp_path, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+    if os.path.exists(csv_path(path)):
+        df[schema.names].to_csv(csv_path(path), mode='a', header=False, index=False)
+    return shape
+
+
+class ChunkWriter:
+    """Append cleaned chunks to one Parquet file (and optionally a CSV).
+
+    The Parquet schema is ``schema`` or else taken from the first chunk; the
+    chunks are cast to it, so every chunk has to come out of the same
+    transforms.  The files only replace ``path`` on a clean exit; after an
+    error the old ones are kept.
+    """
+
+    def __init__(self, path, csv=False, schema=None):
+        self.path = path
+        self.csv = csv
+        self.schema = schema
+        self._writer = None
+        self.rows = 0
+        self.columns = 0
+
+    def write(self, chunk):
+        if self._writer is None:
+            table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+            self._writer = pq.ParquetWriter(_tmp(self.path), table.schema, compression=COMPRESSION)
+        else:
+            table = pa.Table.from_pandas(chunk, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+        if self.csv:
+            first = self.rows == 0
+            chunk.to_csv(_tmp(csv_path(self.path)), mode='w' if first else 'a', header=first, index=False)
+        self.rows += len(chunk)
+        self.columns = chunk.shape[1]
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.replace(_tmp(self.path), self.path)
+            _drop_parts(self.path)
+            if self.csv:
+                os.replace(_tmp(csv_path(self.path)), csv_path(self.path))
+        return self.rows, self.columns
+
+    def discard(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        _discard(self.path)
+        _discard(csv_path(self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def read_cleaned(path, columns=None, filters=None):
+    """Read a cleaned table, projecting ``columns`` and pruning row groups.
+
+    ``filters`` uses the pyarrow form, e.g. ``[('CODE_GENDER', '==', 'F')]``;
+    row groups whose statistics rule out a match are never decoded.
+    """
+    files = table_files(path)
+    return pd.read_parquet(files if len(files) > 1 else path, engine='pyarrow',
+                           columns=list(columns) if columns is not None else None,
+                           filters=list(filters) if filters is not None else None)
+
+
+def iter_row_groups(path, columns=None):
+    """A cleaned table one row group at a time, as DataFrames."""
+    for file in table_files(path):
+        parquet = pq.ParquetFile(file)
+        for i in range(parquet.num_row_groups):
+            yield parquet.read_row_group(i, columns=columns).to_pandas()
+
+
+def iter_batches(path, batch_size=ROW_GROUP_SIZE, columns=None):
+    """Arrow record batches of a cleaned table and its parts."""
+    for file in table_files(path):
+        yield from pq.ParquetFile(file).iter_batches(batch_size=batch_size, columns=columns)
+
+
+def iter_matching(path, column, values, columns=None):
+    """Rows whose ``column`` is in ``values``, one row group at a time.
+
+    Only ``column`` is decoded for the row groups without a match.
+    """
+    for file in table_files(path):
+        parquet = pq.ParquetFile(file)
+        for i in range(parquet.num_row_groups):
+            mask = np.isin(parquet.read_row_group(i, columns=[column]).column(0).to_numpy(), values)
+            if mask.any():
+                yield parquet.read_row_group(i, columns=columns).to_pandas()[mask]
+
+
+def empty_frame(path, columns=None):
+    """The table's columns and dtypes, without reading any rows."""
+    table = pq.read_schema(path).empty_table()
+    return (table.select(list(columns)) if columns is not None else table).to_pandas()
+
+
+def column_max(path, column):
+    """Largest value of ``column`` from the row group statistics; None if unknown."""
+    result = None
+    for file in table_files(path):
+        metadata = pq.read_metadata(file)
+        index = metadata.schema.to_arrow_schema().get_field_index(column)
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(index).statistics
+            if stats is None or not stats.has_min_max:
+                return None
+            result = stats.max if result is None else max(result, stats.max)
+    return result
+
+
+def sorted_row_groups(path, column):
+    """True if there are row groups and they follow each other in ``column`` order.
+
+    Decided from the row group statistics, without decoding any rows.
+    """
+    last = None
+    for file in table_files(path):
+        metadata = pq.read_metadata(file)
+        index = metadata.schema.to_arrow_schema().get_field_index(column)
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(index).statistics
+            if stats is None or not stats.has_min_max:
+                return False
+            if last is not None and stats.min < last:
+                return False
+            last = stats.max
+    return last is not None
+
+
+def read_head(path, n=5, columns=None):
+    """First ``n`` rows, decoding only the leading row groups."""
+    batch = next(iter_batches(path, batch_size=n, columns=columns), None)
+    if batch is None:
+        return pq.read_schema(path).empty_table().to_pandas()
+    return pa.Table.from_batches([batch]).to_pandas()
@@ -0,0 +1,247 @@
+"""Bounded-memory, two-pass cleaning of the loan CSVs.
+
+Pass one reads the raw file in chunks and only collects the column profile
+(see ``profiling.py``), which supplies the null fractions, medians and modes,
+plus the group modes and IQR bounds.  Pass two re-reads the file chunk by
+chunk, applies the same rules with those statistics and appends every cleaned
+chunk to the output file.  AMT_* columns that pass one found exact in float32
+in every chunk are written as float32, like ``schema.shrink_amounts`` does for
+the in-memory engine.  Memory use depends on the chunk size and the sketch
+size, not on the number of rows.
+"""
+from collections import Counter
+
+import pandas as pd
+
+from loan_data_cleaning import (
+    EXT_SOURCE_COLS, GROUP_MODE_FILLS, MISSING_THRESHOLD, OUTLIER_COLS,
+    application_imputer, convert_application_dates, convert_previous_dates, previous_imputer,
+)
+from instrumentation import stage
+from outliers import OutlierFilter, iqr_bounds
+from previews import PreviewBuilder
+from profiling import Profiler, QuantileSketch, missing_columns, mode_of_counts, write_profile
+from schema import column_dtype, csv_options, float32_exact
+from storage import ChunkWriter
+
+
+# ------------------------
+# CHUNK STATISTICS
+# ------------------------
+
+def _read_chunks(path, table, chunksize, columns=None):
+    # text columns are read as strings, since categories would differ from chunk
+    # to chunk, and are cast to the file-wide categories before writing
+    return pd.read_csv(path, chunksize=chunksize,
+                       **csv_options(table, columns, categories=False))
+
+
+def _float_columns(chunk):
+    return set(chunk.select_dtypes(include='float').columns)
+
+
+def _inexact_amounts(chunk):
+    # AMT_* columns the in-memory engine could not shrink (schema.shrink_amounts)
+    amounts = chunk.select_dtypes(include='number').columns
+    return {col for col in amounts if col.startswith('AMT_') and not float32_exact(chunk[col])}
+
+
+def _float32_amounts(float_cols, inexact):
+    """AMT_* columns written as float32: float in the whole file and exact in every chunk."""
+    return {col for col in float_cols if col.startswith('AMT_') and col not in inexact}
+
+
+def _category_dtypes(text_values, table, imputer):
+    """The category dtype the in-memory engine gives each schema category column.
+
+    Its categories are the sorted values of the whole file (pass one), plus
+    fill values not among them, which ``Imputer`` adds at the end.
+    """
+    dtypes = {}
+    for col, values in text_values.items():
+        if column_dtype(table, col) != 'category':
+            continue
+        fills = [imputer.modes.get(col), *imputer.group_modes.get(col, {}).values()]
+        new = sorted({value for value in fills if value is not None} - set(values))
+        dtypes[col] = pd.CategoricalDtype(values + new)
+    return dtypes
+
+
+def _as_categories(chunk, dtypes):
+    return chunk.astype({col: dtype for col, dtype in dtypes.items() if col in chunk.columns})
+
+
+def _align_dtypes(chunk, float_cols, float32_cols=()):
+    # an integer column with nulls in another chunk must be float in every chunk,
+    # or the chunks would not share one Parquet schema
+    ints = [col for col in chunk.select_dtypes(include='integer').columns if col in float_cols]
+    dtypes = {col: 'float64' for col in ints}
+    dtypes.update({col: 'float32' for col in float32_cols if col in chunk.columns})
+    return chunk.astype(dtypes)
+
+
+def collect_application_stats(path, chunksize, preview=None):
+    """First pass: column profile, null fractions, EXT_SOURCE medians and group modes.
+
+    ``preview`` is an optional PreviewBuilder fed with the same chunks.
+    """
+    profiler = Profiler(median_cols=EXT_SOURCE_COLS)
+    group_counts = {col: {} for col in GROUP_MODE_FILLS}
+    float_cols, inexact = set(), set()
+
+    for chunk in _read_chunks(path, 'application_data', chunksize):
+        float_cols |= _float_columns(chunk)
+        inexact |= _inexact_amounts(chunk)
+        if preview is not None:
+            preview.update(chunk)
+        profiler.update(chunk)
+        for col, by in GROUP_MODE_FILLS.items():
+            if col in chunk.columns and by in chunk.columns:
+                pairs = chunk[[by, col]].dropna().value_counts()
+                for (key, value), n in pairs.items():
+                    group_counts[col].setdefault(key, Counter())[value] += n
+
+    profile = profiler.profile()
+    to_drop = missing_columns(profile, MISSING_THRESHOLD)
+    medians = {col: profile['columns'][col]['median'] for col in EXT_SOURCE_COLS
+               if col in profile['columns'] and col not in to_drop
+               and profile['columns'][col]['median'] is not None}
+    group_modes = {col: {key: mode_of_counts(counts) for key, counts in by_key.items()}
+                   for col, by_key in group_counts.items() if col not in to_drop}
+    return {'rows': profile['rows'], 'to_drop': to_drop, 'medians': medians,
+            'group_modes': group_modes, 'float_cols': float_cols,
+            'float32_cols': _float32_amounts(float_cols, inexact), 'profile': profile,
+            'text_values': profiler.text_values()}
+
+
+def fit_outlier_filter(path, chunksize, columns, mode='sequential'):
+    """IQR bounds from quantile sketches over narrow reads of ``columns``.
+
+    Sequential bounds take one pass per column, because each column's
+    quartiles are taken over the rows that survived the columns before it;
+    simultaneous bounds take a single pass.
+    """
+    outlier_filter = OutlierFilter(columns, mode)
+    if mode == 'simultaneous':
+        sketches = {col: QuantileSketch() for col in columns}
+        for chunk in _read_chunks(path, 'application_data', chunksize, columns):
+            for col, sketch in sketches.items():
+                sketch.update(chunk[col].to_numpy())
+        for col, sketch in sketches.items():
+            outlier_filter.bounds[col] = iqr_bounds(sketch.quantile(0.25), sketch.quantile(0.75))
+        return outlier_filter
+
+    for col in columns:
+        sketch = QuantileSketch()
+        for chunk in _read_chunks(path, 'application_data', chunksize, columns):
+            keep = outlier_filter.within(chunk).all(axis=1)
+            sketch.update(chunk[col].to_numpy()[keep])
+        outlier_filter.bounds[col] = iqr_bounds(sketch.quantile(0.25), sketch.quantile(0.75))
+    return outlier_filter
+
+
+def collect_previous_stats(path, chunksize, preview=None):
+    """First pass for previous_application: column profile, numeric medians and text modes."""
+    profiler = Profiler(median_cols='numeric')
+    float_cols, inexact = set(), set()
+    for chunk in _read_chunks(path, 'previous_application', chunksize):
+        float_cols |= _float_columns(chunk)
+        inexact |= _inexact_amounts(chunk)
+        if preview is not None:
+            preview.update(chunk)
+        profiler.update(chunk)
+
+    profile = profiler.profile()
+    columns = profile['columns']
+    medians = {col: stats['median'] for col, stats in columns.items()
+               if stats['kind'] == 'numeric' and stats['median'] is not None}
+    modes = {col: stats['mode'] for col, stats in columns.items()
+             if stats['kind'] == 'text' and stats['mode'] is not None}
+    return {'medians': medians, 'modes': modes, 'float_cols': float_cols,
+            'float32_cols': _float32_amounts(float_cols, inexact), 'profile': profile,
+            'text_values': profiler.text_values()}
+
+
+# ------------------------
+# TWO-PASS CLEANING
+# ------------------------
+
+def stream_clean_application_data(path, output_path, chunksize=100_000, csv=False, params=None,
+                                  outlier_mode='sequential'):
+    """Clean application_data in two passes; returns the output shape and parameters.
+
+    A saved ``imputer`` in ``params`` supplies the fill values instead of the first pass.
+    """
+    params = dict(params or {})
+    print("🔍 Collecting statistics (pass 1)...")
+    with stage('stats_pass', 'application_data') as record:
+        preview = PreviewBuilder()
+        stats = collect_application_stats(path, chunksize, preview)
+        preview.write(path)
+        write_profile(path, stats['profile'], 'application_data')
+        record['rows_in'] = preview.rows
+    params['to_drop'] = stats['to_drop']
+    print(f"Dropped columns with >40% missing values: {stats['to_drop']}\n")
+    if 'imputer' not in params:
+        params['imputer'] = application_imputer()
+        params['imputer'].medians = stats['medians']
+        params['imputer'].group_modes = stats['group_modes']
+    imputer = params['imputer']
+
+    outlier_cols = [col for col in OUTLIER_COLS if col not in stats['to_drop']]
+    with stage('outlier_fit', 'application_data'):
+        outlier_filter = params['outliers'] = fit_outlier_filter(path, chunksize, outlier_cols,
+                                                                 outlier_mode)
+    print("✅ Statistics collected.\n")
+
+    categories = _category_dtypes(stats['text_values'], 'application_data', imputer)
+    print("🧹 Cleaning chunks (pass 2)...")
+    removed = dict.fromkeys(outlier_filter.bounds, 0)
+    with stage('clean_pass', 'application_data') as record, \
+            ChunkWriter(output_path, csv=csv) as writer:
+        for chunk in _read_chunks(path, 'application_data', chunksize):
+            chunk = chunk.drop(columns=stats['to_drop'], errors='ignore')
+            chunk = imputer.transform(chunk)
+            keep, chunk_removed = outlier_filter.mask(chunk)
+            for col, n in chunk_removed.items():
+                removed[col] += n
+            chunk = convert_application_dates(chunk[keep])
+            chunk = _align_dtypes(chunk, stats['float_cols'], stats['float32_cols'])
+            writer.write(_as_categories(chunk, categories))
+        record['rows_in'] = preview.rows
+        record['rows_out'], record['cols_out'] = writer.rows, writer.columns
+    for col, n in removed.items():
+        print(f"{col}: removed {n} outliers")
+    print("✅ application_data.csv cleaned.\n")
+    return (writer.rows, writer.columns), params
+
+
+def stream_clean_previous_application(path, output_path, chunksize=100_000, csv=False,
+                                      params=None):
+    params = dict(params or {})
+    print("🧼 Cleaning previous_application.csv in chunks...")
+    with stage('stats_pass', 'previous_application') as record:
+        preview = PreviewBuilder()
+        stats = collect_previous_stats(path, chunksize, preview)
+        preview.write(path)
+        write_profile(path, stats['profile'], 'previous_application')
+        record['rows_in'] = preview.rows
+    if 'imputer' not in params:
+        params['imputer'] = previous_imputer()
+        params['imputer'].medians = stats['medians']
+        params['imputer'].modes = stats['modes']
+    imputer = params['imputer']
+    categories = _category_dtypes(stats['text_values'], 'previous_application', imputer)
+
+    with stage('clean_pass', 'previous_application') as record, \
+            ChunkWriter(output_path, csv=csv) as writer:
+        for chunk in _read_chunks(path, 'previous_application', chunksize):
+            chunk = imputer.transform(chunk)
+            chunk = convert_previous_dates(chunk)
+            chunk = _align_dtypes(chunk, stats['float_cols'], stats['float32_cols'])
+            writer.write(_as_categories(chunk, categories))
+        record['rows_in'] = preview.rows
+        record['rows_out'], record['cols_out'] = writer.rows, writer.columns
+    print("✅ previous_application.csv cleaned.\n")
+    return (writer.rows, writer.columns), params
+
@@ -0,0 +1,209 @@
+"""Deterministic Home-Credit-shaped test data at any size.
+
+The columns come from ``DATASETS/columns_description.csv`` (through
+``schema.table_columns``), the value ranges and the share of missing values
+per column roughly follow the real ``application_data`` /
+``previous_application`` files: the building-info ``*_AVG / *_MODE / *_MEDI``
+columns, OWN_CAR_AGE and EXT_SOURCE_1 are more than 40% empty (so the cleaning
+drops them), DAYS_EMPLOYED and the previous-loan DAYS_* columns carry the
+365243 placeholder, and so on.
+
+Rows are generated and written in blocks of ``BLOCK_ROWS``, each from its own
+seeded generator, so 10M rows need no more memory than 250k and the same
+``(rows, seed)`` always gives byte-identical files.
+
+    python synthetic_data.py 1000000 bench_data/1m
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from dates import DAYS_SENTINEL
+from schema import table_columns
+
+BLOCK_ROWS = 250_000
+SCALES = {'50k': 50_000, '1m': 1_000_000, '10m': 10_000_000}
+
+FIRST_CLIENT_ID = 100_002
+FIRST_PREV_ID = 1_000_001
+
+CATEGORIES = {
+    'NAME_CONTRACT_TYPE': (['Cash loans', 'Revolving loans'], [0.9, 0.1]),
+    'CODE_GENDER': (['F', 'M', 'XNA'], [0.658, 0.3419, 0.0001]),
+    'FLAG_OWN_CAR': (['N', 'Y'], [0.66, 0.34]),
+    'FLAG_OWN_REALTY': (['Y', 'N'], [0.69, 0.31]),
+    'NAME_TYPE_SUITE': (['Unaccompanied', 'Family', 'Spouse, partner', 'Children', 'Other_B'],
+                        [0.81, 0.13, 0.04, 0.01, 0.01]),
+    'NAME_INCOME_TYPE': (['Working', 'Commercial associate', 'Pensioner', 'State servant'],
+                         [0.52, 0.23, 0.18, 0.07]),
+    'NAME_EDUCATION_TYPE': (['Secondary / secondary special', 'Higher education',
+                             'Incomplete higher', 'Lower secondary', 'Academic degree'],
+                            [0.71, 0.243, 0.033, 0.0135, 0.0005]),
+    'NAME_FAMILY_STATUS': (['Married', 'Single / not married', 'Civil marriage', 'Separated', 'Widow'],
+                           [0.64, 0.15, 0.1, 0.06, 0.05]),
+    'NAME_HOUSING_TYPE': (['House / apartment', 'With parents', 'Municipal apartment',
+                           'Rented apartment', 'Office apartment'], [0.89, 0.05, 0.03, 0.02, 0.01]),
+    'OCCUPATION_TYPE': (['Laborers', 'Sales staff', 'Core staff', 'Managers', 'Drivers',
+                         'High skill tech staff', 'Accountants', 'Medicine staff'],
+                        [0.26, 0.15, 0.13, 0.1, 0.09, 0.18, 0.05, 0.04]),
+    'WEEKDAY_APPR_PROCESS_START': (['MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY',
+                                    'SATURDAY', 'SUNDAY'], [0.16, 0.17, 0.17, 0.16, 0.16, 0.11, 0.07]),
+    'ORGANIZATION_TYPE': (['Business Entity Type 3', 'XNA', 'Self-employed', 'Other', 'Medicine',
+                           'Government', 'School', 'Trade: type 7'],
+                          [0.27, 0.18, 0.15, 0.07, 0.04, 0.04, 0.03, 0.22]),
+    'FONDKAPREMONT_MODE': (['reg oper account', 'reg oper spec account', 'not specified', 'org spec account'],
+                           [0.76, 0.13, 0.06, 0.05]),
+    'HOUSETYPE_MODE': (['block of flats', 'specific housing', 'terraced house'], [0.98, 0.01, 0.01]),
+    'WALLSMATERIAL_MODE': (['Panel', 'Stone, brick', 'Block', 'Wooden', 'Mixed', 'Monolithic', 'Others'],
+                           [0.42, 0.41, 0.06, 0.04, 0.02, 0.01, 0.04]),
+    'EMERGENCYSTATE_MODE': (['No', 'Yes'], [0.985, 0.015]),
+    'NAME_CONTRACT_STATUS': (['Approved', 'Canceled', 'Refused', 'Unused offer'], [0.62, 0.19, 0.17, 0.02]),
+    'FLAG_LAST_APPL_PER_CONTRACT': (['Y', 'N'], [0.995, 0.005]),
+    'NAME_CASH_LOAN_PURPOSE': (['XAP', 'XNA', 'Repairs', 'Other', 'Urgent needs'], [0.55, 0.41, 0.015, 0.01, 0.015]),
+    'NAME_PAYMENT_TYPE': (['Cash through the bank', 'XNA', 'Non-cash from your account'], [0.62, 0.37, 0.01]),
+    'CODE_REJECT_REASON': (['XAP', 'HC', 'LIMIT', 'SCO', 'CLIENT', 'XNA'], [0.81, 0.1, 0.03, 0.02, 0.02, 0.02]),
+    'NAME_CLIENT_TYPE': (['Repeater', 'New', 'Refreshed', 'XNA'], [0.74, 0.18, 0.079, 0.001]),
+    'NAME_GOODS_CATEGORY': (['XNA', 'Mobile', 'Consumer Electronics', 'Computers', 'Audio/Video', 'Furniture'],
+                            [0.57, 0.13, 0.07, 0.06, 0.06, 0.11]),
+    'NAME_PORTFOLIO': (['POS', 'Cash', 'XNA', 'Cards', 'Cars'], [0.41, 0.28, 0.22, 0.085, 0.005]),
+    'NAME_PRODUCT_TYPE': (['XNA', 'x-sell', 'walk-in'], [0.64, 0.27, 0.09]),
+    'CHANNEL_TYPE': (['Credit and cash offices', 'Country-wide', 'Stone', 'Regional / Local',
+                      'Contact center', 'AP+ (Cash loan)'], [0.43, 0.3, 0.13, 0.07, 0.04, 0.03]),
+    'NAME_SELLER_INDUSTRY': (['XNA', 'Consumer electronics', 'Connectivity', 'Furniture', 'Construction'],
+                             [0.51, 0.24, 0.17, 0.04, 0.04]),
+    'NAME_YIELD_GROUP': (['XNA', 'middle', 'high', 'low_normal', 'low_action'], [0.31, 0.23, 0.21, 0.19, 0.06]),
+    'PRODUCT_COMBINATION': (['Cash', 'POS mobile with interest', 'Card Street', 'Cash X-Sell: middle',
+                             'POS household with interest'], [0.17, 0.13, 0.07, 0.09, 0.54]),
+}
+
+# Share of missing values, by exact column name or by suffix / prefix
+NULL_RATES = {
+    'application_data': {
+        'AMT_ANNUITY': 0.00004, 'AMT_GOODS_PRICE': 0.0009, 'NAME_TYPE_SUITE': 0.0042,
+        'OWN_CAR_AGE': 0.66, 'OCCUPATION_TYPE': 0.31, 'CNT_FAM_MEMBERS': 0.00001,
+        'EXT_SOURCE_1': 0.56, 'EXT_SOURCE_2': 0.002, 'EXT_SOURCE_3': 0.198,
+        'FONDKAPREMONT_MODE': 0.68, 'HOUSETYPE_MODE': 0.5, 'TOTALAREA_MODE': 0.48,
+        'WALLSMATERIAL_MODE': 0.51, 'EMERGENCYSTATE_MODE': 0.47,
+        'OBS_': 0.0033, 'DEF_': 0.0033, 'AMT_REQ_CREDIT_BUREAU_': 0.135,
+        '_AVG': 0.58, '_MODE': 0.58, '_MEDI': 0.58,
+    },
+    'previous_application': {
+        'AMT_ANNUITY': 0.22, 'AMT_DOWN_PAYMENT': 0.536, 'AMT_GOODS_PRICE': 0.23,
+        'RATE_DOWN_PAYMENT': 0.536, 'RATE_INTEREST_PRIMARY': 0.996, 'RATE_INTEREST_PRIVILEGED': 0.996,
+        'NAME_TYPE_SUITE': 0.49, 'CNT_PAYMENT': 0.22, 'PRODUCT_COMBINATION': 0.0002,
+        'DAYS_FIRST_DRAWING': 0.4, 'DAYS_FIRST_DUE': 0.4, 'DAYS_LAST_DUE_1ST_VERSION': 0.4,
+        'DAYS_LAST_DUE': 0.4, 'DAYS_TERMINATION': 0.4, 'NFLAG_INSURED_ON_APPROVAL': 0.4,
+    },
+}
+
+
+def null_rate(table, col):
+    rates = NULL_RATES[table]
+    if col in rates:
+        return rates[col]
+    for key, rate in rates.items():
+        if col.startswith(key) or col.endswith(key):
+            return rate
+    return 0.0
+
+
+def _column(table, col, rng, n, start, clients):
+    """Values of one column for ``n`` rows starting at row ``start``."""
+    if col == 'SK_ID_CURR' and table == 'application_data':
+        return np.arange(FIRST_CLIENT_ID + start, FIRST_CLIENT_ID + start + n)
+    if col == 'SK_ID_CURR':
+        # previous loans belong to generated applicants
+        return rng.integers(FIRST_CLIENT_ID, FIRST_CLIENT_ID + clients, n)
+    if col == 'SK_ID_PREV':
+        return np.arange(FIRST_PREV_ID + start, FIRST_PREV_ID + start + n)
+    if col in CATEGORIES:
+        values, weights = CATEGORIES[col]
+        return rng.choice(values, n, p=np.array(weights) / sum(weights))
+    if col == 'TARGET':
+        return (rng.random(n) < 0.081).astype('int8')
+    if col.startswith(('FLAG_', 'NFLAG_', 'REG_', 'LIVE_')):
+        return (rng.random(n) < 0.2).astype('int8')
+    if col == 'DAYS_EMPLOYED':
+        return np.where(rng.random(n) < 0.18, DAYS_SENTINEL, -rng.integers(0, 17000, n))
+    if col == 'DAYS_BIRTH':
+        return -rng.integers(7500, 25230, n)
+    if col.startswith('DAYS_') and table == 'previous_application':
+        days = -rng.integers(1, 2923, n)
+        if col != 'DAYS_DECISION':
+            days = np.where(rng.random(n) < 0.35, DAYS_SENTINEL, days)
+        return days
+    if col.startswith('DAYS_'):
+        return -rng.integers(0, 7000, n)
+    if col.startswith('AMT_REQ_CREDIT_BUREAU_'):
+        return rng.poisson(0.3, n)
+    if col in ('AMT_INCOME_TOTAL', 'AMT_ANNUITY'):
+        scale = 168_000 if col == 'AMT_INCOME_TOTAL' else 27_000
+        return np.round(rng.lognormal(np.log(scale), 0.5, n), 1)
+    if col.startswith('AMT_'):
+        return np.round(rng.lognormal(np.log(500_000 if table == 'application_data' else 150_000), 0.7, n), 1)
+    if col == 'CNT_CHILDREN':
+        return rng.choice([0, 1, 2, 3, 4], n, p=[0.7, 0.2, 0.087, 0.012, 0.001])
+    if col == 'CNT_FAM_MEMBERS':
+        return rng.choice([1.0, 2.0, 3.0, 4.0, 5.0], n, p=[0.22, 0.51, 0.17, 0.08, 0.02])
+    if col.startswith(('CNT_', 'OBS_', 'DEF_')) or col == 'OWN_CAR_AGE':
+        return rng.poisson(12 if col in ('CNT_PAYMENT', 'OWN_CAR_AGE') else 1, n).astype('float64')
+    if col.startswith('HOUR_'):
+        return rng.integers(0, 24, n)
+    if col.startswith('REGION_RATING'):
+        return rng.choice([1, 2, 3], n, p=[0.1, 0.74, 0.16])
+    if col == 'SELLERPLACE_AREA':
+        return rng.integers(-1, 5000, n)
+    # EXT_SOURCE_*, building info, rates, REGION_POPULATION_RELATIVE
+    return np.round(rng.beta(2, 3, n), 6)
+
+
+def generate_block(table, n, start=0, seed=0, clients=None):
+    """``n`` rows of ``table`` starting at row ``start``, always the same for a given seed.
+
+    ``clients`` is the number of applicants previous loans are spread over.
+    """
+    rng = np.random.default_rng([seed, start, 0 if table == 'application_data' else 1])
+    clients = clients or start + n
+    data = {}
+    for col in table_columns(table):
+        values = pd.Series(_column(table, col, rng, n, start, clients))
+        rate = null_rate(table, col)
+        if rate:
+            values = values.where(rng.random(n) >= rate)
+        data[col] = values
+    return pd.DataFrame(data)
+
+
+def write_table(table, rows, path, seed=0, block_rows=BLOCK_ROWS):
+    for start in range(0, rows, block_rows):
+        block = generate_block(table, min(block_rows, rows - start), start, seed, clients=rows)
+        block.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+
+def generate(rows, output_dir, seed=0):
+    """application_data.csv and previous_application.csv with ``rows`` rows each."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for table in ('application_data', 'previous_application'):
+        paths[table] = os.path.join(output_dir, table + '.csv')
+        write_table(table, rows, paths[table], seed)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic loan datasets.")
+    parser.add_argument('rows', help=f"row count or one of {list(SCALES)}")
+    parser.add_argument('output_dir')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows = SCALES.get(args.rows) or int(args.rows)
+    paths = generate(rows, args.output_dir, args.seed)
+    for table, path in paths.items():
+        print(f"💾 {table}: {rows} rows written to {path}")
+
+
+if __name__ == "__main__":
+    main()
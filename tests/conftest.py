@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# the modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import loan_data_cleaning  # noqa: E402
+import synthetic_data  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def cleaned_dir(tmp_path_factory):
+    """Output directory of a full cleaning run over a small synthetic dataset."""
+    root = tmp_path_factory.mktemp('cleaned')
+    raw = synthetic_data.generate(2000, str(root / 'raw'))
+    output = str(root / 'out')
+    loan_data_cleaning.main(['--app-data', raw['application_data'],
+                             '--prev-data', raw['previous_application'], '--output-dir', output])
+    return output
@@ -0,0 +1,26 @@
+import os
+import time
+
+import pytest
+from PIL import Image
+
+import assets
+
+
+def test_static_variants_sized_on_disk_and_pruned(tmp_path, monkeypatch):
+    if not assets.webp_available():
+        pytest.skip("this Pillow build cannot write WebP")
+    monkeypatch.setattr(assets, 'ASSET_DIR', str(tmp_path / 'assets'))
+    path = str(tmp_path / 'chart.png')
+    Image.new('RGB', (800, 400), 'navy').save(path)
+
+    names = assets._variants.get(path, assets._static_variants)
+    on_disk = sum(os.path.getsize(os.path.join(assets.ASSET_DIR, name)) for name in names.values())
+    assert assets._variants_bytes(names) == on_disk > 100
+
+    # a changed image gets new files and the old ones are deleted
+    time.sleep(0.01)
+    Image.new('RGB', (800, 400), 'teal').save(path)
+    new_names = assets._variants.get(path, assets._static_variants)
+    assert sorted(os.listdir(assets.ASSET_DIR)) == sorted(new_names.values())
+    assert set(new_names.values()).isdisjoint(names.values())
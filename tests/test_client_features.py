@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from client_features import CLIENT_COLUMNS, PREV_COLUMNS, build_client_features
+from storage import read_cleaned
+
+
+def _regrouped(path, target, rows):
+    # small row groups, so the features are merged from many partials
+    pq.write_table(pa.Table.from_pandas(read_cleaned(path), preserve_index=False), target,
+                   row_group_size=rows)
+    return target
+
+
+def test_features_match_a_direct_groupby(cleaned_dir, tmp_path):
+    app_path = _regrouped(os.path.join(cleaned_dir, 'cleaned_application_data.parquet'),
+                          str(tmp_path / 'app.parquet'), 250)
+    prev_path = _regrouped(os.path.join(cleaned_dir, 'cleaned_previous_application.parquet'),
+                           str(tmp_path / 'prev.parquet'), 300)
+    output = str(tmp_path / 'client_features.parquet')
+    rows, _ = build_client_features(app_path, prev_path, output)
+    clients = read_cleaned(output).set_index('SK_ID_CURR')
+
+    app = read_cleaned(app_path, columns=CLIENT_COLUMNS)
+    prev = read_cleaned(prev_path, columns=PREV_COLUMNS)
+    grouped = prev.groupby('SK_ID_CURR')
+    assert rows == len(app) and clients.index.is_monotonic_increasing
+    expected = pd.DataFrame({
+        'PREV_COUNT': grouped.size(),
+        'PREV_REFUSED_COUNT': grouped['NAME_CONTRACT_STATUS'].apply(lambda s: (s == 'Refused').sum()),
+        'PREV_AMT_CREDIT_MEAN': grouped['AMT_CREDIT'].mean(),
+        'PREV_AMT_APPLICATION_MAX': grouped['AMT_APPLICATION'].max(),
+        'PREV_DAYS_DECISION_LAST': grouped['DAYS_DECISION'].max(),
+    }).reindex(app['SK_ID_CURR'].sort_values())
+    expected[['PREV_COUNT', 'PREV_REFUSED_COUNT']] = expected[['PREV_COUNT', 'PREV_REFUSED_COUNT']].fillna(0)
+
+    for col in expected.columns:
+        np.testing.assert_allclose(clients[col].to_numpy(dtype='float64'), expected[col].to_numpy(dtype='float64'),
+                                   rtol=1e-9, err_msg=col)
+    assert clients['PREV_REFUSED_RATIO'].dropna().between(0, 1).all()
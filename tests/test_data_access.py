@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+import data_access
+from storage import read_cleaned
+
+
+def test_load_cleaned_in_filter(cleaned_dir):
+    path = os.path.join(cleaned_dir, 'cleaned_application_data.parquet')
+    filters = [('CODE_GENDER', 'in', ['F'])]
+    df = data_access.load_cleaned(path, columns=['CODE_GENDER', 'AMT_CREDIT'], filters=filters)
+    assert len(df) == len(read_cleaned(path, columns=['CODE_GENDER', 'AMT_CREDIT'], filters=filters))
+    assert set(df['CODE_GENDER']) == {'F'}
+    # the second call is a cache hit
+    assert data_access.load_cleaned(path, columns=['CODE_GENDER', 'AMT_CREDIT'], filters=filters) is df
+
+
+def test_failed_load_leaves_no_key_lock(tmp_path):
+    path = tmp_path / 'broken.parquet'
+    path.write_bytes(b'not parquet')
+    cache = data_access.DatasetCache()
+    with pytest.raises(Exception):
+        cache.get(str(path), read_cleaned)
+    assert cache._key_locks == {}
@@ -0,0 +1,27 @@
+import gzip
+import io
+import os
+import shutil
+
+import pandas as pd
+
+import downloads
+from storage import append_cleaned, read_cleaned
+
+
+def test_payloads_of_a_table_with_parts(cleaned_dir, tmp_path):
+    path = str(tmp_path / 'cleaned_previous_application.parquet')
+    shutil.copy(os.path.join(cleaned_dir, 'cleaned_previous_application.parquet'), path)
+    append_cleaned(read_cleaned(path).head(100), path)
+    expected = read_cleaned(path)
+
+    parquet = downloads.payload(path)
+    pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(parquet)), expected)
+    csv = pd.read_csv(io.BytesIO(gzip.decompress(downloads.payload(path, True, 'gzip'))))
+    assert csv.shape == expected.shape
+
+    # the payloads live on disk and go with the cache entries
+    files = [downloads.payload_file(path), downloads.payload_file(path, True, 'gzip')]
+    assert all(os.path.exists(file) for file in files)
+    downloads._payloads.clear()
+    assert not any(os.path.exists(file) for file in files)
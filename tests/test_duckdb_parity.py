@@ -0,0 +1,14 @@
+import os
+
+import pytest
+
+import duckdb_backend
+
+pytestmark = pytest.mark.skipif(not duckdb_backend.available(), reason="duckdb is not installed")
+
+
+def test_duckdb_matches_pandas(cleaned_dir):
+    problems = duckdb_backend.check_parity(
+        os.path.join(cleaned_dir, 'cleaned_application_data.parquet'),
+        os.path.join(cleaned_dir, 'cleaned_previous_application.parquet'))
+    assert problems == []
@@ -0,0 +1,53 @@
+import json
+import os
+
+import pandas as pd
+
+from imputation import Imputer
+from loan_data_cleaning import EXT_SOURCE_COLS, GROUP_MODE_FILLS, application_imputer, previous_imputer
+from schema import read_table
+
+
+def _raw(cleaned_dir, table):
+    return read_table(os.path.join(os.path.dirname(cleaned_dir), 'raw', table + '.csv'), table)
+
+
+def test_application_fills_match_pandas(cleaned_dir):
+    df = _raw(cleaned_dir, 'application_data')
+    for col in GROUP_MODE_FILLS:
+        df.loc[df.index[::7], col] = None
+    imputer = application_imputer().fit(df)
+    for col in EXT_SOURCE_COLS:
+        assert imputer.medians[col] == df[col].median()
+
+    for col, by in GROUP_MODE_FILLS.items():
+        expected = {key: group.mode().iloc[0]
+                    for key, group in df.groupby(by, observed=True)[col] if group.notna().any()}
+        assert imputer.group_modes[col] == expected
+
+    filled = imputer.transform(df.copy())
+    assert filled[EXT_SOURCE_COLS].notna().all().all()
+    for col, by in GROUP_MODE_FILLS.items():
+        was_null = df[col].isna() & df[by].isin(list(imputer.group_modes[col]))
+        assert was_null.any()
+        assert (filled.loc[was_null, col].astype(object)
+                == df.loc[was_null, by].map(imputer.group_modes[col]).astype(object)).all()
+        # rows that had a value keep it
+        assert filled.loc[df[col].notna(), col].equals(df.loc[df[col].notna(), col])
+
+
+def test_previous_fills_and_saved_state(cleaned_dir):
+    df = _raw(cleaned_dir, 'previous_application')
+    imputer = previous_imputer().fit(df)
+    for col in df.select_dtypes(include='category').columns:
+        if df[col].notna().any():
+            assert imputer.modes[col] == df[col].mode().iloc[0]
+    for col in df.select_dtypes(include='number').columns:
+        if df[col].notna().any():
+            assert imputer.medians[col] == df[col].median()
+
+    filled = imputer.transform(df.copy())
+    assert filled[list(imputer.medians) + list(imputer.modes)].notna().all().all()
+    # a reloaded state fills the same values
+    reloaded = Imputer.from_state(json.loads(json.dumps(imputer.state())))
+    pd.testing.assert_frame_equal(reloaded.transform(df.copy()), filled)
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+import instrumentation
+
+
+def test_stage_peak_is_per_stage(tmp_path):
+    if instrumentation.reset_high_water() is None:
+        pytest.skip("the RSS high-water mark cannot be reset here")
+    report = instrumentation.RunReport(str(tmp_path / 'report.jsonl'))
+    with report.stage('outer'):
+        with report.stage('big'):
+            block = np.ones(200 * 1024 ** 2 // 8)
+            del block
+        with report.stage('small'):
+            pass
+    records = {record['stage']: record for record in report.records()}
+    assert records['big']['peak_rss_mb'] >= records['small']['rss_mb'] + 150
+    # the later stage does not inherit the earlier peak, the enclosing one does
+    assert records['small']['peak_rss_mb'] < records['big']['peak_rss_mb'] - 150
+    assert records['outer']['peak_rss_mb'] >= records['big']['peak_rss_mb']
+    assert records['small']['process_peak_rss_mb'] >= records['big']['peak_rss_mb']
@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+import pytest
+
+import kpi_cube
+from measures import DEFAULT_STATUS, compute_measures
+from storage import read_cleaned
+
+
+def test_cube_cells_match_groupby(cleaned_dir):
+    app = read_cleaned(os.path.join(cleaned_dir, 'cleaned_application_data.parquet'))
+    prev = read_cleaned(os.path.join(cleaned_dir, 'cleaned_previous_application.parquet'),
+                        columns=['SK_ID_CURR', 'NAME_CONTRACT_STATUS'])
+    cube = read_cleaned(os.path.join(cleaned_dir, 'kpi_cube.parquet'))
+
+    refused = prev['NAME_CONTRACT_STATUS'].astype(object) == DEFAULT_STATUS
+    loans = prev.assign(refused=refused).groupby('SK_ID_CURR').agg(
+        prev_loans=('refused', 'size'), prev_refused=('refused', 'sum'))
+    clients = app.join(loans, on='SK_ID_CURR').fillna({'prev_loans': 0, 'prev_refused': 0})
+    expected = clients.groupby(kpi_cube.DIMENSIONS, observed=True).agg(
+        applicants=('SK_ID_CURR', 'size'), income_sum=('AMT_INCOME_TOTAL', 'sum'),
+        credit_sum=('AMT_CREDIT', 'sum'), target_defaults=('TARGET', 'sum'),
+        prev_loans=('prev_loans', 'sum'), prev_refused=('prev_refused', 'sum'))
+
+    cells = cube.iloc[:-1].astype({col: str for col in kpi_cube.DIMENSIONS})
+    cells = cells.set_index(kpi_cube.DIMENSIONS)[expected.columns]
+    expected.index = expected.index.map(lambda key: tuple(map(str, key)))
+    expected = expected.loc[cells.index]
+    assert len(cells) == len(expected) == len(clients.groupby(kpi_cube.DIMENSIONS, observed=True))
+    np.testing.assert_allclose(cells.to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=1e-9)
+
+    # the last cell holds the loans of applicants removed by the cleaning
+    unmatched = ~prev['SK_ID_CURR'].isin(app['SK_ID_CURR'])
+    assert cube.iloc[-1]['prev_loans'] == unmatched.sum()
+    assert cube.iloc[-1]['prev_refused'] == (refused & unmatched).sum()
+
+    for filters in (None, {'CODE_GENDER': ['F'], 'NAME_CONTRACT_TYPE': ['Cash loans']}):
+        got, want = kpi_cube.cube_measures(cube, filters), compute_measures(app, prev, filters)
+        assert got.keys() == want.keys()
+        for name in want:
+            assert got[name] == pytest.approx(want[name], rel=1e-9)
@@ -0,0 +1,13 @@
+import pandas as pd
+
+from outliers import OutlierFilter
+
+
+def test_no_fitted_columns_keeps_every_row():
+    df = pd.DataFrame({'AMT_CREDIT': [1.0, 2.0, 1e9]})
+    for mode in ('sequential', 'simultaneous'):
+        outliers = OutlierFilter(['MISSING_COLUMN'], mode).fit(df)
+        kept, removed = outliers.transform(df)
+        assert len(kept) == len(df) and removed == {}
+    keep, removed = OutlierFilter([]).fit(df).mask(df)
+    assert keep.all() and removed == {}
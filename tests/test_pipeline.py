@@ -0,0 +1,43 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+
+import loan_data_cleaning
+import pipeline
+from previews import load_preview
+from profiling import load_profile
+
+
+def test_pipeline_matches_cleaning_run(cleaned_dir, tmp_path):
+    raw = os.path.join(os.path.dirname(cleaned_dir), 'raw')
+    with open(pipeline.CONFIG_PATH) as f:
+        config = json.load(f)
+    config['cache_dir'] = str(tmp_path / 'cache')
+    for table, spec in config['tables'].items():
+        spec['source'] = shutil.copy(os.path.join(raw, table + '.csv'), tmp_path)
+        spec['output'] = str(tmp_path / 'out' / f'cleaned_{table}.parquet')
+    config_path = tmp_path / 'pipeline.json'
+    config_path.write_text(json.dumps(config))
+    pipeline.main(['--config', str(config_path)])
+
+    for table, spec in config['tables'].items():
+        # the sidecars the report and the incremental runs read
+        assert load_preview(spec['source']) is not None
+        assert load_profile(spec['source']) is not None
+        expected = pd.read_parquet(os.path.join(cleaned_dir, f'cleaned_{table}.parquet'))
+        pd.testing.assert_frame_equal(pd.read_parquet(spec['output']), expected)
+
+    with open(tmp_path / 'out' / loan_data_cleaning.PARAMS_FILE) as f:
+        params = json.load(f)
+    with open(os.path.join(cleaned_dir, loan_data_cleaning.PARAMS_FILE)) as f:
+        expected = json.load(f)
+    for table in loan_data_cleaning.TABLES:
+        params[table].pop('source'), expected[table].pop('source')
+    assert params == expected
+
+    # a refit picks up the parameters the pipeline saved
+    loan_data_cleaning.main(['refit', '--no-publish', '--output-dir', str(tmp_path / 'out'),
+                             '--app-data', config['tables']['application_data']['source'],
+                             '--prev-data', config['tables']['previous_application']['source']])
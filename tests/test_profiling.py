@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from profiling import Profiler, QuantileSketch, profile_frame
+from schema import csv_options, read_table
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+
+def _rank_error(sketch, values):
+    values = np.sort(values)
+    ranks = np.searchsorted(values, [sketch.quantile(q) for q in QUANTILES]) / len(values)
+    return np.abs(ranks - QUANTILES).max()
+
+
+def test_sketch_is_exact_before_compacting():
+    values = np.random.default_rng(0).normal(size=5000)
+    sketch = QuantileSketch(k=8192)
+    for chunk in np.array_split(values, 7):
+        sketch.update(chunk)
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+        assert sketch.quantile(q) == pd.Series(values).quantile(q)
+
+
+def test_sketch_rank_error_bound():
+    k = 512
+    values = np.random.default_rng(1).lognormal(0, 1, 200_000)
+    for seed in range(3):
+        sketch = QuantileSketch(k, seed=seed)
+        for chunk in np.array_split(values, 37):
+            sketch.update(chunk)
+        assert sketch.count == len(values)
+        assert all(items.size <= k for items in sketch.levels)
+        assert _rank_error(sketch, values) <= 4 / k
+
+        # merged sketches of disjoint parts keep the bound
+        parts = [QuantileSketch(k, seed=seed).update(part) for part in np.array_split(values, 4)]
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+        assert merged.count == len(values)
+        assert _rank_error(merged, values) <= 4 / k
+
+
+def test_chunked_profile_matches_in_memory(cleaned_dir):
+    path = os.path.join(os.path.dirname(cleaned_dir), 'raw', 'application_data.csv')
+    profiler = Profiler(median_cols='numeric')
+    for chunk in pd.read_csv(path, chunksize=300, **csv_options('application_data', categories=False)):
+        profiler.update(chunk)
+    chunked = profiler.profile()
+
+    df = read_table(path, 'application_data')
+    expected = profile_frame(df)
+    assert chunked['rows'] == expected['rows'] == len(df)
+    null_fractions = df.isna().mean()
+    for col, stats in chunked['columns'].items():
+        assert stats['nulls'] == expected['columns'][col]['nulls']
+        assert stats['null_fraction'] == null_fractions[col]
+        if stats['kind'] == 'numeric' and stats['median'] is not None:
+            # under 65,536 rows the sketch is exact
+            assert stats['median'] == expected['columns'][col]['median']
@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import scoring
+from client_features import add_client_features
+
+
+def test_parallel_scores_match_serial(cleaned_dir, tmp_path):
+    app_path = os.path.join(cleaned_dir, 'cleaned_application_data.parquet')
+    prev_path = os.path.join(cleaned_dir, 'cleaned_previous_application.parquet')
+    model = scoring.fit_model(app_path, prev_path)
+    # several row groups, so the processes get more than one each
+    input_path = str(tmp_path / 'applicants.parquet')
+    pq.write_table(pq.read_table(app_path), input_path, row_group_size=300)
+    assert pq.ParquetFile(input_path).num_row_groups > 4
+
+    scores = {}
+    for jobs in (1, 2):
+        output = str(tmp_path / f'scores_{jobs}.parquet')
+        assert scoring.score_file(model, input_path, output, prev_path, batch_rows=128, jobs=jobs) == pq.read_metadata(app_path).num_rows
+        scores[jobs] = pd.read_parquet(output)
+    pd.testing.assert_frame_equal(scores[2], scores[1])
+
+    apps = add_client_features(pd.read_parquet(app_path), scoring.load_previous_features(prev_path))
+    np.testing.assert_array_equal(scores[1]['SK_ID_CURR'], apps['SK_ID_CURR'])
+    np.testing.assert_allclose(scores[1]['DEFAULT_PROBABILITY'], model.predict(apps), rtol=1e-6)
@@ -0,0 +1,50 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data_access
+import shared_tables
+from storage import ChunkWriter, read_cleaned, write_cleaned
+
+
+def _tables(directory, version):
+    paths = [os.path.join(directory, name) for name in ('cleaned.parquet', 'kpi_cube.parquet')]
+    for i, path in enumerate(paths):
+        write_cleaned(pd.DataFrame({'value': [version * 10 + i] * 3}), path)
+    return paths
+
+
+def _seen(paths):
+    return [int(data_access.load_cleaned(path)['value'].iloc[0]) for path in paths]
+
+
+def test_readers_stay_on_the_published_set(tmp_path):
+    paths = _tables(str(tmp_path), 1)
+    shared_tables.publish(paths)
+    assert _seen(paths) == [10, 11]
+
+    # a later run has rewritten one table but not published yet
+    write_cleaned(pd.DataFrame({'value': [20] * 3}), paths[0])
+    assert _seen(paths) == [10, 11]
+    assert not os.path.exists(paths[0] + '.tmp')
+
+    _tables(str(tmp_path), 2)
+    shared_tables.publish(paths)
+    assert _seen(paths) == [20, 21]
+
+    # withdrawn: every table comes from Parquet, none from the old set
+    write_cleaned(pd.DataFrame({'value': [30] * 3}), paths[0])
+    shared_tables.withdraw(shared_tables.shared_dir(paths[0]))
+    assert _seen(paths) == [30, 21]
+
+
+def test_failed_chunk_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / 'table.parquet')
+    write_cleaned(pd.DataFrame({'value': [1, 2]}), path)
+    with pytest.raises(RuntimeError):
+        with ChunkWriter(path) as writer:
+            writer.write(pd.DataFrame({'value': [3]}))
+            raise RuntimeError('interrupted')
+    assert read_cleaned(path)['value'].tolist() == [1, 2]
+    assert not os.path.exists(path + '.tmp')
@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+
+import loan_data_cleaning
+
+
+def test_stream_output_matches_in_memory(cleaned_dir, tmp_path):
+    raw = os.path.join(os.path.dirname(cleaned_dir), 'raw')
+    loan_data_cleaning.main(['--stream', '--chunksize', '700', '--no-publish',
+                             '--app-data', os.path.join(raw, 'application_data.csv'),
+                             '--prev-data', os.path.join(raw, 'previous_application.csv'),
+                             '--output-dir', str(tmp_path)])
+    for name in ('cleaned_application_data', 'cleaned_previous_application'):
+        expected = pd.read_parquet(os.path.join(cleaned_dir, name + '.parquet'))
+        streamed = pd.read_parquet(tmp_path / (name + '.parquet'))
+        # same dtypes, text columns as categories included
+        pd.testing.assert_frame_equal(streamed, expected, check_exact=False, rtol=1e-9)
+
+
+def test_stream_shrinks_exact_amounts(cleaned_dir, tmp_path):
+    # amounts in halves are exact in float32, so both engines must write float32
+    raw = os.path.join(os.path.dirname(cleaned_dir), 'raw')
+    paths = {}
+    for table in ('application_data', 'previous_application'):
+        df = pd.read_csv(os.path.join(raw, table + '.csv'))
+        for col in df.columns:
+            if col.startswith('AMT_') and not col.startswith('AMT_REQ_'):
+                df[col] = df[col] // 1 + 0.5
+        paths[table] = str(tmp_path / (table + '.csv'))
+        df.to_csv(paths[table], index=False)
+    for engine in ('memory', 'stream'):
+        extra = ['--stream', '--chunksize', '700'] if engine == 'stream' else []
+        loan_data_cleaning.main(extra + ['--no-publish', '--app-data', paths['application_data'],
+                                         '--prev-data', paths['previous_application'],
+                                         '--output-dir', str(tmp_path / engine)])
+    for name in ('cleaned_application_data', 'cleaned_previous_application'):
+        expected = pd.read_parquet(tmp_path / 'memory' / (name + '.parquet'))
+        streamed = pd.read_parquet(tmp_path / 'stream' / (name + '.parquet'))
+        assert expected['AMT_CREDIT'].dtype == 'float32'
+        pd.testing.assert_frame_equal(streamed, expected, check_exact=False, rtol=1e-9)
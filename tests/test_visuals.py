@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import visuals
+from measures import DEFAULT_STATUS
+from storage import read_cleaned
+
+
+def test_grid_counts_match_histogram(cleaned_dir):
+    clients = read_cleaned(os.path.join(cleaned_dir, 'client_features.parquet'),
+                           columns=visuals.GRID_COLUMNS)
+    grid = read_cleaned(os.path.join(cleaned_dir, 'income_credit_grid.parquet'))
+    clients = clients.dropna(subset=['AMT_INCOME_TOTAL', 'AMT_CREDIT'])
+    income = clients['AMT_INCOME_TOTAL'].to_numpy(dtype='float64')
+    credit = clients['AMT_CREDIT'].to_numpy(dtype='float64')
+    edges = [np.linspace(values.min(), values.max(), visuals.GRID_BINS + 1) for values in (income, credit)]
+
+    applicants, _, _ = np.histogram2d(income, credit, bins=edges)
+    defaults, _, _ = np.histogram2d(income, credit, bins=edges, weights=clients['TARGET'].to_numpy())
+    filled = np.nonzero(applicants)
+    assert len(grid) == len(filled[0])
+    assert grid['applicants'].sum() == len(clients)
+    expected = pd.DataFrame({'income_low': edges[0][filled[0]], 'credit_low': edges[1][filled[1]],
+                             'applicants': applicants[filled].astype('int64'),
+                             'defaults': defaults[filled].astype('int64')})
+    got = grid[expected.columns].sort_values(['income_low', 'credit_low'], ignore_index=True)
+    pd.testing.assert_frame_equal(got, expected.sort_values(['income_low', 'credit_low'], ignore_index=True))
+
+
+def test_monthly_trend_counts(cleaned_dir):
+    prev = read_cleaned(os.path.join(cleaned_dir, 'cleaned_previous_application.parquet'),
+                        columns=visuals.TREND_COLUMNS)
+    trend = read_cleaned(os.path.join(cleaned_dir, 'default_trend.parquet'))
+    refused = prev['NAME_CONTRACT_STATUS'].astype(object) == DEFAULT_STATUS
+    month = prev['DAYS_DECISION_ACTUAL'].dt.to_period('M').dt.to_timestamp()
+    expected = refused.groupby(month).agg(['size', 'sum'])
+    assert trend['loans'].sum() == prev['DAYS_DECISION_ACTUAL'].notna().sum()
+    np.testing.assert_array_equal(trend['month'].to_numpy(), expected.index.to_numpy(dtype='datetime64[ns]'))
+    np.testing.assert_array_equal(trend['loans'], expected['size'])
+    np.testing.assert_array_equal(trend['defaults'], expected['sum'])
+    np.testing.assert_allclose(trend['default_rate'], expected['sum'] / expected['size'])
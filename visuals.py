@@ -0,0 +1,192 @@
+"""Server-side aggregates behind the report's Income vs Credit and Default Trend visuals.
+
+Neither visual needs the individual rows in the browser:
+
+- the Income vs Credit scatter is a fixed grid of AMT_INCOME_TOTAL x
+  AMT_CREDIT rectangles, each with its applicant count and default rate
+  (TARGET), built with one ``bincount`` over the flattened cell index;
+- the Default Trend is a monthly rollup of the previous loans by
+  DAYS_DECISION_ACTUAL, with the refused loans counted as defaults like the
+  ``Total Defaults`` measure.
+
+Both tables are written once per cleaning run, so what the report sends to the
+browser depends on the grid size and the number of months, not on the number
+of rows.  ``write_visuals`` reads its inputs one row group at a time: the grid
+in two passes (the value range, then the counts), the trend by adding up the
+monthly counts of every group.  After an incremental run ``update_visuals``
+adds the counts of the appended rows to both; the grid is only rebuilt when a
+new applicant falls outside its value range.
+"""
+import numpy as np
+import pandas as pd
+
+from measures import DEFAULT_STATUS
+from storage import iter_row_groups, read_cleaned, write_cleaned
+
+# Cells per axis of the Income vs Credit grid
+GRID_BINS = 40
+
+GRID_COLUMNS = ['TARGET', 'AMT_INCOME_TOTAL', 'AMT_CREDIT']
+TREND_COLUMNS = ['DAYS_DECISION_ACTUAL', 'NAME_CONTRACT_STATUS']
+
+
+def _edges(values, bins):
+    low, high = (float(values.min()), float(values.max())) if len(values) else (0.0, 1.0)
+    return _range_edges(low, high, bins)
+
+
+def _range_edges(low, high, bins):
+    if high <= low:
+        high = low + 1
+    return np.linspace(low, high, bins + 1)
+
+
+def _bin_index(values, edges):
+    # the last edge belongs to the last cell, like np.histogram
+    return np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+
+
+def _grid_values(clients):
+    """Income, credit and TARGET of the rows with both amounts."""
+    income = clients['AMT_INCOME_TOTAL'].to_numpy(dtype='float64', na_value=np.nan)
+    credit = clients['AMT_CREDIT'].to_numpy(dtype='float64', na_value=np.nan)
+    target = clients['TARGET'].to_numpy(dtype='float64', na_value=np.nan)
+    valid = np.isfinite(income) & np.isfinite(credit)
+    return income[valid], credit[valid], target[valid]
+
+
+def _grid_counts(clients, income_edges, credit_edges, bins):
+    """Applicants, defaults and labelled applicants per flattened cell."""
+    income, credit, target = _grid_values(clients)
+    cells = _bin_index(income, income_edges) * bins + _bin_index(credit, credit_edges)
+    applicants = np.bincount(cells, minlength=bins * bins)
+    has_target = ~np.isnan(target)
+    defaults = np.bincount(cells[has_target], weights=target[has_target], minlength=bins * bins)
+    labelled = np.bincount(cells[has_target], minlength=bins * bins)
+    return applicants, defaults, labelled
+
+
+def income_credit_grid(clients, bins=GRID_BINS):
+    """Non-empty cells of the income x credit grid with their default rate."""
+    income, credit, _ = _grid_values(clients)
+    income_edges, credit_edges = _edges(income, bins), _edges(credit, bins)
+    counts = _grid_counts(clients, income_edges, credit_edges, bins)
+    return _grid_frame(counts, income_edges, credit_edges, bins)
+
+
+def _grid_frame(counts, income_edges, credit_edges, bins):
+    applicants, defaults, labelled = counts
+    filled = np.flatnonzero(applicants)
+    income_bin, credit_bin = np.divmod(filled, bins)
+    return pd.DataFrame({
+        'income_low': income_edges[income_bin],
+        'income_high': income_edges[income_bin + 1],
+        'credit_low': credit_edges[credit_bin],
+        'credit_high': credit_edges[credit_bin + 1],
+        'applicants': applicants[filled],
+        'defaults': defaults[filled].astype('int64'),
+        'labelled': labelled[filled],
+        'default_rate': defaults[filled] / np.where(labelled[filled] > 0, labelled[filled], np.nan),
+    })
+
+
+def grid_from_groups(features_path, bins=GRID_BINS):
+    """``income_credit_grid`` of a table, read one row group at a time in two passes."""
+    low, high = [np.inf, np.inf], [-np.inf, -np.inf]
+    for clients in iter_row_groups(features_path, columns=GRID_COLUMNS):
+        for axis, values in enumerate(_grid_values(clients)[:2]):
+            if len(values):
+                low[axis], high[axis] = min(low[axis], values.min()), max(high[axis], values.max())
+    if np.isinf(low[0]):
+        low, high = [0.0, 0.0], [1.0, 1.0]
+    income_edges, credit_edges = (_range_edges(float(lo), float(hi), bins) for lo, hi in zip(low, high))
+
+    counts = [np.zeros(bins * bins, dtype='int64'), np.zeros(bins * bins), np.zeros(bins * bins, dtype='int64')]
+    for clients in iter_row_groups(features_path, columns=GRID_COLUMNS):
+        for total, part in zip(counts, _grid_counts(clients, income_edges, credit_edges, bins)):
+            total += part
+    return _grid_frame(counts, income_edges, credit_edges, bins)
+
+
+def _monthly_counts(prev):
+    """Loans and refused loans per month, indexed by month."""
+    decided = prev['DAYS_DECISION_ACTUAL']
+    if not pd.api.types.is_datetime64_any_dtype(decided):
+        # epoch days from the pipeline's ``epoch_days`` option
+        decided = pd.to_datetime(decided, unit='D')
+    months = decided.to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+    refused = (prev['NAME_CONTRACT_STATUS'].astype('object') == DEFAULT_STATUS).to_numpy()
+    rollup = pd.DataFrame({'month': months, 'refused': refused}).dropna(subset=['month'])
+    return rollup.groupby('month', sort=True).agg(loans=('refused', 'size'), defaults=('refused', 'sum'))
+
+
+def _trend_frame(counts):
+    trend = counts.astype('int64')
+    trend['default_rate'] = trend['defaults'] / trend['loans']
+    trend.index = trend.index.astype('datetime64[ns]')
+    return trend.reset_index()
+
+
+def monthly_trend(prev):
+    """Previous loans and refusals per month of DAYS_DECISION_ACTUAL."""
+    return _trend_frame(_monthly_counts(prev))
+
+
+def trend_from_groups(prev_path):
+    """``monthly_trend`` of a table, with the monthly counts added up per row group."""
+    counts = [_monthly_counts(prev) for prev in iter_row_groups(prev_path, columns=TREND_COLUMNS)]
+    counts = counts or [_monthly_counts(read_cleaned(prev_path, columns=TREND_COLUMNS))]
+    return _trend_frame(pd.concat(counts).groupby(level=0, sort=True).sum())
+
+
+def _grid_state(grid, bins):
+    """Edges and counts a grid was built from, or None if they cannot be recovered exactly."""
+    if not len(grid) or 'labelled' not in grid:
+        return None
+    edges = [_range_edges(float(grid[f'{axis}_low'].min()), float(grid[f'{axis}_high'].max()), bins)
+             for axis in ('income', 'credit')]
+    bin_of = [np.searchsorted(axis_edges, grid[f'{axis}_low'].to_numpy())
+              for axis_edges, axis in zip(edges, ('income', 'credit'))]
+    # e.g. a grid whose values were all equal has its range widened and is rebuilt instead
+    if not all(np.array_equal(axis_edges[b], grid[f'{axis}_low'].to_numpy())
+               and np.array_equal(axis_edges[b + 1], grid[f'{axis}_high'].to_numpy())
+               for axis_edges, b, axis in zip(edges, bin_of, ('income', 'credit'))):
+        return None
+    cells = bin_of[0] * bins + bin_of[1]
+    counts = [np.zeros(bins * bins, dtype='int64'), np.zeros(bins * bins), np.zeros(bins * bins, dtype='int64')]
+    for total, col in zip(counts, ('applicants', 'defaults', 'labelled')):
+        total[cells] = grid[col].to_numpy()
+    return edges, counts
+
+
+def update_visuals(features_path, grid_path, trend_path, added, new_prev_paths, bins=GRID_BINS):
+    """Add appended applicants (``added``) and previous loans to both aggregates."""
+    state = _grid_state(read_cleaned(grid_path), bins)
+    income, credit, _ = _grid_values(added)
+    inside = state is not None and all(
+        not len(values) or (values.min() >= axis_edges[0] and values.max() <= axis_edges[-1])
+        for values, axis_edges in zip((income, credit), state[0]))
+    if inside:
+        (income_edges, credit_edges), counts = state
+        for total, part in zip(counts, _grid_counts(added, income_edges, credit_edges, bins)):
+            total += part
+        grid = _grid_frame(counts, income_edges, credit_edges, bins)
+    else:
+        grid = grid_from_groups(features_path, bins)
+    write_cleaned(grid, grid_path)
+
+    trend = read_cleaned(trend_path).set_index('month')[['loans', 'defaults']]
+    counts = [trend] + [_monthly_counts(prev) for path in new_prev_paths
+                        for prev in iter_row_groups(path, columns=TREND_COLUMNS)]
+    trend = _trend_frame(pd.concat(counts).groupby(level=0, sort=True).sum())
+    write_cleaned(trend, trend_path)
+    return grid.shape, trend.shape
+
+
+def write_visuals(features_path, prev_path, grid_path, trend_path):
+    """Write both aggregates; returns their shapes."""
+    grid = grid_from_groups(features_path)
+    write_cleaned(grid, grid_path)
+    trend = trend_from_groups(prev_path)
+    write_cleaned(trend, trend_path)
+    return grid.shape, trend.shape